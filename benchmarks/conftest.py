@@ -0,0 +1,129 @@
+import json
+import logging
+
+import boto3
+import pytest
+from moto import mock_aws
+from pytest_mock_resources import create_postgres_fixture, PostgresConfig
+
+from benchmarks.utils import compare_results, generate_table, Measurement, write_results
+
+logging.basicConfig(level="WARNING")
+
+measurements_key = pytest.StashKey[list]()
+regressions_key = pytest.StashKey[list]()
+
+
+def pytest_addoption(parser):
+    group = parser.getgroup("databudgie benchmarks")
+    group.addoption("--rows", type=int, default=10_000, help="The number of rows in the synthetic table.")
+    group.addoption("--width", type=int, default=8, help="The number of columns in the synthetic table.")
+    group.addoption("--benchmark-json", default=None, help="Write the measurements to this file.")
+    group.addoption("--benchmark-baseline", default=None, help="Compare the measurements to this file.")
+    group.addoption(
+        "--benchmark-tolerance",
+        type=float,
+        default=0.25,
+        help="The relative change from the baseline which is considered a regression.",
+    )
+    group.addoption(
+        "--startup-budget",
+        type=float,
+        default=0.5,
+        help="The time (in seconds) which importing the CLI may take.",
+    )
+
+
+def pytest_configure(config):
+    config.stash[measurements_key] = []
+    config.stash[regressions_key] = []
+
+
+@pytest.fixture(scope="session")
+def pmr_postgres_config():
+    return PostgresConfig(image="postgres:11-alpine")
+
+
+pg = create_postgres_fixture(scope="module", session=True, createdb_template="template0")
+
+
+@pytest.fixture(scope="module")
+def table_size(request):
+    return {"rows": request.config.getoption("--rows"), "width": request.config.getoption("--width")}
+
+
+@pytest.fixture(scope="module")
+def synthetic_table(pg, table_size):
+    generate_table(pg, **table_size)
+    return table_size
+
+
+@pytest.fixture()
+def s3_resource():
+    with mock_aws():
+        s3 = boto3.resource("s3", region_name="us-east-1")
+        s3.create_bucket(Bucket="benchmark-bucket")
+        yield s3
+
+
+@pytest.fixture()
+def record(request):
+    def record(measurement: Measurement):
+        request.config.stash[measurements_key].append(measurement)
+
+    return record
+
+
+def pytest_sessionfinish(session, exitstatus):
+    config = session.config
+    measurements = config.stash[measurements_key]
+    if not measurements:
+        return
+
+    parameters = {"rows": config.getoption("--rows"), "width": config.getoption("--width")}
+
+    output = config.getoption("--benchmark-json")
+    if output:
+        write_results(output, measurements, parameters)
+
+    baseline_path = config.getoption("--benchmark-baseline")
+    if baseline_path:
+        with open(baseline_path) as f:
+            baseline = json.load(f)
+
+        if baseline["parameters"] != parameters:
+            config.stash[regressions_key].append(
+                f"Baseline parameters {baseline['parameters']} differ from {parameters}, results are not comparable"
+            )
+        else:
+            results = [measurement.to_dict() for measurement in measurements]
+            tolerance = config.getoption("--benchmark-tolerance")
+            config.stash[regressions_key].extend(compare_results(results, baseline["results"], tolerance))
+
+        if config.stash[regressions_key]:
+            session.exitstatus = pytest.ExitCode.TESTS_FAILED
+
+
+def pytest_terminal_summary(terminalreporter, exitstatus, config):
+    measurements = config.stash[measurements_key]
+    if not measurements:
+        return
+
+    terminalreporter.section("databudgie benchmarks")
+    for measurement in measurements:
+        terminalreporter.write_line(
+            f"{measurement.name:<36} {measurement.rows_per_second:>12,.0f} rows/s "
+            f"{measurement.bytes_per_second / 1024 / 1024:>9,.2f} MiB/s "
+            f"{measurement.peak_rss_bytes / 1024 / 1024:>9,.1f} MiB peak RSS"
+            + (
+                f" {measurement.chunks:>9,} chunks {measurement.chunks_per_second:>12,.0f} chunks/s"
+                if measurement.chunks
+                else ""
+            )
+        )
+
+    regressions = config.stash[regressions_key]
+    if regressions:
+        terminalreporter.section("benchmark regressions", red=True)
+        for regression in regressions:
+            terminalreporter.write_line(regression)
@@ -0,0 +1,95 @@
+"""Compare the block sizes in which COPY data is read from, and written to, the database.
+
+Reads are also measured without coalescing, as each protocol-sized chunk of the
+COPY is handed on as it arrives, for a baseline.
+"""
+
+from __future__ import annotations
+
+import contextlib
+import hashlib
+import io
+from typing import cast
+
+import pytest
+from psycopg import Cursor
+from sqlalchemy import text
+from sqlalchemy.engine import Engine
+
+from benchmarks.utils import BENCHMARK_TABLE, Measurement, RssSampler, Stopwatch
+from databudgie.adapter.base import QueryResult
+from databudgie.adapter.postgres import PostgresAdapter
+
+BLOCK_SIZES = (64 * 1024, 1024 * 1024, 8 * 1024 * 1024)
+
+
+def _measurement(operation: str, block: int | str, rows: int, size: int, chunks: int, stopwatch, sampler):
+    return Measurement(
+        name=f"{operation}[block={block}]",
+        operation=operation,
+        adapter="postgres",
+        compression="none",
+        storage="none",
+        rows=rows,
+        bytes=size,
+        seconds=stopwatch.seconds,
+        peak_rss_bytes=sampler.peak,
+        chunks=chunks,
+    )
+
+
+@pytest.mark.parametrize("block_size", BLOCK_SIZES)
+def test_copy_read(pg, synthetic_table, record, block_size):
+    adapter = PostgresAdapter(pg, block_size=block_size)
+    result = QueryResult()
+
+    chunks = size = 0
+    with RssSampler().measure() as sampler, Stopwatch().measure() as stopwatch:
+        for chunk in adapter.stream_query(f"SELECT * FROM {BENCHMARK_TABLE}", result):
+            chunks += 1
+            size += len(chunk)
+
+    record(_measurement("copy-read", block_size, result.row_count, size, chunks, stopwatch, sampler))
+    assert result.row_count == synthetic_table["rows"]
+
+
+def test_copy_read_uncoalesced(pg, synthetic_table, record):
+    """Read each chunk of the COPY straight into the sink, as it arrives from the protocol."""
+    engine = cast(Engine, pg.get_bind())
+    hasher = hashlib.sha256()
+
+    chunks = size = 0
+    with RssSampler().measure() as sampler, Stopwatch().measure() as stopwatch:
+        with contextlib.closing(engine.raw_connection()) as conn:
+            with cast(Cursor, conn.cursor()) as cursor:
+                with cursor.copy(f"COPY (SELECT * FROM {BENCHMARK_TABLE}) TO STDOUT CSV HEADER") as copy:
+                    for chunk in iter(copy.read, b""):
+                        hasher.update(chunk)
+                        chunks += 1
+                        size += len(chunk)
+                rows = cursor.rowcount
+
+    record(_measurement("copy-read", "protocol", rows, size, chunks, stopwatch, sampler))
+    assert rows == synthetic_table["rows"]
+
+
+@pytest.mark.parametrize("block_size", BLOCK_SIZES)
+def test_copy_write(pg, synthetic_table, record, block_size):
+    content = PostgresAdapter(pg).export_query(f"SELECT * FROM {BENCHMARK_TABLE}").buffer.getvalue()
+    pg.execute(text(f"TRUNCATE {BENCHMARK_TABLE}"))
+    pg.commit()
+
+    class CountingReader(io.StringIO):
+        chunks = 0
+
+        def read(self, size=-1):
+            self.chunks += 1
+            return super().read(size)
+
+    csv_file = CountingReader(content.decode("utf-8"))
+    adapter = PostgresAdapter(pg, block_size=block_size)
+    with RssSampler().measure() as sampler, Stopwatch().measure() as stopwatch:
+        rows = adapter.import_csv(csv_file, BENCHMARK_TABLE)
+
+    record(_measurement("copy-write", block_size, rows, len(content), csv_file.chunks, stopwatch, sampler))
+    assert rows == synthetic_table["rows"]
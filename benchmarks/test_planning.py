@@ -0,0 +1,40 @@
+"""Guard the planning of a run against scaling with the number of tables, patterns and exclusions."""
+
+from __future__ import annotations
+
+import time
+
+from databudgie.config import RootConfig
+from databudgie.output import default_console
+from databudgie.storage import StorageBackend
+from databudgie.table_op import expand_table_ops
+
+SCHEMAS = 100
+TABLES_PER_SCHEMA = 1_000
+
+
+def test_expand_table_ops(pg, tmp_path, request):
+    existing_tables = [f"schema_{s}.table_{t}" for s in range(SCHEMAS) for t in range(TABLES_PER_SCHEMA)]
+
+    # A mix of literal names, schema-qualified globs, and globs across schemas, each with exclusions.
+    tables = [f"schema_{s}.table_{t}" for s in range(0, SCHEMAS, 10) for t in range(10)]
+    tables += [{"name": f"schema_{s}.*", "exclude": [f"schema_{s}.table_1*", "*.table_99?"]} for s in range(30)]
+    tables += [{"name": f"*.table_{t}*", "exclude": ["schema_1?.*", "schema_2*.*"]} for t in range(10)]
+
+    config = RootConfig.from_dict({"location": str(tmp_path), "tables": tables})
+
+    start = time.perf_counter()
+    table_ops = expand_table_ops(
+        pg,
+        config.backup.tables,
+        existing_tables,
+        storage=StorageBackend.from_config(config.backup),
+        console=default_console,
+    )
+    seconds = time.perf_counter() - start
+
+    assert table_ops
+    request.node.user_properties.append(("planning_seconds", seconds))
+
+    # Matching every pattern (and exclusion) against every table took minutes.
+    assert seconds < 10, f"Planning {len(existing_tables):,} tables took {seconds:.1f}s"
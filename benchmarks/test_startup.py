@@ -0,0 +1,67 @@
+"""Guard the startup time of the CLI against (re)introducing expensive top-level imports."""
+
+from __future__ import annotations
+
+import subprocess
+import sys
+from typing import Dict
+
+import pytest
+
+# Only imported by commands which do actual work (i.e. connecting to a database, or S3).
+DEFERRED_MODULES = ("sqlalchemy", "psycopg", "boto3", "botocore", "rich.traceback")
+
+# Additionally only imported by `databudgie config`, to print the config.
+PRINTING_MODULES = ("rich.syntax",)
+
+CONFIG = """\
+location: s3://benchmark-bucket/{table}
+tables:
+  - public.store
+"""
+
+
+def import_times(*args: str, cwd) -> Dict[str, int]:
+    """Run the CLI under `-X importtime`, producing the cumulative import time (in µs) of each module."""
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-m", "databudgie", *args],
+        cwd=cwd,
+        stdin=subprocess.DEVNULL,
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+
+    times = {}
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+
+        _, cumulative, name = line.split("|")
+        times[name.strip()] = int(cumulative)
+    return times
+
+
+@pytest.mark.parametrize(
+    "args, deferred",
+    [
+        (["--help"], DEFERRED_MODULES + PRINTING_MODULES),
+        (["backup", "--help"], DEFERRED_MODULES + PRINTING_MODULES),
+        (["config"], DEFERRED_MODULES),
+    ],
+)
+def test_deferred_imports(tmp_path, args, deferred):
+    (tmp_path / "databudgie.yml").write_text(CONFIG)
+
+    times = import_times(*args, cwd=tmp_path)
+    assert "databudgie.cli" in times
+    assert [module for module in deferred if module in times] == []
+
+
+def test_startup_time(tmp_path, request):
+    budget = request.config.getoption("--startup-budget")
+
+    # The fastest of a few runs is the least affected by noise.
+    seconds = min(import_times("--help", cwd=tmp_path)["databudgie.cli"] for _ in range(3)) / 1_000_000
+    request.node.user_properties.append(("startup_seconds", seconds))
+    assert seconds <= budget, f"Importing the CLI took {seconds:.3f}s, exceeding the budget of {budget:.3f}s"
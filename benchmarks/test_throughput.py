@@ -0,0 +1,74 @@
+import pathlib
+
+import pytest
+from sqlalchemy import text
+
+from benchmarks.utils import BENCHMARK_TABLE, Measurement, RssSampler, Stopwatch
+from databudgie.backup import backup_all
+from databudgie.config import RootConfig
+from databudgie.restore import restore_all
+from databudgie.storage import StorageBackend
+
+s3_config = {
+    "s3": {
+        "aws_access_key_id": "foo",
+        "aws_secret_access_key": "foo",
+        "region": "us-east-1",
+    }
+}
+
+
+def stored_bytes(location: str, s3_resource) -> int:
+    if location.startswith("s3://"):
+        return sum(o.size for o in s3_resource.Bucket("benchmark-bucket").objects.all())
+
+    return sum(path.stat().st_size for path in pathlib.Path(location).rglob("*") if path.is_file())
+
+
+@pytest.mark.parametrize("storage", ("local", "s3"))
+@pytest.mark.parametrize("compression", (None, "gzip"))
+@pytest.mark.parametrize("adapter", ("postgres", "python"))
+def test_throughput(pg, synthetic_table, s3_resource, tmp_path, record, adapter, compression, storage):
+    location = "s3://benchmark-bucket" if storage == "s3" else str(tmp_path)
+    config = RootConfig.from_dict(
+        {
+            "root_location": location,
+            "location": "{table}",
+            "tables": [BENCHMARK_TABLE],
+            "adapter": adapter,
+            "compression": compression,
+            "sequences": False,
+            "truncate": True,
+            "strict": True,
+            **s3_config,
+        }
+    )
+    rows = synthetic_table["rows"]
+    name = f"{adapter}-{compression or 'none'}-{storage}"
+
+    def measurement(operation: str, stopwatch: Stopwatch, sampler: RssSampler) -> Measurement:
+        return Measurement(
+            name=f"{operation}[{name}]",
+            operation=operation,
+            adapter=adapter,
+            compression=compression or "none",
+            storage=storage,
+            rows=rows,
+            bytes=size,
+            seconds=stopwatch.seconds,
+            peak_rss_bytes=sampler.peak,
+        )
+
+    storage_backend = StorageBackend.from_config(config.backup)
+    with RssSampler().measure() as sampler, Stopwatch().measure() as stopwatch:
+        backup_all(pg, config.backup, storage=storage_backend)
+
+    size = stored_bytes(location, s3_resource)
+    record(measurement("backup", stopwatch, sampler))
+
+    with RssSampler().measure() as sampler, Stopwatch().measure() as stopwatch:
+        restore_all(pg, config.restore)
+
+    record(measurement("restore", stopwatch, sampler))
+
+    assert pg.execute(text(f"SELECT count(*) FROM {BENCHMARK_TABLE}")).scalar() == rows
@@ -0,0 +1,186 @@
+from __future__ import annotations
+
+import contextlib
+import json
+import os
+import resource
+import sys
+import threading
+import time
+from dataclasses import asdict, dataclass, field
+from pathlib import Path
+from typing import Generator, List, Optional
+
+from sqlalchemy import text
+from sqlalchemy.orm import Session
+
+BENCHMARK_TABLE = "public.benchmark"
+
+
+def generate_table(session: Session, *, rows: int, width: int, table: str = BENCHMARK_TABLE):
+    """Create and populate a synthetic table with `rows` rows and `width` columns.
+
+    The data is generated server-side with `generate_series`, which is orders of
+    magnitude faster than going through the model factories, and cycles through
+    text, integer and timestamp columns so the export has realistic variety.
+    """
+    columns = ["id bigint primary key"]
+    values = ["g"]
+    for index in range(1, width):
+        kind = index % 3
+        if kind == 1:
+            columns.append(f"col_{index} text")
+            values.append(f"md5((g + {index})::text)")
+        elif kind == 2:
+            columns.append(f"col_{index} integer")
+            values.append(f"(g * {index}) % 2147483647")
+        else:
+            columns.append(f"col_{index} timestamp")
+            values.append(f"timestamp '2021-01-01' + g * interval '{index} seconds'")
+
+    session.execute(text(f"DROP TABLE IF EXISTS {table}"))
+    session.execute(text(f"CREATE TABLE {table} ({', '.join(columns)})"))
+    session.execute(
+        text(f"INSERT INTO {table} SELECT {', '.join(values)} FROM generate_series(1, :rows) AS g"),
+        {"rows": rows},
+    )
+    session.commit()
+
+
+def current_rss() -> Optional[int]:
+    """Return the resident set size of this process in bytes, where it is cheaply available."""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError):
+        return None
+
+
+def max_rss() -> int:
+    """Return the peak resident set size of this process, over its lifetime, in bytes."""
+    max_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports kilobytes, macOS reports bytes.
+    return max_rss if sys.platform == "darwin" else max_rss * 1024
+
+
+@dataclass
+class RssSampler:
+    """Sample RSS on a background thread, to find the peak during some operation.
+
+    Where the current RSS cannot be read (i.e. outside of Linux), this falls back
+    to the lifetime peak, which is only meaningful for the largest operation.
+    """
+
+    interval: float = 0.005
+
+    peak: int = 0
+    _stop: threading.Event = field(default_factory=threading.Event)
+
+    def sample(self):
+        rss = current_rss()
+        self.peak = max(self.peak, rss if rss is not None else max_rss())
+
+    def run(self):
+        while not self._stop.wait(self.interval):
+            self.sample()
+
+    @contextlib.contextmanager
+    def measure(self) -> Generator[RssSampler, None, None]:
+        self.sample()
+        thread = threading.Thread(target=self.run, daemon=True)
+        thread.start()
+        try:
+            yield self
+        finally:
+            self._stop.set()
+            thread.join()
+            self.sample()
+
+
+@dataclass
+class Measurement:
+    name: str
+    operation: str
+    adapter: str
+    compression: str
+    storage: str
+    rows: int
+    bytes: int
+    seconds: float
+    peak_rss_bytes: int
+
+    # The number of blocks the data was transferred in, where relevant.
+    chunks: int = 0
+
+    @property
+    def rows_per_second(self) -> float:
+        return self.rows / self.seconds
+
+    @property
+    def bytes_per_second(self) -> float:
+        return self.bytes / self.seconds
+
+    @property
+    def chunks_per_second(self) -> float:
+        return self.chunks / self.seconds
+
+    def to_dict(self) -> dict:
+        return {
+            **asdict(self),
+            "rows_per_second": round(self.rows_per_second, 2),
+            "bytes_per_second": round(self.bytes_per_second, 2),
+            "chunks_per_second": round(self.chunks_per_second, 2),
+        }
+
+
+@dataclass
+class Stopwatch:
+    seconds: float = 0.0
+
+    @contextlib.contextmanager
+    def measure(self) -> Generator[Stopwatch, None, None]:
+        start = time.perf_counter()
+        try:
+            yield self
+        finally:
+            self.seconds = time.perf_counter() - start
+
+
+def write_results(path: str, measurements: List[Measurement], parameters: dict):
+    content = {
+        "parameters": parameters,
+        "results": [measurement.to_dict() for measurement in measurements],
+    }
+    Path(path).write_text(json.dumps(content, indent=2) + "\n")
+
+
+def compare_results(results: List[dict], baseline: List[dict], tolerance: float) -> List[str]:
+    """Describe each result which regressed by more than `tolerance` relative to the `baseline`.
+
+    Examples:
+        >>> baseline = [{"name": "backup", "rows_per_second": 100.0, "peak_rss_bytes": 1000}]
+        >>> compare_results([{"name": "backup", "rows_per_second": 90.0, "peak_rss_bytes": 1000}], baseline, 0.2)
+        []
+
+        >>> compare_results([{"name": "backup", "rows_per_second": 50.0, "peak_rss_bytes": 1500}], baseline, 0.2)
+        ['backup: rows_per_second 100.0 -> 50.0 (-50%)', 'backup: peak_rss_bytes 1000 -> 1500 (+50%)']
+
+        Results without a baseline are ignored:
+        >>> compare_results([{"name": "restore", "rows_per_second": 1.0, "peak_rss_bytes": 1}], baseline, 0.2)
+        []
+    """
+    baseline_by_name = {result["name"]: result for result in baseline}
+
+    regressions = []
+    for result in results:
+        previous = baseline_by_name.get(result["name"])
+        if previous is None:
+            continue
+
+        # Higher is better for throughput, lower is better for memory.
+        for key, direction in (("rows_per_second", 1), ("peak_rss_bytes", -1)):
+            change = (result[key] - previous[key]) / previous[key]
+            if change * direction < -tolerance:
+                regressions.append(f"{result['name']}: {key} {previous[key]} -> {result[key]} ({change:+.0%})")
+
+    return regressions
@@ -2,20 +2,32 @@ from __future__ import annotations
 
 import contextlib
 import csv
+import hashlib
 import io
+import itertools
+import random
 import warnings
+from concurrent.futures import ThreadPoolExecutor
 from dataclasses import dataclass, field, replace
-from typing import Any, cast, Generator, Sequence
+from typing import Any, cast, Iterator, TypeVar
 
 import sqlalchemy
 from sqlalchemy import inspect, MetaData, Table, text
-from sqlalchemy.engine import Engine
+from sqlalchemy.engine import Connection, Engine
+from sqlalchemy.engine.reflection import Inspector
 from sqlalchemy.orm import Session
 
+from databudgie.config import SampleConfig
 from databudgie.output import Console, default_console
 from databudgie.table_op import TableOp
+from databudgie.tracing import in_context, span, traced
 from databudgie.utils import join_paths, parse_table, wrap_buffer
 
+T = TypeVar("T")
+
+# The (approximate) size of the blocks in which query results are streamed, and CSV content is loaded.
+BLOCK_SIZE = 1024 * 1024
+
 
 @dataclass
 class Adapter:
@@ -30,6 +42,16 @@ class Adapter:
 
     session: Session
 
+    # Session settings applied while loading data, see `FastLoadConfig`.
+    load_settings: dict[str, str] = field(default_factory=dict)
+
+    # Data is read from (and written to) the database in blocks of (about) this size, rather
+    # than a (few KB) protocol message at a time, so the per-block overhead is negligible.
+    block_size: int = BLOCK_SIZE
+
+    # Whether `session` was created for this adapter (see `worker`), rather than belonging to the caller.
+    owns_session: bool = False
+
     @classmethod
     def get_adapter(cls, session: Session, dialect: str | None = None) -> Adapter:
         """Determine an interface based on the dialect name from the Session (or an explicit string).
@@ -55,27 +77,103 @@ class Adapter:
 
         return cls(session)
 
-    def export_query(self, query: str) -> QueryResult:
-        def query_database(session: Session, query: str) -> Generator[Sequence[Any], None, None]:
-            cursor = session.execute(text(query))
+    @contextlib.contextmanager
+    def worker(self) -> Iterator[Adapter]:
+        """Yield a copy of the adapter with a session of its own, for use by another thread.
+
+        Sessions are not thread-safe, so work performed concurrently (i.e. several
+        tables at once) must not share the adapter's `session`.
+        """
+        session = Session(bind=self.session.get_bind())
+        try:
+            yield replace(self, session=session, owns_session=True)
+        finally:
+            session.close()
 
-            columns: Sequence[str] = list(cursor.keys())
-            yield columns
+    def release_session(self):
+        """End the transaction of a `worker`'s session, returning its connection to the pool.
 
-            yield from cursor
+        Table data is streamed over a connection of its own, so a worker's session would
+        otherwise hold a second connection (idle, in a transaction) for the duration of
+        the stream. A session which belongs to the caller is left alone.
+        """
+        if self.owns_session:
+            self.session.commit()
 
+    def export_query(self, query: str, sample: SampleConfig | None = None) -> QueryResult:
         result = QueryResult()
-        with result.text_buffer() as text_buffer:
-            writer = csv.writer(text_buffer, quoting=csv.QUOTE_MINIMAL)
+        with result.binary_buffer() as buffer:
+            for chunk in self.stream_query(query, result, sample=sample):
+                buffer.write(chunk)
+
+        return result
 
-            i = 0
-            for i, row in enumerate(query_database(self.session, query), start=1):
-                writer.writerow(row)
+    def export_table(self, table_op: TableOp) -> QueryResult:
+        result = QueryResult()
+        with result.binary_buffer() as buffer:
+            for chunk in self.stream_table(table_op, result):
+                buffer.write(chunk)
 
-        result.row_count = i
         return result
 
-    def import_csv(self, csv_file: io.TextIOBase, table: str):
+    def stream_table(self, table_op: TableOp, result: QueryResult) -> Iterator[bytes]:
+        """Yield the CSV content of `table_op`'s query, sampled according to its `sample` config (if any)."""
+        return self.stream_query(table_op.query(), result, sample=getattr(table_op.raw_conf, "sample", None))
+
+    def sampled_query(self, table_op: TableOp) -> str:
+        """Produce the SQL which selects the rows of `table_op` which `stream_table` backs up.
+
+        Sampling is applied to the rows as they are read, which SQL cannot express, so
+        the unsampled query (i.e. every row which could have been sampled) is produced.
+        """
+        return table_op.query()
+
+    def stream_query(self, query: str, result: QueryResult, sample: SampleConfig | None = None) -> Iterator[bytes]:
+        """Yield the CSV content of `query` in chunks, as it is read from the database.
+
+        The `row_count` and `digest` of `result` are populated once the content is exhausted.
+
+        Sampling SQL is not portable, so a `sample` is applied to the rows as they are
+        read: each row is kept with a probability of `sample.percent`, up to `sample.rows`
+        rows, after which the query is abandoned.
+        """
+        hasher = hashlib.sha256()
+        text_buffer = io.StringIO()
+        writer = csv.writer(text_buffer, quoting=csv.QUOTE_MINIMAL)
+
+        def flush() -> bytes:
+            chunk = text_buffer.getvalue().encode("utf-8")
+            text_buffer.seek(0)
+            text_buffer.truncate()
+            hasher.update(chunk)
+            return chunk
+
+        cursor = self.session.execute(text(query))
+        writer.writerow(list(cursor.keys()))
+
+        rows: Iterator = iter(cursor)
+        if sample is not None:
+            rows = sample_rows(rows, sample)
+
+        row_count = 0
+        for row_count, row in enumerate(rows, start=1):
+            writer.writerow(row)
+            if text_buffer.tell() >= self.block_size:
+                yield flush()
+        cursor.close()
+
+        if chunk := flush():
+            yield chunk
+
+        result.row_count = row_count
+        result.digest = hasher.hexdigest()
+
+    def import_csv(self, csv_file: io.TextIOBase, table: str, *, parallelism: int = 1) -> int:
+        """Load the CSV content of `csv_file` into `table`, returning the number of rows loaded.
+
+        Adapters which can load a table over several connections at once do so over
+        up to `parallelism` connections; otherwise it is ignored.
+        """
         reader = csv.DictReader(csv_file, quoting=csv.QUOTE_MINIMAL)
 
         prepared_rows: list[dict] = []
@@ -102,6 +200,8 @@ class Adapter:
             conn.execute(table_ref.insert(), prepared_rows)
             conn.execute(text("commit"))
 
+        return len(prepared_rows)
+
     def execute_sql(self, sql: bytes, *, commit=False):
         """Abstract the execution of SQL queries away from the calling code."""
         text_sql = sql.decode("utf-8")
@@ -124,6 +224,83 @@ class Adapter:
         except sqlalchemy.exc.ProgrammingError:
             self.session.rollback()
 
+    def apply_load_settings(self, connection: Connection):
+        """Apply the `load_settings` to the current transaction of `connection`.
+
+        Session settings are inherently database-specific, so they are ignored by default.
+        """
+
+    def collect_foreign_key_violations(self, table: str) -> dict[str, int]:
+        """Count the rows of `table` which violate each of its foreign keys.
+
+        Foreign key checks are only skipped through database-specific settings (see
+        `apply_load_settings`), so they are never skipped, and no violations are found, by default.
+        """
+        return {}
+
+    def collect_secondary_indexes(self, table: str) -> dict[str, str]:
+        """Find the indexes on `table` which are not backing a constraint, mapped to their definition.
+
+        Index definitions are database-specific, so no indexes are found (nor dropped) by default.
+        """
+        return {}
+
+    def drop_index(self, index_name: str):
+        self.session.execute(text(f"DROP INDEX {index_name}"))
+
+    def create_indexes(self, definitions: list[str], *, parallelism: int = 1, console: Console = default_console):
+        """Create the given indexes, each on its own connection, `parallelism` at a time.
+
+        Every index is attempted, even if an earlier one fails. The first failure is
+        raised once all of them have been attempted.
+        """
+        engine = cast(Engine, self.session.get_bind())
+
+        def create_index(definition: str):
+            with span("adapter.create_index", definition=definition), engine.begin() as conn:
+                self.apply_load_settings(conn)
+                conn.execute(text(definition))
+
+        errors = []
+        with ThreadPoolExecutor(max_workers=max(parallelism, 1)) as executor:
+            futures = [executor.submit(in_context(create_index), definition) for definition in definitions]
+            for definition, future in zip(definitions, futures):
+                error = future.exception()
+                if error is not None:
+                    console.error(f"Failed to rebuild index: {definition}")
+                    errors.append(error)
+
+        if errors:
+            raise errors[0]
+
+    @contextlib.contextmanager
+    def secondary_indexes_dropped(self, table: str, *, parallelism: int = 1, console: Console = default_console):
+        """Drop the secondary indexes of `table` for the duration of the context.
+
+        The indexes are always rebuilt on exit, including when the body of the
+        context fails.
+        """
+        indexes = self.collect_secondary_indexes(table)
+        if not indexes:
+            yield
+            return
+
+        try:
+            for index_name in indexes:
+                self.drop_index(index_name)
+        except Exception:
+            self.session.rollback()
+            raise
+        else:
+            self.session.commit()
+
+        console.trace(f"Dropped {len(indexes)} index(es) on {table}")
+        try:
+            yield
+        finally:
+            self.create_indexes(list(indexes.values()), parallelism=parallelism, console=console)
+            console.trace(f"Rebuilt {len(indexes)} index(es) on {table}")
+
     def reset_database(self):
         """Reset the database in a database-backend agnostic way.
 
@@ -135,12 +312,18 @@ class Adapter:
         """
         raise NotImplementedError()
 
+    @traced("adapter.collect_existing_tables")
     def collect_existing_tables(self) -> list[str]:
-        """Find the set of all user-defined tables in a database."""
-        connection = self.session.connection()
+        """Find the set of all user-defined tables in a database, ordered by their foreign key dependencies.
 
-        metadata = MetaData()
+        Only table names and foreign keys are inspected, rather than reflecting
+        every column, index and constraint of every table.
+        """
+        connection = self.session.connection()
         insp = inspect(connection)
+        default_schema = insp.default_schema_name
+
+        dependencies: dict[str, set[str]] = {}
         for schema in insp.get_schema_names():
             # Seems to be a generally cross-database compatible filter.
             if schema in ("information_schema", "pg_catalog"):
@@ -148,9 +331,14 @@ class Adapter:
 
             with warnings.catch_warnings():
                 warnings.simplefilter("ignore")
-                metadata.reflect(bind=connection, schema=schema)
+                foreign_keys = collect_foreign_keys(insp, schema)
 
-        return [table.fullname for table in metadata.sorted_tables]
+            for table_name, table_foreign_keys in foreign_keys.items():
+                dependencies[f"{schema}.{table_name}"] = {
+                    f"{fk['referred_schema'] or default_schema}.{fk['referred_table']}" for fk in table_foreign_keys
+                }
+
+        return sort_tables(dependencies)
 
     def collect_table_dependencies(self, table_op: TableOp, console: Console = default_console) -> list[str]:
         raise NotImplementedError()
@@ -158,18 +346,63 @@ class Adapter:
     def collect_table_sequences(self) -> dict[str, list[str]]:
         raise NotImplementedError()
 
+    def estimate_table(self, table_op: TableOp) -> TableEstimate:
+        """Estimate the rows and size of `table_op`'s data, without reading any of it.
+
+        Estimates rely on database-specific statistics, so nothing is estimated by default.
+        """
+        return TableEstimate()
+
+    def collect_partitions(self, table: str) -> list[Partition]:
+        """Find the partitions of `table` (at every level), ordered such that each follows its parent.
+
+        Partitioning is database-specific, so no table is considered partitioned by default.
+        """
+        return []
+
+    def collect_table_sizes(self, tables: list[str]) -> dict[str, int]:
+        """Find the size (in bytes) of each of `tables`, used to start the largest tables first.
+
+        Sizes are database-specific, so no sizes are known by default (and tables are
+        processed in their original order).
+        """
+        return {}
+
     def collect_sequence_value(self, sequence_name: str) -> int:
         raise NotImplementedError()
 
     def restore_sequence_value(self, sequence_name: str, value: int) -> int:
         raise NotImplementedError()
 
+    @traced("adapter.collect_foreign_keys", "table")
+    def collect_foreign_keys(self, table: str) -> list[ForeignKey]:
+        """Find the foreign keys of `table`."""
+        schema, table_name = parse_table(table)
+
+        insp = inspect(self.session.connection())
+        default_schema = insp.default_schema_name
+        return [
+            ForeignKey(
+                table=table,
+                columns=tuple(fk["constrained_columns"]),
+                referenced_table=f"{fk['referred_schema'] or default_schema}.{fk['referred_table']}",
+                referenced_columns=tuple(fk["referred_columns"]),
+            )
+            for fk in insp.get_foreign_keys(table_name, schema=schema)
+        ]
+
     def materialize_table_dependencies(
         self,
         table_ops: list[TableOp],
         reverse: bool = False,
+        restrict_rows: bool = False,
         console: Console = default_console,
     ) -> list[TableOp]:
+        """Include the tables referenced (through foreign keys) by each of `table_ops` which `follow_foreign_keys`.
+
+        When backing up, `restrict_rows` restricts the included tables to the rows which
+        are referenced (see `restrict_to_referenced_rows`).
+        """
         tables = set()
         dependent_table_ops = []
         for table_op in table_ops:
@@ -182,6 +415,7 @@ class Adapter:
                 continue
 
             dependent_tables = self.collect_table_dependencies(table_op=table_op, console=console)
+
             for dependent_table in dependent_tables:
                 if dependent_table not in tables:
                     concrete_parent_location = table_op.location().format(table=table_op.full_name)
@@ -192,6 +426,9 @@ class Adapter:
                     tables.add(dependent_table)
                     dependent_table_ops.append(dependent_table_op)
 
+        if restrict_rows and dependent_table_ops:
+            self.restrict_to_referenced_rows(dependent_table_ops, table_ops, tables)
+
         if reverse:
             # The original `table_ops` list comes to us already reverse
             # ordered, so we need to preserve it's original order, and
@@ -200,14 +437,224 @@ class Adapter:
 
         return table_ops + dependent_table_ops
 
+    def restrict_to_referenced_rows(
+        self,
+        dependent_table_ops: list[TableOp],
+        table_ops: list[TableOp],
+        tables: set[str],
+    ):
+        """Restrict the query of each table included by `follow_foreign_keys` to the rows which are referenced.
+
+        A followed table's query selects only the rows referenced (through a foreign key)
+        by the rows which are backed up from the tables referencing it (among all of the
+        backed up `tables`, whether or not they follow foreign keys), as a semi-join
+        against those tables' (sampled) queries. Tables are visited such that every table's
+        query is final before the tables it references are visited, so the restriction
+        carries through each level of foreign keys.
+
+        Each referencing table's query is included once, as a common table expression,
+        however many paths through the foreign keys lead to it. A sampled table is given
+        a `seed` (if it has none), so that its backup and the semi-joins against it agree.
+
+        A followed table which is not referenced by any table with a known query is
+        backed up in full.
+        """
+        for sampled_table_op in table_ops + dependent_table_ops:
+            raw_conf = sampled_table_op.raw_conf
+            sample: SampleConfig | None = getattr(raw_conf, "sample", None)
+            if sample is not None and sample.seed is None:
+                seed = random.randrange(2**31)  # noqa: S311
+                sampled_table_op.raw_conf = replace(raw_conf, sample=replace(sample, seed=seed))
+
+        queries = {table_op.full_name: self.sampled_query(table_op) for table_op in table_ops if table_op.full_name}
+
+        # The common table expressions referenced by each followed table's query, in dependency order.
+        expressions: dict[str, dict[str, str]] = {}
+
+        referencing: dict[str, list[ForeignKey]] = {}
+        dependencies: dict[str, set[str]] = {}
+        for table in tables:
+            foreign_keys = [fk for fk in self.collect_foreign_keys(table) if fk.referenced_table != table]
+            dependencies[table] = {fk.referenced_table for fk in foreign_keys}
+            for foreign_key in foreign_keys:
+                referencing.setdefault(foreign_key.referenced_table, []).append(foreign_key)
+
+        preparer = self.session.get_bind().dialect.identifier_preparer
+        dependent_table_op_by_name = {table_op.full_name: table_op for table_op in dependent_table_ops}
+
+        # Referencing tables come before the tables they reference.
+        for table in reversed(sort_tables(dependencies)):
+            table_op = dependent_table_op_by_name.get(table)
+            if table_op is None:
+                continue
+
+            table_expressions: dict[str, str] = {}
+            conditions = []
+            for foreign_key in referencing.get(table, []):
+                query = queries.get(foreign_key.table)
+                if query is None:
+                    continue
+
+                name = preparer.quote_identifier(foreign_key.table)
+                table_expressions.update(expressions.get(foreign_key.table, {}))
+                table_expressions[name] = query
+
+                referenced_columns = ", ".join(preparer.quote(column) for column in foreign_key.referenced_columns)
+                columns = ", ".join(preparer.quote(column) for column in foreign_key.columns)
+                conditions.append(f"({referenced_columns}) IN (SELECT {columns} FROM {name})")  # noqa: S608
+
+            if not conditions:
+                queries[table] = self.sampled_query(table_op)
+                continue
+
+            condition = " OR ".join(conditions)
+            queries[table] = f"SELECT * FROM {table} WHERE {condition}"  # noqa: S608
+            expressions[table] = table_expressions
+
+            # The query is formatted with `{table}` again, so braces in the nested queries must be escaped.
+            with_clause = ", ".join(f"{name} AS ({query})" for name, query in table_expressions.items())
+            with_clause = with_clause.replace("{", "{{").replace("}", "}}")
+            condition = condition.replace("{", "{{").replace("}", "}}")
+            query = f"WITH {with_clause} SELECT * FROM {{table}} WHERE {condition}"  # noqa: S608
+            table_op.raw_conf = replace(table_op.raw_conf, query=query, sample=None)
+
+
+@dataclass(frozen=True)
+class ForeignKey:
+    table: str
+    columns: tuple[str, ...]
+    referenced_table: str
+    referenced_columns: tuple[str, ...]
+
+
+@dataclass(frozen=True)
+class Partition:
+    name: str
+
+    # Whether the partition holds data itself, rather than being partitioned further.
+    leaf: bool = True
+
+
+@dataclass(frozen=True)
+class TableEstimate:
+    """The estimated number of rows and size (in bytes) of a table's data, where known."""
+
+    rows: int | None = None
+    size: int | None = None
+
+    def sampled(self, sample: SampleConfig) -> TableEstimate:
+        """Estimate the portion of the data which remains after applying `sample`.
+
+        Examples:
+            >>> TableEstimate(rows=1000, size=8000).sampled(SampleConfig(percent=10))
+            TableEstimate(rows=100, size=800)
+
+            >>> TableEstimate(rows=1000, size=8000).sampled(SampleConfig(percent=50, rows=20))
+            TableEstimate(rows=20, size=160)
+        """
+        if not self.rows:
+            return self
+
+        rows = self.rows
+        if sample.percent is not None:
+            rows = int(rows * sample.percent / 100)
+        if sample.rows is not None:
+            rows = min(rows, sample.rows)
+
+        size = self.size * rows // self.rows if self.size is not None else None
+        return TableEstimate(rows=rows, size=size)
+
+
+def sample_rows(rows: Iterator[T], sample: SampleConfig) -> Iterator[T]:
+    """Yield a random `sample.percent` of `rows`, up to `sample.rows` rows.
+
+    Examples:
+        >>> len(list(sample_rows(iter(range(1000)), SampleConfig(rows=10))))
+        10
+
+        >>> sampled = list(sample_rows(iter(range(1000)), SampleConfig(percent=10, seed=1)))
+        >>> 50 < len(sampled) < 150
+        True
+    """
+    rng = random.Random(sample.seed)  # noqa: S311
+    if sample.percent is not None:
+        fraction = sample.percent / 100
+        rows = (row for row in rows if rng.random() < fraction)
+
+    return itertools.islice(rows, sample.rows)
+
+
+def collect_foreign_keys(insp: Inspector, schema: str) -> dict[str, list]:
+    """Map the name of each table in `schema` to its foreign keys.
+
+    Where supported (SQLAlchemy 2.0), the foreign keys of all of the schema's tables
+    are collected at once, rather than with a query per table.
+    """
+    table_names = insp.get_table_names(schema=schema)
+
+    get_multi_foreign_keys = getattr(insp, "get_multi_foreign_keys", None)
+    if get_multi_foreign_keys is not None:
+        foreign_keys = get_multi_foreign_keys(schema=schema)
+        return {table_name: foreign_keys.get((schema, table_name), []) for table_name in table_names}
+
+    return {table_name: insp.get_foreign_keys(table_name, schema=schema) for table_name in table_names}
+
+
+def sort_tables(dependencies: dict[str, set[str]]) -> list[str]:
+    """Order tables such that each table follows the tables it depends upon.
+
+    Tables which are otherwise unordered relative to one another are sorted by
+    name. Dependencies which form a cycle cannot be satisfied, and are ignored.
+
+    Examples:
+        >>> sort_tables({"public.b": {"public.a"}, "public.a": set(), "public.c": {"public.b", "public.c"}})
+        ['public.a', 'public.b', 'public.c']
+
+        >>> sort_tables({"public.b": {"public.a"}, "public.a": {"public.b"}, "public.c": set()})
+        ['public.c', 'public.a', 'public.b']
+    """
+    remaining: dict[str, int] = {}
+    dependents: dict[str, list[str]] = {}
+    for table, table_dependencies in dependencies.items():
+        table_dependencies = {d for d in table_dependencies if d != table and d in dependencies}
+        remaining[table] = len(table_dependencies)
+        for dependency in table_dependencies:
+            dependents.setdefault(dependency, []).append(table)
+
+    result: list[str] = []
+    ready = sorted(table for table, count in remaining.items() if not count)
+    while remaining:
+        if not ready:
+            # Every remaining table is part of (or depends on) a cycle. Break it arbitrarily, but deterministically.
+            ready = [min(remaining)]
+
+        next_ready = []
+        for table in ready:
+            del remaining[table]
+            result.append(table)
+
+            for dependent in dependents.get(table, []):
+                if dependent in remaining:
+                    remaining[dependent] -= 1
+                    if remaining[dependent] == 0:
+                        next_ready.append(dependent)
+
+        ready = sorted(next_ready)
+
+    return result
+
 
 @dataclass
 class QueryResult:
     buffer: io.BytesIO = field(default_factory=io.BytesIO)
     row_count: int = 0
 
+    # The sha256 hex digest of the (uncompressed) content of `buffer`.
+    digest: str | None = None
+
     @contextlib.contextmanager
     def binary_buffer(self):
+        """Yield the underlying buffer, for writers which populate `digest` as they write."""
         yield self.buffer
         self.buffer.seek(0)
 
@@ -215,3 +662,5 @@ class QueryResult:
     def text_buffer(self):
         with wrap_buffer(self.buffer) as text_buffer:
             yield text_buffer
+
+        self.digest = hashlib.sha256(self.buffer.getbuffer()).hexdigest()
@@ -1,20 +1,28 @@
 import contextlib
+import hashlib
 import io
 import os
 import shlex
 import shutil
 import subprocess
-from typing import cast, Dict, List
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import cast, Dict, Iterator, List, Optional, Tuple
 
 from psycopg import Cursor, sql
 from sqlalchemy import text
-from sqlalchemy.engine import create_engine, Engine
+from sqlalchemy.engine import Connection, create_engine, Engine
 from sqlalchemy.engine.url import URL
+from sqlalchemy.pool import NullPool
 from typing_extensions import LiteralString
 
-from databudgie.adapter.base import Adapter, QueryResult
+from databudgie.adapter.base import Adapter, Partition, QueryResult, TableEstimate
+from databudgie.config import BackupTableConfig, SampleConfig
 from databudgie.output import Console, default_console
+from databudgie.pipeline import CancelledError, Channel
 from databudgie.table_op import TableOp
+from databudgie.tracing import in_context, traced
+from databudgie.utils import coalesce_chunks, parse_table, split_records
 
 
 def update_url(url, database=None):
@@ -41,23 +49,140 @@ class PostgresAdapter(Adapter):
         cleaned_sql = clean_sql(sql)
         return super().execute_sql(cleaned_sql, commit=commit)
 
-    def export_query(self, query: str) -> QueryResult:
+    def stream_table(self, table_op: TableOp, result: QueryResult) -> Iterator[bytes]:
+        """Yield the CSV content of `table_op`'s query, sampled using `TABLESAMPLE` (see `sampled_query`)."""
+        if getattr(table_op.raw_conf, "sample", None) is None or table_op.full_name is None:
+            return super().stream_table(table_op, result)
+
+        return self.stream_query(self.sampled_query(table_op), result)
+
+    def sampled_query(self, table_op: TableOp) -> str:
+        """Produce `table_op`'s query, sampled using `TABLESAMPLE`.
+
+        The table is replaced, in the query, by a common table expression (named after the
+        table) holding a sample of the table, so that only the sampled portion of the table
+        is read, and the query can continue to refer to (or alias) the table. A cap on the
+        number of `rows` (alone) samples enough of the table to satisfy the cap, according
+        to its estimated size, and any cap on the number of `rows` limits the query.
+        """
+        sample: Optional[SampleConfig] = getattr(table_op.raw_conf, "sample", None)
+        if sample is None or table_op.full_name is None:
+            return super().sampled_query(table_op)
+
+        percent = sample.percent
+        if percent is None:
+            percent = self.estimate_sample_percent(table_op.full_name, sample.rows)
+
+        table = table_op.full_name
+        with_clause = ""
+        if percent is not None and percent < 100:
+            method = sample.method.upper()
+            repeatable = f" REPEATABLE ({sample.seed})" if sample.seed is not None else ""
+            table = '"{}"'.format(parse_table(table_op.full_name)[1].replace('"', '""'))
+            with_clause = (
+                f"WITH {table} AS (SELECT * FROM {table_op.full_name} TABLESAMPLE {method} ({percent}){repeatable}) "  # noqa: S608
+            )
+
+        query = table_op.query(table)
+        if not with_clause and sample.rows is None:
+            return query
+
+        limit = f" LIMIT {sample.rows}" if sample.rows is not None else ""
+        return f"{with_clause}SELECT * FROM ({query}) AS sampled{limit}"  # noqa: S608
+
+    def estimate_sample_percent(self, table: str, rows: Optional[int]) -> Optional[float]:
+        """Estimate the percentage of `table` which holds (comfortably more than) `rows` rows."""
+        if rows is None:
+            return None
+
+        # Partitions are backed up concurrently, so the (shared) session is not used.
+        engine: Engine = cast(Engine, self.session.get_bind())
+        with engine.connect() as conn:
+            estimate = conn.execute(
+                text("SELECT reltuples, relpages FROM pg_class WHERE oid = to_regclass(:table)"), {"table": table}
+            ).first()
+        if not estimate or estimate.reltuples <= 0 or estimate.relpages <= 0:
+            return None
+
+        # `SYSTEM` sampling selects whole pages at random, so the number of rows it
+        # produces varies. Sampling twice the pages needed (plus a few) makes falling
+        # short of the cap unlikely.
+        pages = rows / (estimate.reltuples / estimate.relpages)
+        return min(100.0, (pages * 2 + 10) / estimate.relpages * 100)
+
+    @traced("adapter.estimate_table")
+    def estimate_table(self, table_op: TableOp) -> TableEstimate:
+        """Estimate the rows and size of `table_op`'s data, without reading any of it.
+
+        The default query is estimated from the table's statistics (summed over its
+        partitions, if partitioned), and its total size on disk. Any other query is
+        estimated by the planner (`EXPLAIN`), as its rows multiplied by their width.
+        """
+        query = getattr(table_op.raw_conf, "query", None) or BackupTableConfig.query
+        if table_op.full_name and " ".join(query.lower().split()) == BackupTableConfig.query:
+            partitions = [partition.name for partition in self.collect_partitions(table_op.full_name) if partition.leaf]
+            statistics = self.session.execute(
+                text(
+                    """
+                    SELECT
+                        sum(greatest(reltuples, 0))::bigint AS rows,
+                        sum(pg_total_relation_size(oid))::bigint AS size,
+                        bool_or(reltuples < 0) AS unanalyzed
+                    FROM pg_class
+                    WHERE oid = ANY(CAST(:tables AS regclass[]))
+                    """
+                ),
+                {"tables": partitions or [table_op.full_name]},
+            ).one()
+
+            rows = statistics.rows
+            if statistics.unanalyzed:
+                # The table has never been analyzed, but the planner extrapolates from its size.
+                rows, _ = self.explain(table_op.query())
+            estimate = TableEstimate(rows=rows, size=statistics.size)
+        else:
+            rows, width = self.explain(table_op.query())
+            estimate = TableEstimate(rows=rows, size=rows * width)
+
+        sample: Optional[SampleConfig] = getattr(table_op.raw_conf, "sample", None)
+        if sample is not None:
+            return estimate.sampled(sample)
+        return estimate
+
+    def explain(self, query: str) -> Tuple[int, int]:
+        """Produce the planner's estimate of the number of rows produced by `query`, and their width."""
+        try:
+            plan = self.session.execute(text(f"EXPLAIN (FORMAT JSON) {query}")).scalar()
+        except Exception:
+            self.session.rollback()
+            raise
+
+        root = cast(list, plan)[0]["Plan"]
+        return int(root["Plan Rows"]), int(root["Plan Width"])
+
+    def stream_query(self, query: str, result: QueryResult, sample: Optional[SampleConfig] = None) -> Iterator[bytes]:
         engine: Engine = cast(Engine, self.session.get_bind())
 
-        result = QueryResult()
-        with result.binary_buffer() as buffer:
-            with contextlib.closing(engine.raw_connection()) as conn:
-                with cast(Cursor, conn.cursor()) as cursor:
-                    statement = sql.SQL(cast(LiteralString, f"COPY ({query}) TO STDOUT CSV HEADER"))
+        if sample is not None:
+            if sample.percent is not None:
+                query = f"SELECT * FROM ({query}) AS sampled WHERE random() < {sample.percent / 100}"  # noqa: S608
+            if sample.rows is not None:
+                query = f"SELECT * FROM ({query}) AS sampled LIMIT {sample.rows}"  # noqa: S608
 
-                    with cursor.copy(statement) as copy:
-                        while data := copy.read():
-                            buffer.write(data)
-                    result.row_count = cursor.rowcount
+        hasher = hashlib.sha256()
+        with contextlib.closing(engine.raw_connection()) as conn:
+            with cast(Cursor, conn.cursor()) as cursor:
+                statement = sql.SQL(cast(LiteralString, f"COPY ({query}) TO STDOUT CSV HEADER"))
 
-        return result
+                with cursor.copy(statement) as copy:
+                    for chunk in coalesce_chunks(iter(copy.read, b""), size=self.block_size):
+                        hasher.update(chunk)
+                        yield chunk
+                result.row_count = cursor.rowcount
 
-    def import_csv(self, csv_file: io.TextIOBase, table: str):
+        result.digest = hasher.hexdigest()
+
+    def import_csv(self, csv_file: io.TextIOBase, table: str, *, parallelism: int = 1) -> int:
         engine: Engine = cast(Engine, self.session.get_bind())
 
         # Reading the header line from the buffer removes it for the ingest
@@ -66,12 +191,81 @@ class PostgresAdapter(Adapter):
             table=sql.Identifier(*table.split(".")), columns=sql.SQL(", ").join(columns)
         )
 
+        if parallelism > 1:
+            return self.import_csv_parallel(csv_file, statement, parallelism=parallelism)
+
         with contextlib.closing(engine.raw_connection()) as conn:
             with cast(Cursor, conn.cursor()) as cursor:
+                for name, value in self.load_settings.items():
+                    cursor.execute("SELECT set_config(%s, %s, true)", (name, value))
+
+                # Written in chunks, so the content is never held in memory in its entirety.
                 with cursor.copy(statement) as copy:
-                    copy.write(csv_file.read())
+                    while data := csv_file.read(self.block_size):
+                        copy.write(data)
                 conn.commit()
 
+                return cursor.rowcount
+
+    def import_csv_parallel(self, csv_file: io.TextIOBase, statement: sql.Composed, *, parallelism: int) -> int:
+        """Load the content of `csv_file` over `parallelism` concurrent `COPY` streams into the same table.
+
+        The content is split into blocks on record boundaries, each of which is
+        written by whichever connection is ready for it. A failure on any connection
+        aborts the others.
+
+        Each connection commits as soon as its stream ends. (Otherwise, a row which
+        conflicts with a row loaded by another connection would wait on that
+        connection's transaction indefinitely.) As such, unlike a load over a single
+        connection, a failure can leave a portion of the table loaded.
+        """
+        engine: Engine = cast(Engine, self.session.get_bind())
+
+        stopped = threading.Event()
+        channel = Channel(stopped, maxsize=parallelism * 2)
+
+        def load() -> int:
+            try:
+                with contextlib.closing(engine.raw_connection()) as conn:
+                    with cast(Cursor, conn.cursor()) as cursor:
+                        for name, value in self.load_settings.items():
+                            cursor.execute("SELECT set_config(%s, %s, true)", (name, value))
+
+                        with cursor.copy(statement) as copy:
+                            for block in channel:
+                                copy.write(block)
+                        conn.commit()
+
+                        return cursor.rowcount
+            except BaseException:
+                stopped.set()
+                raise
+
+        errors: List[BaseException] = []
+        with ThreadPoolExecutor(max_workers=parallelism, thread_name_prefix="databudgie-load") as executor:
+            futures = [executor.submit(in_context(load)) for _ in range(parallelism)]
+
+            try:
+                for block in split_records(iter(lambda: csv_file.read(self.block_size), "")):
+                    channel.put(block)
+                for _ in futures:
+                    channel.close()
+            except CancelledError:
+                pass
+            except BaseException as e:
+                errors.append(e)
+                stopped.set()
+
+            for future in futures:
+                error = future.exception()
+                if error is not None and not isinstance(error, CancelledError):
+                    errors.append(error)
+
+        if errors:
+            raise errors[0]
+        return sum(future.result() for future in futures)
+
+    @traced("adapter.export_schema_ddl", "name")
     def export_schema_ddl(self, name: str, console: Console = default_console) -> bytes:
         if not shutil.which("pg_dump"):
             console.warn("Could not find pg_dump, falling back to SQLAlchemy implementation.")
@@ -84,6 +278,7 @@ class PostgresAdapter(Adapter):
             f"CREATE SCHEMA IF NOT EXISTS {name};".encode(),
         )
 
+    @traced("adapter.export_table_ddl", "table_name")
     def export_table_ddl(self, table_name: str, console: Console = default_console):
         if not shutil.which("pg_dump"):
             console.warn("Could not find pg_dump, falling back to SQLAlchemy implementation.")
@@ -91,7 +286,9 @@ class PostgresAdapter(Adapter):
 
         url = self.session.connection().engine.url
 
-        return pg_dump(url, f"--schema-only -t {table_name}")
+        # The partitions of a partitioned table are created (and attached) alongside it.
+        tables = [table_name, *(partition.name for partition in self.collect_partitions(table_name))]
+        return pg_dump(url, "--schema-only " + " ".join(f"-t {table}" for table in tables))
 
     def reset_database(self) -> None:
         """Attempt to kill the existing database and bring it back up."""
@@ -106,19 +303,27 @@ class PostgresAdapter(Adapter):
         # "template0", used below is not allowed to be connected to.
         template_url = update_url(url, database="template1")
 
-        template_engine = create_engine(template_url)
-        with template_engine.connect().execution_options(isolation_level="AUTOCOMMIT") as connection:
-            kill_pids = text("SELECT pg_terminate_backend(pid) FROM pg_stat_activity WHERE datname = :database;")
-            connection.execute(kill_pids, {"database": database})
+        # The template connection is only needed once, so it is not worth pooling.
+        template_engine = create_engine(template_url, poolclass=NullPool)
+        try:
+            with template_engine.connect().execution_options(isolation_level="AUTOCOMMIT") as connection:
+                kill_pids = text("SELECT pg_terminate_backend(pid) FROM pg_stat_activity WHERE datname = :database;")
+                connection.execute(kill_pids, {"database": database})
 
-            connection.execute(text(f"DROP DATABASE {database}"))
+                connection.execute(text(f"DROP DATABASE {database}"))
 
-            # "template0" is an even more special database. You cannot create databases
-            # from a template while there are active connections to it.
-            connection.execute(text(f"CREATE DATABASE {database} template=template0"))
+                # "template0" is an even more special database. You cannot create databases
+                # from a template while there are active connections to it.
+                connection.execute(text(f"CREATE DATABASE {database} template=template0"))
+        finally:
+            template_engine.dispose()
 
         self.session.invalidate()
 
+        # Every pooled connection to the dropped database was terminated above.
+        cast(Engine, self.session.get_bind()).dispose()
+
+    @traced("adapter.collect_existing_tables")
     def collect_existing_tables(self, console: Console = default_console) -> List[str]:
         """Find the set of all user-defined tables in a database."""
         if "FALLBACK_SQLALCHEMY_TABLE_COLLECTION" in os.environ:
@@ -137,7 +342,9 @@ class PostgresAdapter(Adapter):
                     1          as level
                 from pg_class t
                 join pg_namespace s on s.oid = t.relnamespace
-                where relkind = 'r'
+                where relkind in ('r', 'p')
+                -- Partitions are backed up and restored through their (root) partitioned table.
+                and not t.relispartition
                 and not exists(select * from pg_constraint where contype = 'f' and conrelid = t.oid)
                 and s.nspname not in ('pg_catalog', 'information_schema')
 
@@ -154,6 +361,7 @@ class PostgresAdapter(Adapter):
                 join pg_constraint c on c.contype = 'f' and c.conrelid = ref.oid
                 join fk_tree p on p.reloid = c.confrelid
                 where ref.oid != p.reloid -- do not enter to tables referencing theirselves.
+                and not ref.relispartition
             ),
             all_tables as (
                 -- this picks the highest level for each table
@@ -174,6 +382,7 @@ class PostgresAdapter(Adapter):
         results = self.session.execute(collect_tables)
         return [row[0] for row in results]
 
+    @traced("adapter.collect_table_dependencies")
     def collect_table_dependencies(self, table_op: TableOp, console: Console = default_console) -> List[str]:
         """Find the set of tables dependent on the set of input tables."""
         collect_tables = text(
@@ -220,6 +429,75 @@ class PostgresAdapter(Adapter):
 
         return [row[0] for row in results]
 
+    @property
+    def server_version(self) -> Tuple[int, ...]:
+        return cast(Tuple[int, ...], self.session.connection().dialect.server_version_info)
+
+    @traced("adapter.collect_partitions", "table")
+    def collect_partitions(self, table: str) -> List[Partition]:
+        # `pg_partition_tree` was added in Postgres 12, before which the tree is walked through `pg_inherits`.
+        if self.server_version >= (12,):
+            tree = "SELECT relid, level FROM pg_partition_tree(to_regclass(:table)) WHERE level > 0"
+        else:
+            tree = """
+                WITH RECURSIVE tree(relid, level) AS (
+                    SELECT i.inhrelid, 1
+                    FROM pg_inherits i
+                    WHERE i.inhparent = to_regclass(:table)
+                    UNION ALL
+                    SELECT i.inhrelid, tree.level + 1
+                    FROM tree
+                    JOIN pg_inherits i ON i.inhparent = tree.relid
+                )
+                SELECT tree.relid, tree.level
+                FROM tree
+                JOIN pg_class c ON c.oid = tree.relid
+                WHERE c.relispartition
+            """
+
+        results = self.session.execute(
+            text(
+                f"""
+                SELECT ns.nspname || '.' || c.relname AS name, c.relkind <> 'p' AS leaf
+                FROM ({tree}) tree
+                JOIN pg_class c ON c.oid = tree.relid
+                JOIN pg_namespace ns ON ns.oid = c.relnamespace
+                ORDER BY tree.level, name
+                """  # noqa: S608
+            ),
+            {"table": table},
+        )
+        return [Partition(name=row.name, leaf=row.leaf) for row in results]
+
+    @traced("adapter.collect_table_sizes")
+    def collect_table_sizes(self, tables: List[str]) -> Dict[str, int]:
+        """Find the total size of each of `tables` on disk, including its indexes, toast and partitions."""
+        # Partitions are found through `pg_inherits`, as `pg_partition_tree` requires Postgres 12,
+        # and produces nothing at all for a table which is not partitioned.
+        results = self.session.execute(
+            text(
+                """
+                WITH RECURSIVE tree(name, relid) AS (
+                    SELECT t.name, to_regclass(t.name)
+                    FROM unnest(CAST(:tables AS text[])) t(name)
+                    WHERE to_regclass(t.name) IS NOT NULL
+                    UNION ALL
+                    SELECT tree.name, c.oid
+                    FROM tree
+                    JOIN pg_inherits i ON i.inhparent = tree.relid
+                    JOIN pg_class c ON c.oid = i.inhrelid
+                    WHERE c.relispartition
+                )
+                SELECT name, coalesce(sum(pg_total_relation_size(relid)), 0)::bigint AS size
+                FROM tree
+                GROUP BY name
+                """
+            ),
+            {"tables": tables},
+        )
+        return {row.name: row.size for row in results}
+
+    @traced("adapter.collect_table_sequences")
     def collect_table_sequences(self) -> Dict[str, List[str]]:
         sequences = self.session.execute(
             text(
@@ -244,6 +522,85 @@ class PostgresAdapter(Adapter):
             result.setdefault(sequence.fq_table_name, []).append(sequence.fq_sequence_name)
         return result
 
+    def apply_load_settings(self, connection: Connection):
+        for name, value in self.load_settings.items():
+            connection.execute(text("SELECT set_config(:name, :value, true)"), {"name": name, "value": value})
+
+    @traced("adapter.collect_foreign_key_violations", "table")
+    def collect_foreign_key_violations(self, table: str) -> Dict[str, int]:
+        schema, table_name = parse_table(table)
+        foreign_keys = self.session.execute(
+            text(
+                """
+                SELECT
+                    c.conname AS name,
+                    quote_ident(ns.nspname) || '.' || quote_ident(t.relname) AS table_name,
+                    quote_ident(fns.nspname) || '.' || quote_ident(ft.relname) AS referenced_table,
+                    array(
+                        SELECT quote_ident(a.attname)
+                        FROM unnest(c.conkey) WITH ORDINALITY AS k(attnum, ord)
+                        JOIN pg_attribute a ON a.attrelid = c.conrelid AND a.attnum = k.attnum
+                        ORDER BY k.ord
+                    ) AS columns,
+                    array(
+                        SELECT quote_ident(a.attname)
+                        FROM unnest(c.confkey) WITH ORDINALITY AS k(attnum, ord)
+                        JOIN pg_attribute a ON a.attrelid = c.confrelid AND a.attnum = k.attnum
+                        ORDER BY k.ord
+                    ) AS referenced_columns
+                FROM pg_constraint c
+                JOIN pg_class t ON t.oid = c.conrelid
+                JOIN pg_namespace ns ON ns.oid = t.relnamespace
+                JOIN pg_class ft ON ft.oid = c.confrelid
+                JOIN pg_namespace fns ON fns.oid = ft.relnamespace
+                WHERE c.contype = 'f' AND ns.nspname = :schema AND t.relname = :table_name
+                ORDER BY c.conname
+                """
+            ),
+            params={"schema": schema, "table_name": table_name},
+        ).fetchall()
+
+        result = {}
+        for foreign_key in foreign_keys:
+            # Mirrors the default `MATCH SIMPLE` behavior, where rows with any null
+            # referencing column are not checked.
+            not_null = " AND ".join(f"t.{column} IS NOT NULL" for column in foreign_key.columns)
+            matches = " AND ".join(
+                f"r.{referenced_column} = t.{column}"
+                for column, referenced_column in zip(foreign_key.columns, foreign_key.referenced_columns)
+            )
+            query = (
+                f"SELECT count(*) FROM {foreign_key.table_name} AS t WHERE {not_null} "  # noqa: S608
+                f"AND NOT EXISTS (SELECT 1 FROM {foreign_key.referenced_table} AS r WHERE {matches})"
+            )
+            result[foreign_key.name] = cast(int, self.session.execute(text(query)).scalar())
+
+        return result
+
+    @traced("adapter.collect_secondary_indexes", "table")
+    def collect_secondary_indexes(self, table: str) -> Dict[str, str]:
+        schema, table_name = parse_table(table)
+        results = self.session.execute(
+            text(
+                """
+                SELECT
+                    quote_ident(ns.nspname) || '.' || quote_ident(i.relname) AS index_name,
+                    pg_get_indexdef(ix.indexrelid) AS definition
+                FROM pg_index ix
+                JOIN pg_class t ON t.oid = ix.indrelid
+                JOIN pg_class i ON i.oid = ix.indexrelid
+                JOIN pg_namespace ns ON ns.oid = t.relnamespace
+                WHERE ns.nspname = :schema AND t.relname = :table_name
+                -- Indexes backing a constraint (primary keys, unique/exclusion constraints, or
+                -- the target of a foreign key) cannot be dropped independently of it.
+                AND NOT EXISTS (SELECT 1 FROM pg_constraint c WHERE c.conindid = ix.indexrelid)
+                ORDER BY i.relname
+                """
+            ),
+            params={"schema": schema, "table_name": table_name},
+        )
+        return {row.index_name: row.definition for row in results}
+
     def collect_sequence_value(self, sequence_name: str) -> int:
         return cast(
             int,
@@ -1,13 +1,20 @@
-import os
-from typing import Iterable, Optional, Tuple
+from __future__ import annotations
 
-from sqlalchemy.orm import Session
+import contextlib
+import os
+from typing import Generator, Iterable, Optional, Sequence, Tuple, TYPE_CHECKING, Union
 
 from databudgie.cli.config import CliConfig, collect_config
 from databudgie.config import BackupConfig, ConfigError, RestoreConfig
-from databudgie.manifest.manager import Manifest
 from databudgie.output import Console, default_console
-from databudgie.storage import StorageBackend
+from databudgie.tracing import span, trace_to
+
+if TYPE_CHECKING:
+    from sqlalchemy.engine import Engine
+    from sqlalchemy.orm import Session
+
+    from databudgie.manifest.manager import Manifest
+    from databudgie.storage import StorageBackend
 
 
 def root_config(
@@ -50,36 +57,62 @@ def root_config(
 
 
 def backup(
-    db: Session,
+    db: Union[Session, Engine],
     config: BackupConfig,
     console: Console = default_console,
     manifest: Optional[Manifest] = None,
     transaction_id: Optional[int] = None,
     stats: bool = False,
     dry_run: bool = False,
+    resume: bool = False,
+    stats_json: Optional[str] = None,
+    stats_prometheus: Optional[str] = None,
+    profile: Optional[str] = None,
+    trace: Optional[str] = None,
+    data_db: Sequence[Union[Session, Engine]] = (),
 ):
-    """Perform backup."""
+    """Perform backup.
+
+    `db` may be an `Engine` rather than a `Session`, in which case its connection
+    pool is shared with the caller.
+
+    Table data is exported from `data_db` (i.e. read replicas), when given, rather
+    than `db`. DDL and sequences are always read from `db`, the sequences only once
+    the data is exported (so that they are at least as far along as the exported rows).
+    """
     from databudgie.backup import backup_all
+    from databudgie.profiling import PhaseProfiler
+    from databudgie.storage import StorageBackend
 
     if manifest and transaction_id:
         manifest.set_transaction_id(transaction_id)
 
+    if resume and not config.checkpoint:
+        raise ConfigError("--resume requires a `checkpoint` location to be configured")
+
     storage = StorageBackend.from_config(
         config,
         manifest=manifest,
-        record_stats=stats,
+        record_stats=bool(stats or stats_json or stats_prometheus),
         perform_writes=not dry_run,
+        profiler=PhaseProfiler(directory=profile, operation="backup") if profile else None,
     )
 
+    if config.checkpoint:
+        storage.start_checkpoint(config.checkpoint, resume=resume, console=console)
+
     try:
-        backup_all(db, config, storage=storage, console=console)
+        with trace_to(trace), span("backup"), session_for(db) as session, contextlib.ExitStack() as stack:
+            data_sessions = [stack.enter_context(session_for(data)) for data in data_db]
+            backup_all(session, config, storage=storage, console=console, dry_run=dry_run, data_sessions=data_sessions)
     finally:
-        if stats:
-            storage.print_stats()
+        report_stats(storage, "backup", stats=stats, stats_json=stats_json, stats_prometheus=stats_prometheus)
+        if storage.profiler:
+            storage.profiler.print_summary(console)
 
 
 def restore(
-    db: Session,
+    db: Union[Session, Engine],
     config: RestoreConfig,
     console: Console,
     manifest: Optional[Manifest] = None,
@@ -87,9 +120,19 @@ def restore(
     clean: Optional[bool] = None,
     stats: bool = False,
     dry_run: bool = False,
+    stats_json: Optional[str] = None,
+    stats_prometheus: Optional[str] = None,
+    profile: Optional[str] = None,
+    trace: Optional[str] = None,
 ):
-    """Perform restore."""
+    """Perform restore.
+
+    `db` may be an `Engine` rather than a `Session`, in which case its connection
+    pool is shared with the caller.
+    """
+    from databudgie.profiling import PhaseProfiler
     from databudgie.restore import restore_all
+    from databudgie.storage import StorageBackend
 
     if manifest and transaction_id:
         manifest.set_transaction_id(transaction_id)
@@ -102,12 +145,50 @@ def restore(
     storage = StorageBackend.from_config(
         config,
         manifest=manifest,
-        record_stats=stats,
+        record_stats=bool(stats or stats_json or stats_prometheus),
         perform_writes=not dry_run,
+        profiler=PhaseProfiler(directory=profile, operation="restore") if profile else None,
     )
 
     try:
-        restore_all(db, restore_config=config, storage=storage, console=console)
+        with trace_to(trace), span("restore"), session_for(db) as session:
+            restore_all(session, restore_config=config, storage=storage, console=console)
     finally:
-        if stats:
-            storage.print_stats()
+        report_stats(storage, "restore", stats=stats, stats_json=stats_json, stats_prometheus=stats_prometheus)
+        if storage.profiler:
+            storage.profiler.print_summary(console)
+
+
+@contextlib.contextmanager
+def session_for(db: Union[Session, Engine]) -> Generator[Session, None, None]:
+    """Produce a session for `db`, creating (and closing) one when given an `Engine`."""
+    from sqlalchemy.engine import Engine
+    from sqlalchemy.orm import Session
+
+    if not isinstance(db, Engine):
+        yield db
+        return
+
+    session = Session(bind=db)
+    try:
+        yield session
+    finally:
+        session.close()
+
+
+def report_stats(
+    storage: StorageBackend,
+    operation: str,
+    *,
+    stats: bool = False,
+    stats_json: Optional[str] = None,
+    stats_prometheus: Optional[str] = None,
+):
+    if stats:
+        storage.print_stats()
+
+    if stats_json:
+        storage.write_stats(stats_json, operation=operation, format="json")
+
+    if stats_prometheus:
+        storage.write_stats(stats_prometheus, operation=operation, format="prometheus")
@@ -1,16 +1,24 @@
 from __future__ import annotations
 
+import contextlib
+import functools
 import io
+import itertools
 import json
-from typing import Sequence
+from typing import ContextManager, Iterator, Sequence
 
 from sqlalchemy.orm import Session
 
 from databudgie.adapter import Adapter
+from databudgie.adapter.base import Partition, QueryResult
 from databudgie.config import BackupConfig, BackupTableConfig
 from databudgie.output import Console, default_console, Progress
+from databudgie.schedule import run_largest_first
+from databudgie.stats import format_bytes
 from databudgie.storage import FileTypes, StorageBackend
 from databudgie.table_op import expand_table_ops, TableOp
+from databudgie.throttle import Throttle, throttled
+from databudgie.tracing import span
 from databudgie.utils import capture_failures
 
 
@@ -19,6 +27,8 @@ def backup_all(
     backup_config: BackupConfig,
     storage: StorageBackend | None = None,
     console: Console = default_console,
+    dry_run: bool = False,
+    data_sessions: Sequence[Session] = (),
 ):
     """Perform backup on all tables in the config.
 
@@ -27,45 +37,86 @@ def backup_all(
         backup_config: config object mapping table names to their query and location.
         storage: Storage backend to use for backing up the data.
         console: Console used for output
+        dry_run: Estimate the size of each table's data, rather than reading it.
+        data_sessions: Sessions (i.e. with read replicas) to export table data from, in turn,
+            rather than `session`. DDL and sequences are always read from `session`, with the
+            sequences read after the data, so that they are never behind the exported rows.
     """
     if storage is None:
         storage = StorageBackend.from_config(backup_config)
     adapter = Adapter.get_adapter(session, backup_config.adapter)
+    adapter.block_size = backup_config.block_size
+
+    data_adapters = [Adapter.get_adapter(data_session, backup_config.adapter) for data_session in data_sessions]
+    for data_adapter in data_adapters:
+        data_adapter.block_size = backup_config.block_size
+
+    with storage.record_phase("planning"):
+        existing_tables = adapter.collect_existing_tables()
+        table_ops = expand_table_ops(
+            session,
+            backup_config.tables,
+            existing_tables,
+            storage=storage,
+            console=console,
+            warn_for_unused_tables=True,
+        )
+
+        table_ops = adapter.materialize_table_dependencies(
+            table_ops,
+            restrict_rows=True,
+            console=console,
+        )
+
+    with storage.record_phase("ddl"):
+        backup_ddl(
+            backup_config,
+            table_ops,
+            adapter=adapter,
+            storage=storage,
+            console=console,
+        )
+
+    def sequences_phase():
+        with storage.record_phase("sequences"):
+            backup_sequences(
+                table_ops,
+                adapter=adapter,
+                storage=storage,
+                console=console,
+            )
 
-    existing_tables = adapter.collect_existing_tables()
-    table_ops = expand_table_ops(
-        session,
-        backup_config.tables,
-        existing_tables,
-        storage=storage,
-        console=console,
-        warn_for_unused_tables=True,
-    )
+    # A replica keeps replaying the primary's writes while its data is exported, so the data
+    # may hold ids allocated after the backup started. The sequences are read from the primary
+    # once the data is exported, so that they are at least as far along as any exported row.
+    sequences_last = bool(data_adapters)
+    if not sequences_last:
+        sequences_phase()
+
+    with storage.record_phase("data"):
+        if dry_run:
+            estimate_tables(
+                table_ops,
+                adapter=adapter,
+                storage=storage,
+                throughput=backup_config.estimated_throughput,
+                console=console,
+            )
+        else:
+            backup_tables(
+                table_ops=table_ops,
+                adapter=adapter,
+                storage=storage,
+                parallelism=backup_config.parallelism,
+                throttle=Throttle.from_config(backup_config.throttle),
+                data_adapters=data_adapters,
+                console=console,
+            )
 
-    table_ops = adapter.materialize_table_dependencies(
-        table_ops,
-        console=console,
-    )
+    if sequences_last:
+        sequences_phase()
 
-    backup_ddl(
-        backup_config,
-        table_ops,
-        adapter=adapter,
-        storage=storage,
-        console=console,
-    )
-    backup_sequences(
-        table_ops,
-        adapter=adapter,
-        storage=storage,
-        console=console,
-    )
-    backup_tables(
-        table_ops=table_ops,
-        adapter=adapter,
-        storage=storage,
-        console=console,
-    )
+    storage.finish_checkpoint()
 
 
 def backup_ddl(
@@ -103,6 +154,9 @@ def backup_ddl(
         for schema_op in schemas:
             progress.update(task, description=f"Backing up schema DDL: {schema_op.name}")
 
+            if storage.check_checkpoint(schema_op.full_path("ddl"), file_type=FileTypes.ddl, name=schema_op.name):
+                continue
+
             buffer = io.BytesIO(adapter.export_schema_ddl(schema_op.name))
             filename = storage.write_buffer(
                 schema_op.full_path("ddl"),
@@ -120,6 +174,11 @@ def backup_ddl(
                 continue
 
             progress.update(task, description=f"Backing up DDL: {table_op.pretty_name}")
+            table_names.append(table_op.full_name)
+
+            if storage.check_checkpoint(table_op.full_path("ddl"), file_type=FileTypes.ddl, name=table_op.full_name):
+                continue
+
             result = adapter.export_table_ddl(table_op.full_name)
 
             filename = storage.write_buffer(
@@ -130,8 +189,8 @@ def backup_ddl(
             )
 
             console.trace(f"Wrote {table_op.pretty_name} to {filename}")
-            table_names.append(table_op.full_name)
 
+    storage.save_checkpoint()
     console.info("Finished backing up DDL")
 
     # On the restore-side, the tables may not already exist (at the extreme, you
@@ -171,6 +230,11 @@ def backup_sequences(
             if not sequences:
                 continue
 
+            if storage.check_checkpoint(
+                table_op.full_path("sequences"), file_type=FileTypes.sequences, name=table_op.full_name
+            ):
+                continue
+
             sequence_values = {}
             for sequence in sequences:
                 sequence_values[sequence] = adapter.collect_sequence_value(sequence)
@@ -186,6 +250,7 @@ def backup_sequences(
 
             console.trace(f"Wrote {table_op.pretty_name} sequences to {filename}")
 
+    storage.save_checkpoint()
     console.info("Finished backing up sequence positions")
 
 
@@ -194,26 +259,176 @@ def backup_tables(
     storage: StorageBackend,
     *,
     adapter: Adapter,
+    parallelism: int = 1,
+    throttle: Throttle | None = None,
+    data_adapters: Sequence[Adapter] = (),
     console: Console = default_console,
 ) -> None:
+    """Back up the data of each of `table_ops`.
+
+    With a `parallelism` above 1, that many tables are backed up at once (each over
+    a session of its own), starting with the largest tables so that the backup does
+    not finish with one large table being backed up alone.
+
+    Each table's data is exported through the next of the `data_adapters` (i.e. read
+    replicas) in turn, when given, rather than `adapter`.
+    """
+    replicas = itertools.cycle(data_adapters) if data_adapters else None
+
     with Progress(console) as progress:
         task = progress.add_task("Backing up tables", total=len(table_ops))
 
-        for table_op in table_ops:
+        def backup_table(table_op: TableOp, adapter: Adapter):
             progress.update(task, description=f"Backing up table: {table_op.pretty_name}")
 
+            with capture_failures(strict=table_op.raw_conf.strict), span("table", table=table_op.full_name):
+                partitions = adapter.collect_partitions(table_op.full_name) if table_op.full_name else []
+                adapter.release_session()
+
+                if partitions:
+                    backup_partitions(
+                        table_op,
+                        partitions,
+                        storage=storage,
+                        adapter=adapter,
+                        throttle=throttle,
+                        replicas=replicas,
+                        console=console,
+                    )
+                else:
+                    with exporting_adapter(adapter, replicas) as exporter:
+                        backup(
+                            table_op=table_op,
+                            storage=storage,
+                            adapter=exporter,
+                            throttle=throttle,
+                            console=console,
+                        )
+
+        data_table_ops = []
+        for table_op in table_ops:
+            if table_op.raw_conf.data:
+                data_table_ops.append(table_op)
+            elif parallelism > 1:
+                progress.update(task, description=f"Backing up table: {table_op.pretty_name}")
+
+        if parallelism > 1:
+            sizes = adapter.collect_table_sizes(
+                [table_op.full_name for table_op in data_table_ops if table_op.full_name]
+            )
+
+            def backup_worker(index: int):
+                with adapter.worker() as worker:
+                    backup_table(data_table_ops[index], worker)
+
+            run_largest_first(
+                backup_worker,
+                {index: sizes.get(table_op.full_name or "", 0) for index, table_op in enumerate(data_table_ops)},
+                parallelism=parallelism,
+                thread_name_prefix="databudgie-table",
+            )
+        else:
+            for table_op in table_ops:
+                if not table_op.raw_conf.data:
+                    progress.update(task, description=f"Backing up table: {table_op.pretty_name}")
+                    continue
+
+                backup_table(table_op, adapter)
+
+    console.info("Finished backing up tables")
+
+
+def estimate_tables(
+    table_ops: Sequence[TableOp],
+    storage: StorageBackend,
+    *,
+    adapter: Adapter,
+    throughput: int,
+    console: Console = default_console,
+) -> None:
+    """Estimate the rows, size and duration of backing up each table's data, without reading any of it.
+
+    Durations assume the data is backed up at `throughput` bytes per second.
+    """
+    total_rows = total_size = 0
+    with Progress(console) as progress:
+        task = progress.add_task("Estimating tables", total=len(table_ops))
+
+        for table_op in table_ops:
+            progress.update(task, description=f"Estimating table: {table_op.pretty_name}")
+
             if not table_op.raw_conf.data:
                 continue
 
             with capture_failures(strict=table_op.raw_conf.strict):
-                backup(
-                    table_op=table_op,
-                    storage=storage,
-                    adapter=adapter,
-                    console=console,
+                estimate = adapter.estimate_table(table_op)
+                seconds = estimate.size / throughput if estimate.size is not None else None
+                storage.record_estimate(table_op.full_name, rows=estimate.rows, size=estimate.size, seconds=seconds)
+
+                total_rows += estimate.rows or 0
+                total_size += estimate.size or 0
+                console.trace(
+                    f"Estimated {table_op.pretty_name} at {estimate.rows} rows, {format_bytes(estimate.size)}"
                 )
 
-    console.info("Finished backing up tables")
+    console.info(
+        f"Estimated {total_rows:,} rows ({format_bytes(total_size)}), taking ~{total_size / throughput:.0f}s to back up"
+    )
+
+
+def backup_partitions(
+    table_op: TableOp[BackupTableConfig],
+    partitions: Sequence[Partition],
+    *,
+    adapter: Adapter,
+    storage: StorageBackend,
+    throttle: Throttle | None = None,
+    replicas: Iterator[Adapter] | None = None,
+    console: Console = default_console,
+):
+    """Back up the leaf `partitions` of a partitioned table, `partition_parallelism` at a time (largest first).
+
+    Each partition is backed up as though it were a table of its own (see
+    `TableOp.partition`), rather than as a single `COPY` of the whole table through
+    its parent. Every partition is attempted, even if an earlier one fails. The
+    first failure is raised once all of them have been attempted.
+    """
+    partition_ops = [table_op.partition(partition.name) for partition in partitions if partition.leaf]
+    sizes = adapter.collect_table_sizes(
+        [partition_op.full_name for partition_op in partition_ops if partition_op.full_name]
+    )
+    adapter.release_session()
+
+    errors: list[Exception] = []
+
+    def backup_partition(index: int):
+        partition_op = partition_ops[index]
+        with span("partition", table=partition_op.full_name):
+            try:
+                with exporting_adapter(adapter, replicas) as exporter:
+                    backup(table_op=partition_op, adapter=exporter, storage=storage, throttle=throttle, console=console)
+            except Exception as e:
+                errors.append(e)
+
+    # The largest partitions are started first, so the last to finish is not a large one.
+    run_largest_first(
+        backup_partition,
+        {index: sizes.get(partition_op.full_name or "", 0) for index, partition_op in enumerate(partition_ops)},
+        parallelism=table_op.raw_conf.partition_parallelism,
+        thread_name_prefix="databudgie-partition",
+    )
+
+    if errors:
+        raise errors[0]
+
+
+def exporting_adapter(adapter: Adapter, replicas: Iterator[Adapter] | None) -> ContextManager[Adapter]:
+    """Choose the adapter to export a table's data through: the next of the `replicas` (if any), or else `adapter`."""
+    if replicas is None:
+        return contextlib.nullcontext(adapter)
+
+    # Replicas are shared by concurrent exports, so each export is given a session of its own.
+    return next(replicas).worker()
 
 
 def backup(
@@ -221,6 +436,7 @@ def backup(
     table_op: TableOp[BackupTableConfig],
     adapter: Adapter,
     storage: StorageBackend,
+    throttle: Throttle | None = None,
     console: Console = default_console,
 ):
     """Dump query contents to S3 as a CSV file.
@@ -230,29 +446,66 @@ def backup(
         table_op: The table operation being acted up on.
         adapter: the selected behavior adapter
         storage: the storage backend to use for backing up the data.
+        throttle: the limits on the rate and concurrency of exports, shared by all tables.
         console: Console used for output
     """
     compression = table_op.raw_conf.compression
 
-    path_exists = storage.path_exists(
+    if storage.check_checkpoint(
         table_op.full_path(),
         file_type=FileTypes.data,
         name=table_op.full_name,
         compression=compression,
-    )
-
-    if table_op.raw_conf.skip_if_exists and path_exists:
-        console.trace(f"Skipping {table_op.pretty_name} due to `skip_if_exists`")
+    ):
+        console.trace(f"Skipping {table_op.pretty_name}, which was completed by the resumed backup")
         return
 
-    buffer = adapter.export_query(table_op.query())
+    storage.discard_incomplete(table_op.full_path(), name=table_op.full_name, compression=compression)
 
-    filename = storage.write_buffer(
+    path_exists = storage.path_exists(
         table_op.full_path(),
-        buffer,
         file_type=FileTypes.data,
         name=table_op.full_name,
         compression=compression,
     )
 
+    if table_op.raw_conf.skip_if_exists and path_exists:
+        console.trace(f"Skipping {table_op.pretty_name} due to `skip_if_exists`")
+        return
+
+    throttle = throttle or Throttle()
+    with throttle.export_slot() as waited:
+        storage.record_throttled(table_op.full_name, "exports", waited)
+
+        if table_op.raw_conf.skip_if_unchanged:
+            # The digest of the whole content is required before anything can be written.
+            buffer = QueryResult()
+            with storage.record_stage("query", name=table_op.full_name), buffer.binary_buffer() as raw_buffer:
+                chunks = adapter.stream_table(table_op, buffer)
+                record_wait = functools.partial(storage.record_throttled, table_op.full_name, "read")
+                for chunk in throttled(chunks, throttle.read, record_wait):
+                    raw_buffer.write(chunk)
+
+            filename = storage.write_buffer(
+                table_op.full_path(),
+                buffer,
+                file_type=FileTypes.data,
+                name=table_op.full_name,
+                compression=compression,
+                skip_if_unchanged=True,
+                checksum=table_op.raw_conf.checksum,
+                throttle=throttle,
+            )
+        else:
+            result = QueryResult()
+            filename = storage.write_stream(
+                table_op.full_path(),
+                adapter.stream_table(table_op, result),
+                result=result,
+                name=table_op.full_name,
+                compression=compression,
+                checksum=table_op.raw_conf.checksum,
+                throttle=throttle,
+            )
+
     console.trace(f"Wrote {table_op.pretty_name} to {filename}")
@@ -0,0 +1,54 @@
+from __future__ import annotations
+
+import json
+from dataclasses import dataclass, field
+from datetime import datetime
+
+
+@dataclass
+class Checkpoint:
+    """Record the files written by a backup, so that an interrupted backup can be resumed.
+
+    Each unit of work (a table's DDL, sequences, or data) is identified by the
+    concrete path it is written to. Because a resumed backup reuses the original
+    backup's `timestamp`, those paths are stable across runs. Once the backup
+    completes, the checkpoint is marked `finished`, so that it is not resumed.
+
+    Examples:
+        >>> checkpoint = Checkpoint(timestamp=datetime(2021, 4, 26, 9))
+        >>> checkpoint.record("backups/public.foo/2021-04-26T09:00:00.csv")
+        >>> "backups/public.foo/2021-04-26T09:00:00.csv" in checkpoint
+        True
+
+        >>> checkpoint.finished = True
+        >>> restored = Checkpoint.from_bytes(checkpoint.to_bytes())
+        >>> restored == checkpoint
+        True
+    """
+
+    timestamp: datetime
+    completed: set[str] = field(default_factory=set)
+    finished: bool = False
+
+    def __contains__(self, path: str) -> bool:
+        return path in self.completed
+
+    def record(self, path: str):
+        self.completed.add(path)
+
+    def to_bytes(self) -> bytes:
+        data = {
+            "timestamp": self.timestamp.isoformat(),
+            "completed": sorted(self.completed),
+            "finished": self.finished,
+        }
+        return json.dumps(data, indent=2).encode("utf-8")
+
+    @classmethod
+    def from_bytes(cls, content: bytes) -> Checkpoint:
+        data = json.loads(content)
+        return cls(
+            timestamp=datetime.fromisoformat(data["timestamp"]),
+            completed=set(data.get("completed", [])),
+            finished=data.get("finished", False),
+        )
@@ -0,0 +1,77 @@
+from __future__ import annotations
+
+import hashlib
+import io
+from typing import IO
+
+
+class ChecksumError(ValueError):
+    """Raised when restored content does not match the digest recorded at backup time."""
+
+
+class VerifyingReader(io.BufferedIOBase):
+    r"""Hash the content of `stream` as it is read, and verify it once the end is reached.
+
+    The content is only verified when it has been read in its entirety, so a
+    truncated or corrupted file fails at the end of its (single) read, rather
+    than requiring a separate pass over the data.
+
+    Examples:
+        >>> digest = hashlib.sha256(b"id,name\n1,foo\n").hexdigest()
+        >>> reader = VerifyingReader(io.BytesIO(b"id,name\n1,foo\n"), digest, path="foo.csv")
+        >>> reader.read()
+        b'id,name\n1,foo\n'
+
+        >>> reader = VerifyingReader(io.BytesIO(b"id,name\n1,f"), digest, path="foo.csv")
+        >>> reader.readline()
+        b'id,name\n'
+        >>> reader.read()  # doctest: +IGNORE_EXCEPTION_DETAIL
+        Traceback (most recent call last):
+        ChecksumError: foo.csv does not match its recorded checksum
+    """
+
+    def __init__(self, stream: IO[bytes], digest: str, *, path: str):
+        self.stream = stream
+        self.digest = digest
+        self.path = path
+
+        self.hasher = hashlib.sha256()
+
+    def readable(self) -> bool:
+        return True
+
+    def seekable(self) -> bool:
+        return self.stream.seekable()
+
+    def tell(self) -> int:
+        return self.stream.tell()
+
+    def seek(self, offset: int, whence: int = io.SEEK_SET) -> int:
+        position = self.stream.seek(offset, whence)
+        if position != 0:
+            raise io.UnsupportedOperation("Checksummed content can only be rewound to the start")
+
+        self.hasher = hashlib.sha256()
+        return position
+
+    def read(self, size: int | None = -1) -> bytes:
+        if size == 0:
+            return b""
+
+        data = self.stream.read(-1 if size is None else size)
+        self.hasher.update(data)
+
+        if not data or size is None or size < 0:
+            self.verify()
+        return data
+
+    def read1(self, size: int = -1) -> bytes:
+        return self.read(size)
+
+    def verify(self):
+        if self.hasher.hexdigest() != self.digest:
+            raise ChecksumError(f"{self.path} does not match its recorded checksum")
+
+    def close(self):
+        self.stream.close()
+        super().close()
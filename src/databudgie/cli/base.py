@@ -1,36 +1,41 @@
 from __future__ import annotations
 
-from typing import Callable
-
 import click
-import sqlalchemy
-import sqlalchemy.engine.url
-import sqlalchemy.orm
 import strapp.click
 
 from databudgie.config import BackupConfig, Connection, RestoreConfig, RootConfig
 from databudgie.output import Console
 
-version = getattr(sqlalchemy, "__version__", "")
 
-URLType = Callable[..., sqlalchemy.engine.url.URL]
+def _create_postgres_session(config: BackupConfig | RestoreConfig):
+    import sqlalchemy
+    import sqlalchemy.orm
+
+    engine = _create_engine(config, config.connection)
+    session = sqlalchemy.orm.scoping.scoped_session(sqlalchemy.orm.session.sessionmaker(bind=engine))()
+
+    if config.idle_in_transaction_timeout is not None:
+        session.execute(
+            sqlalchemy.text(f"SET idle_in_transaction_session_timeout = '{config.idle_in_transaction_timeout}s'")
+        )
+
+    return session
 
-if version.startswith("1.4") or version.startswith("2."):
-    create_url: URLType = sqlalchemy.engine.url.URL.create
-else:
-    create_url = sqlalchemy.engine.url.URL
 
+def _create_engine(config: BackupConfig | RestoreConfig, connection: str | Connection):
+    # SQLAlchemy is only imported once a command requires a connection, so that
+    # commands which do not (i.e. `config`, `--help`) start quickly.
+    import sqlalchemy
+    import sqlalchemy.engine.url
 
-def _create_postgres_session(config: BackupConfig | RestoreConfig):
-    connection: str | Connection = config.connection
-    if isinstance(config.connection, str):
-        if config.connection in config.connections:
+    if isinstance(connection, str):
+        if connection in config.connections:
             # `connection` can either be a connection's name, or a literal connection string. We need
             # to only overwrite the `connection` value if there is a correspondingly named connection
-            connection = config.connections[config.connection]
+            connection = config.connections[connection]
         else:
             raise click.UsageError(
-                f"'{config.connection}' did not resolve to a connection. 'url' or 'connection' must "
+                f"'{connection}' did not resolve to a connection. 'url' or 'connection' must "
                 "resolve to a named connection or connection details."
             )
 
@@ -38,19 +43,17 @@ def _create_postgres_session(config: BackupConfig | RestoreConfig):
     url = connection.url
 
     if isinstance(url, dict):
-        url_obj = create_url(**url)
+        version = getattr(sqlalchemy, "__version__", "")
+        if version.startswith("1.4") or version.startswith("2."):
+            url_obj = sqlalchemy.engine.url.URL.create(**url)
+        else:
+            url_obj = sqlalchemy.engine.url.URL(**url)
     else:
         url_obj = sqlalchemy.engine.url.make_url(url)
 
-    engine = sqlalchemy.create_engine(url_obj)
-    session = sqlalchemy.orm.scoping.scoped_session(sqlalchemy.orm.session.sessionmaker(bind=engine))()
-
-    if config.idle_in_transaction_timeout is not None:
-        session.execute(
-            sqlalchemy.text(f"SET idle_in_transaction_session_timeout = '{config.idle_in_transaction_timeout}s'")
-        )
-
-    return session
+    # The pool is shared by the session and the connections used to stream each table's
+    # data (and to rebuild indexes in parallel), so it must accommodate all of them.
+    return sqlalchemy.create_engine(url_obj, **config.pool.engine_options())
 
 
 def backup_config(root_config: RootConfig):
@@ -69,6 +72,10 @@ def backup_db(backup_config: BackupConfig):
     return _create_postgres_session(backup_config)
 
 
+def backup_data_db(backup_config: BackupConfig):
+    return [_create_engine(backup_config, connection) for connection in backup_config.data_connection]
+
+
 def restore_db(restore_config: RestoreConfig):
     return _create_postgres_session(restore_config)
 
@@ -94,6 +101,7 @@ def restore_manifest(restore_config: RestoreConfig, restore_db):
 resolver = strapp.click.Resolver(
     backup_config=backup_config,
     backup_db=backup_db,
+    backup_data_db=backup_data_db,
     backup_manifest=backup_manifest,
     restore_config=restore_config,
     restore_db=restore_db,
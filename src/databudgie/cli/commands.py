@@ -1,7 +1,8 @@
-from typing import Iterable, Optional, Tuple
+from __future__ import annotations
+
+from typing import Iterable, Optional, Tuple, TYPE_CHECKING
 
 import click
-from sqlalchemy.orm import Session
 
 from databudgie import api
 from databudgie.cli.base import resolver
@@ -15,9 +16,14 @@ from databudgie.config import (
     RestoreConfig,
     RootConfig,
 )
-from databudgie.manifest.manager import Manifest
 from databudgie.output import Console
 
+if TYPE_CHECKING:
+    from sqlalchemy.engine import Engine
+    from sqlalchemy.orm import Session
+
+    from databudgie.manifest.manager import Manifest
+
 
 @resolver.group()
 @click.option("--strict/--no-strict", is_flag=True, default=None)
@@ -63,11 +69,35 @@ from databudgie.output import Console
     is_flag=True,
     help="Print high level statistics about what the command did. Automatically implied by --dry-run!",
 )
+@click.option(
+    "--stats-json",
+    default=None,
+    help="Write per-table and per-phase timings, sizes and throughput to this path, as JSON.",
+)
+@click.option(
+    "--stats-prometheus",
+    default=None,
+    help="Write per-table and per-phase timings, sizes and throughput to this path, as a Prometheus textfile.",
+)
+@click.option(
+    "--profile",
+    default=None,
+    help="Profile each phase of the run, writing the profiles to this directory and printing the hotspots.",
+)
+@click.option(
+    "--trace",
+    default=None,
+    help="Record a timeline of the run (phases, tables, catalog queries, storage calls) to this path, as JSON lines.",
+)
 @click.option(
     "--dry-run/--no-dry-run",
     default=None,
     is_flag=True,
-    help="Do not actually perform the write operations of the backup/restore. It **does**, however, execute the queries.",
+    help=(
+        "Do not actually perform the write operations of the backup/restore. It **does**, however, execute the "
+        "restore's queries. A backup reads no table data; rather, each table's rows, size and duration are "
+        "estimated from the database's statistics."
+    ),
 )
 @click.option(
     "--raw-config",
@@ -95,6 +125,10 @@ def cli(
     location: Optional[str] = None,
     dry_run: bool = False,
     stats: bool = False,
+    stats_json: Optional[str] = None,
+    stats_prometheus: Optional[str] = None,
+    profile: Optional[str] = None,
+    trace: Optional[str] = None,
     raw_config: Optional[str] = None,
     raw_config_format: str = "json",
 ):
@@ -122,18 +156,34 @@ def cli(
         console=Console(verbosity=verbose),
         dry_run=bool(dry_run),
         stats=stats if stats is not None else dry_run,
+        stats_json=stats_json,
+        stats_prometheus=stats_prometheus,
+        profile=profile,
+        trace=trace,
     )
 
 
 @resolver.command(cli, "backup")
 @click.option("--backup-id", default=None, help="Backup manifest id.")
+@click.option(
+    "--resume",
+    is_flag=True,
+    default=False,
+    help="Resume the backup recorded by the configured `checkpoint`, skipping any already completed files.",
+)
 def backup_cli(
     backup_config: BackupConfig,
     backup_db: Session,
+    backup_data_db: list[Engine],
     console: Console,
     backup_manifest: Optional[Manifest] = None,
     backup_id: Optional[int] = None,
+    resume: bool = False,
     stats: bool = False,
+    stats_json: Optional[str] = None,
+    stats_prometheus: Optional[str] = None,
+    profile: Optional[str] = None,
+    trace: Optional[str] = None,
     dry_run: bool = False,
 ):
     """Perform backup."""
@@ -141,15 +191,24 @@ def backup_cli(
         api.backup(
             backup_db,
             backup_config,
+            data_db=backup_data_db,
             manifest=backup_manifest,
             console=console,
             stats=stats,
             dry_run=dry_run,
             transaction_id=backup_id,
+            resume=resume,
+            stats_json=stats_json,
+            stats_prometheus=stats_prometheus,
+            profile=profile,
+            trace=trace,
         )
     except Exception as e:
         console.trace(e)
         raise click.ClickException(str(e))
+    finally:
+        for engine in backup_data_db:
+            engine.dispose()
 
 
 @resolver.command(cli, "restore")
@@ -176,6 +235,10 @@ def restore_cli(
     clean: Optional[bool] = None,
     yes: bool = False,
     stats: bool = False,
+    stats_json: Optional[str] = None,
+    stats_prometheus: Optional[str] = None,
+    profile: Optional[str] = None,
+    trace: Optional[str] = None,
     dry_run: bool = False,
 ):
     """Perform restore."""
@@ -194,6 +257,10 @@ def restore_cli(
             clean=clean,
             stats=stats,
             dry_run=dry_run,
+            stats_json=stats_json,
+            stats_prometheus=stats_prometheus,
+            profile=profile,
+            trace=trace,
         )
     except Exception as e:
         console.trace(e)
@@ -10,9 +10,6 @@ from typing import Iterable, MutableMapping
 
 import click
 from configly import Config, loaders
-from rich.console import Console
-from rich.syntax import Syntax
-from ruamel.yaml import YAML
 
 from databudgie.config import Config as DatabudgieConfig
 from databudgie.config import ConfigStack, RootConfig
@@ -156,6 +153,10 @@ def collect_raw_config(*, format: str, content: str | None = None, file: str | N
 
 def pretty_print(config: DatabudgieConfig):
     """Pretty print a config model."""
+    from rich.console import Console
+    from rich.syntax import Syntax
+    from ruamel.yaml import YAML
+
     console = Console()
     buffer = io.StringIO()
 
@@ -1,6 +1,10 @@
 import gzip
 import io
-from typing import ClassVar, Dict, Optional, Type
+import zlib
+from typing import ClassVar, Dict, Iterable, Iterator, Optional, Type
+
+# Produces (and expects) a gzip, rather than zlib, container.
+GZIP_WBITS = 16 + zlib.MAX_WBITS
 
 
 class Compressor:
@@ -31,6 +35,16 @@ class Compressor:
     def extract(buffer):
         return buffer
 
+    @staticmethod
+    def compress_stream(chunks: Iterable[bytes]) -> Iterable[bytes]:
+        """Compress `chunks` incrementally, as they are produced."""
+        return chunks
+
+    @staticmethod
+    def extract_stream(chunks: Iterable[bytes]) -> Iterable[bytes]:
+        """Decompress `chunks` incrementally, as they are produced."""
+        return chunks
+
 
 class GzipCompressor(Compressor):
     name: str = "gzip"
@@ -47,3 +61,30 @@ class GzipCompressor(Compressor):
     @staticmethod
     def extract(buffer):
         return gzip.open(buffer, mode="rb")
+
+    @staticmethod
+    def compress_stream(chunks: Iterable[bytes]) -> Iterator[bytes]:
+        compressor = zlib.compressobj(wbits=GZIP_WBITS)
+        for chunk in chunks:
+            if compressed := compressor.compress(chunk):
+                yield compressed
+
+        yield compressor.flush()
+
+    @staticmethod
+    def extract_stream(chunks: Iterable[bytes]) -> Iterator[bytes]:
+        decompressor = zlib.decompressobj(wbits=GZIP_WBITS)
+        for chunk in chunks:
+            while chunk:
+                if data := decompressor.decompress(chunk):
+                    yield data
+
+                if not decompressor.eof:
+                    break
+
+                # Like `gzip.open`, support content made of concatenated gzip members.
+                chunk = decompressor.unused_data
+                decompressor = zlib.decompressobj(wbits=GZIP_WBITS)
+
+        if data := decompressor.flush():
+            yield data
@@ -104,6 +104,206 @@ class DDLConfig(Config):
         return join_paths(self.location, self.filename)
 
 
+@dataclass
+class FastLoadConfig(Config):
+    enabled: bool = False
+    maintenance_work_mem: str = "1GB"
+    validate_foreign_keys: bool = True
+
+    @classmethod
+    def from_dict(cls, fast_load_config: dict | bool | str | None):
+        if fast_load_config is None:
+            return cls()
+
+        if not isinstance(fast_load_config, dict):
+            return cls(enabled=parse_bool(fast_load_config, name="fast_load"))
+
+        final_fast_load_config = {"enabled": True, **fast_load_config}
+        for key in ("enabled", "validate_foreign_keys"):
+            if key in final_fast_load_config:
+                final_fast_load_config[key] = parse_bool(final_fast_load_config[key], name=f"fast_load.{key}")
+
+        return from_partial(cls, **final_fast_load_config)
+
+    def session_settings(self) -> dict[str, str]:
+        """Produce the session settings applied to connections loading data.
+
+        Examples:
+            >>> FastLoadConfig(enabled=True).session_settings()
+            {'session_replication_role': 'replica', 'synchronous_commit': 'off', 'maintenance_work_mem': '1GB'}
+
+            >>> FastLoadConfig().session_settings()
+            {}
+        """
+        if not self.enabled:
+            return {}
+
+        return {
+            # Disables triggers, including those which enforce foreign keys.
+            "session_replication_role": "replica",
+            "synchronous_commit": "off",
+            "maintenance_work_mem": self.maintenance_work_mem,
+        }
+
+
+@dataclass
+class PrefetchConfig(Config):
+    tables: int = 2
+    memory: int = 256 * 1024**2
+    disk: int = 0
+    directory: str | None = None
+
+    @classmethod
+    def from_dict(cls, prefetch_config: dict | bool | int | None):
+        if prefetch_config is None:
+            return cls()
+
+        if isinstance(prefetch_config, bool):
+            return cls() if prefetch_config else cls(tables=0)
+
+        if isinstance(prefetch_config, int):
+            return cls(tables=prefetch_config)
+
+        tables = prefetch_config.get("tables")
+        return from_partial(
+            cls,
+            tables=int(tables) if tables is not None else None,
+            memory=parse_size(prefetch_config.get("memory")),
+            disk=parse_size(prefetch_config.get("disk")),
+            directory=prefetch_config.get("directory"),
+        )
+
+
+@dataclass
+class ThrottleConfig(Config):
+    # The bytes per second read from the database, and written to storage (respectively).
+    read: int | None = None
+    write: int | None = None
+
+    # The number of tables (or partitions) exported at once.
+    exports: int | None = None
+
+    @classmethod
+    def from_dict(cls, throttle_config: dict | None):
+        if not throttle_config:
+            return cls()
+
+        exports = throttle_config.get("exports")
+        config = from_partial(
+            cls,
+            read=parse_size(throttle_config.get("read")),
+            write=parse_size(throttle_config.get("write")),
+            exports=int(exports) if exports is not None else None,
+        )
+        for name in ("read", "write", "exports"):
+            value = getattr(config, name)
+            if value is not None and value <= 0:
+                raise ConfigError(f"`throttle.{name}` must be positive")
+        return config
+
+
+@dataclass
+class SampleConfig(Config):
+    percent: float | None = None
+    rows: int | None = None
+    method: str = "system"
+    seed: int | None = None
+
+    @classmethod
+    def from_dict(cls, sample_config: dict | str | int | None) -> SampleConfig | None:
+        if sample_config is None or sample_config is False:
+            return None
+
+        if sample_config is True:
+            raise ConfigError("`sample` requires a `percent` and/or a number of `rows`")
+
+        if isinstance(sample_config, int):
+            sample_config = {"rows": sample_config}
+        elif isinstance(sample_config, str) and sample_config.strip().endswith("%"):
+            sample_config = {"percent": sample_config}
+        elif not isinstance(sample_config, dict):
+            raise ConfigError(
+                f"Invalid sample '{sample_config}', expected a percentage (i.e. `1%`), or a number of rows"
+            )
+
+        method = sample_config.get("method", cls.method)
+        if method not in ("system", "bernoulli"):
+            raise ConfigError(f"Invalid sample method '{method}', expected 'system' or 'bernoulli'")
+
+        rows = sample_config.get("rows")
+        seed = sample_config.get("seed")
+        sample = from_partial(
+            cls,
+            percent=parse_percent(sample_config.get("percent")),
+            rows=int(rows) if rows is not None else None,
+            method=method,
+            seed=int(seed) if seed is not None else None,
+        )
+        if sample.percent is None and sample.rows is None:
+            raise ConfigError("`sample` requires a `percent` and/or a number of `rows`")
+        return sample
+
+
+@dataclass
+class PoolConfig(Config):
+    size: int = 5
+    max_overflow: int = 10
+    timeout: int = 30
+    pre_ping: bool = True
+    recycle: int | None = None
+
+    @classmethod
+    def from_dict(cls, pool_config: dict | int | None):
+        if pool_config is None:
+            return cls()
+
+        if isinstance(pool_config, int):
+            return cls(size=pool_config)
+
+        recycle = pool_config.get("recycle")
+        pre_ping = pool_config.get("pre_ping")
+        return from_partial(
+            cls,
+            size=pool_config.get("size"),
+            max_overflow=pool_config.get("max_overflow"),
+            timeout=pool_config.get("timeout"),
+            pre_ping=bool(pre_ping) if pre_ping is not None else None,
+            recycle=int(recycle) if recycle is not None else None,
+        )
+
+    def limit(self) -> int | None:
+        """Produce the most connections the pool will open at once, if it is bounded.
+
+        Examples:
+            >>> PoolConfig().limit()
+            15
+
+            >>> PoolConfig(max_overflow=-1).limit() is None
+            True
+        """
+        if self.max_overflow < 0:
+            return None
+        return self.size + self.max_overflow
+
+    def engine_options(self) -> dict[str, Any]:
+        """Produce the keyword arguments to `create_engine` which configure its pool.
+
+        Examples:
+            >>> PoolConfig(recycle=3600).engine_options()
+            {'pool_size': 5, 'max_overflow': 10, 'pool_timeout': 30, 'pool_pre_ping': True, 'pool_recycle': 3600}
+
+            >>> PoolConfig().engine_options()["pool_recycle"]
+            -1
+        """
+        return {
+            "pool_size": self.size,
+            "max_overflow": self.max_overflow,
+            "pool_timeout": self.timeout,
+            "pool_pre_ping": self.pre_ping,
+            "pool_recycle": self.recycle if self.recycle is not None else -1,
+        }
+
+
 # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # #
 # Core configuration models
 # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # #
@@ -134,14 +334,19 @@ class TableParentConfig(typing.Generic[T], Config):
     tables: list[T]
     connections: dict[str, Connection | str]
     ddl: DDLConfig
+    fast_load: FastLoadConfig
 
     connection: Connection | str = "default"
     manifest: str | None = None
+    checkpoint: str | None = None
 
     s3: S3Config | None = None
     root_location: str | None = None
     adapter: str | None = None
     idle_in_transaction_timeout: int | None = None
+    pool: PoolConfig = field(default_factory=PoolConfig)
+    block_size: int = 1024 * 1024
+    parallelism: int = 1
 
     @classmethod
     @abc.abstractmethod
@@ -160,7 +365,10 @@ class TableParentConfig(typing.Generic[T], Config):
         # manifest defauls to None
         manifest: str | None = stack.get("manifest")
 
+        checkpoint = normalize_checkpoint(stack.get("checkpoint"), root_location)
+
         ddl = DDLConfig.from_dict(stack.get("ddl", {}), root_location)
+        fast_load = FastLoadConfig.from_dict(stack.get("fast_load"))
 
         # Optional integration configs
         s3 = S3Config.from_dict(stack.get("s3"))
@@ -170,19 +378,51 @@ class TableParentConfig(typing.Generic[T], Config):
         connections = Connection.from_collection(stack.get("connections"))
 
         idle_in_transaction_timeout = stack.get("idle_in_transaction_timeout")
+        pool = PoolConfig.from_dict(stack.get("pool"))
+        block_size = parse_size(stack.get("block_size"))
+        if block_size is not None and block_size <= 0:
+            raise ConfigError("`block_size` must be positive")
 
-        return cls(
+        parallelism = stack.get("parallelism")
+        if parallelism is not None and parallelism < 1:
+            raise ConfigError("`parallelism` must be at least 1")
+
+        config = from_partial(
+            cls,
             connection=connection,
             tables=tables,
             manifest=manifest,
+            checkpoint=checkpoint,
             s3=s3,
             ddl=ddl,
+            fast_load=fast_load,
             root_location=root_location,
             adapter=adapter,
             connections=connections,
             idle_in_transaction_timeout=idle_in_transaction_timeout,
+            pool=pool,
+            block_size=block_size,
+            parallelism=parallelism,
         )
 
+        # The default pool grows (through overflow connections, which are only opened as
+        # needed) to accommodate the parallelism, but a configured pool is taken as a limit.
+        limit = config.pool.limit()
+        required = config.max_connections()
+        if limit is not None and required > limit:
+            if stack.get("pool") is not None:
+                raise ConfigError(
+                    f"`parallelism` (and the per-table parallelism options) require up to {required} connections "
+                    f"at once, but the `pool` allows at most {limit} (its `size` plus `max_overflow`)"
+                )
+            config.pool.max_overflow = required - config.pool.size
+        return config
+
+    def max_connections(self) -> int:
+        """Produce the most connections used at once: the session's own, plus those of `parallelism` tables."""
+        per_table = max((table.max_connections() for table in self.tables), default=1)
+        return 1 + self.parallelism * per_table
+
 
 @dataclass
 class Connection(Config):
@@ -277,54 +517,116 @@ class TableConfig(Config):
             "strict": bool(stack.get("strict", False)),
         }
 
+    def max_connections(self) -> int:
+        """Produce the most connections used at once to back up (or restore) a single table."""
+        return 1
+
 
 @dataclass
 class BackupTableConfig(TableConfig):
     query: str = "select * from {table}"
     skip_if_exists: bool = False
+    skip_if_unchanged: bool = False
+    checksum: bool = False
+    sample: SampleConfig | None = None
+    partition_parallelism: int = 4
 
     @classmethod
     def from_stack(cls, stack: ConfigStack, root_location: str | None = None):
         values = cls.collect_values(stack, root_location)
 
+        partition_parallelism = stack.get("partition_parallelism")
         return from_partial(
             cls,
             **values,
             query=stack.get("query"),
             skip_if_exists=bool(stack.get("skip_if_exists", False)),
+            skip_if_unchanged=bool(stack.get("skip_if_unchanged", False)),
+            checksum=bool(stack.get("checksum", False)),
+            sample=SampleConfig.from_dict(stack.get("sample")),
+            partition_parallelism=int(partition_parallelism) if partition_parallelism is not None else None,
         )
 
+    def max_connections(self) -> int:
+        # The partitions of a partitioned table are each exported over a connection of their own.
+        return max(self.partition_parallelism, 1)
+
 
 @dataclass
 class BackupConfig(TableParentConfig[BackupTableConfig]):
+    # The assumed rate (bytes/s) at which table data is backed up, to estimate durations in dry runs.
+    estimated_throughput: int = 50 * 1024 * 1024
+    throttle: ThrottleConfig = field(default_factory=ThrottleConfig)
+
+    # The connections (i.e. read replicas) which table data is exported from, rather than `connection`.
+    data_connection: list[Connection | str] = field(default_factory=list)
+
     @classmethod
     def get_child_class(cls):
         return BackupTableConfig
 
+    @classmethod
+    def from_stack(cls, stack: ConfigStack):
+        config = super().from_stack(stack)
+        estimated_throughput = parse_size(stack.get("estimated_throughput"))
+        if estimated_throughput is not None:
+            if estimated_throughput <= 0:
+                raise ConfigError("`estimated_throughput` must be positive")
+            config.estimated_throughput = estimated_throughput
+        config.throttle = ThrottleConfig.from_dict(stack.get("throttle"))
+        config.data_connection = normalize_data_connection(stack.get("data_connection"))
+        return config
+
 
 @dataclass
 class RestoreTableConfig(TableConfig):
     strategy: str = "use_latest_filename"
     truncate: bool = False
+    rebuild_indexes: bool = False
+    index_parallelism: int = 4
+    load_parallelism: int = 1
+    verify_checksum: bool = True
 
     @classmethod
     def from_stack(cls, stack: ConfigStack, root_location: str | None = None):
         values = cls.collect_values(stack, root_location)
 
+        index_parallelism = stack.get("index_parallelism")
+        load_parallelism = stack.get("load_parallelism")
         return from_partial(
             cls,
             **values,
             strategy=stack.get("strategy"),
             truncate=stack.get("truncate"),
+            rebuild_indexes=bool(stack.get("rebuild_indexes", False)),
+            index_parallelism=int(index_parallelism) if index_parallelism is not None else None,
+            load_parallelism=int(load_parallelism) if load_parallelism is not None else None,
+            verify_checksum=stack.get("verify_checksum"),
         )
 
+    def max_connections(self) -> int:
+        index_parallelism = self.index_parallelism if self.rebuild_indexes else 1
+        return max(self.load_parallelism, index_parallelism, 1)
+
 
 @dataclass
 class RestoreConfig(TableParentConfig[RestoreTableConfig]):
+    prefetch: PrefetchConfig = field(default_factory=PrefetchConfig)
+
+    # The location of the record of the backups each table was restored from, see `DeltaState`.
+    delta: str | None = None
+
     @classmethod
     def get_child_class(cls):
         return RestoreTableConfig
 
+    @classmethod
+    def from_stack(cls, stack: ConfigStack):
+        config = super().from_stack(stack)
+        config.prefetch = PrefetchConfig.from_dict(stack.get("prefetch"))
+        config.delta = normalize_delta(stack.get("delta"), config.root_location)
+        return config
+
 
 def normalize_table_config(tables_config: list | dict) -> list:
     """Convert the dict-style table declaration into list style.
@@ -369,8 +671,157 @@ class S3Config(Config):
         )
 
 
+def normalize_checkpoint(checkpoint: bool | str | None, root_location: str | None) -> str | None:
+    """Resolve the `checkpoint` option into the location of the checkpoint file.
+
+    Examples:
+        >>> normalize_checkpoint(None, None)
+
+        >>> normalize_checkpoint(True, "s3://bucket")
+        's3://bucket/backups/checkpoint.json'
+
+        >>> normalize_checkpoint("foo/checkpoint.json", None)
+        'foo/checkpoint.json'
+    """
+    if not checkpoint:
+        return None
+
+    location = checkpoint if isinstance(checkpoint, str) else None
+    return compose_root_location(root_location, location, default="backups/checkpoint.json")
+
+
+def normalize_delta(delta: bool | str | None, root_location: str | None) -> str | None:
+    """Resolve the `delta` option into the location of the delta state file.
+
+    Examples:
+        >>> normalize_delta(None, None)
+
+        >>> normalize_delta(True, "s3://bucket")
+        's3://bucket/backups/delta.json'
+
+        >>> normalize_delta("staging/delta.json", None)
+        'staging/delta.json'
+    """
+    if not delta:
+        return None
+
+    location = delta if isinstance(delta, str) else None
+    return compose_root_location(root_location, location, default="backups/delta.json")
+
+
 def compose_root_location(root_location, location, *, default):
     if root_location is None:
         return location or default
 
     return join_paths(root_location, location or default)
+
+
+def parse_bool(value: bool | str, *, name: str) -> bool:
+    """Parse a boolean, given either as a bool or as a string (i.e. from an environment variable).
+
+    Examples:
+        >>> parse_bool("false", name="fast_load")
+        False
+
+        >>> parse_bool("Yes", name="fast_load")
+        True
+
+        >>> parse_bool("replica", name="fast_load")  # doctest: +IGNORE_EXCEPTION_DETAIL
+        Traceback (most recent call last):
+        ConfigError: Invalid `fast_load`: replica, expected true or false
+    """
+    if isinstance(value, bool):
+        return value
+
+    if isinstance(value, str):
+        normalized = value.strip().lower()
+        if normalized in ("true", "yes", "on", "1"):
+            return True
+        if normalized in ("false", "no", "off", "0"):
+            return False
+
+    raise ConfigError(f"Invalid `{name}`: {value}, expected true or false")
+
+
+def parse_percent(percent: float | str | None) -> float | None:
+    """Parse a percentage, given either as a number or with a trailing `%`.
+
+    Examples:
+        >>> parse_percent("1%")
+        1.0
+
+        >>> parse_percent(0.5)
+        0.5
+
+        >>> parse_percent("150%")  # doctest: +IGNORE_EXCEPTION_DETAIL
+        Traceback (most recent call last):
+        ConfigError: Invalid percentage: 150%
+    """
+    if percent is None:
+        return None
+
+    try:
+        value = float(percent.strip().rstrip("%")) if isinstance(percent, str) else float(percent)
+    except ValueError:
+        raise ConfigError(f"Invalid percentage: {percent}")
+
+    if not 0 < value <= 100:
+        raise ConfigError(f"Invalid percentage: {percent}")
+    return value
+
+
+def normalize_data_connection(data_connection: list | str | dict | None) -> list[Connection | str]:
+    """Normalize a single data connection (or list of them) into a list of connections (or their names).
+
+    Examples:
+        >>> normalize_data_connection("replica")
+        ['replica']
+
+        >>> normalize_data_connection(["replica-1", {"name": "replica-2", "host": "replica-2"}])
+        ['replica-1', Connection(name='replica-2', url={'host': 'replica-2'})]
+    """
+    if data_connection is None:
+        return []
+
+    if not isinstance(data_connection, list):
+        data_connection = [data_connection]
+
+    result = []
+    for raw in data_connection:
+        name = raw.get("name", "data") if isinstance(raw, dict) else "data"
+        connection = Connection.from_raw(raw, name=name)
+        if connection is None:
+            raise ConfigError("`data_connection` must be a connection's name, or connection details")
+        result.append(connection)
+    return result
+
+
+def parse_size(size: int | str | None) -> int | None:
+    """Parse a size in bytes, given either as a number or with a (1024-based) unit.
+
+    Examples:
+        >>> parse_size("256MB")
+        268435456
+
+        >>> parse_size("1.5 GB")
+        1610612736
+
+        >>> parse_size(1024)
+        1024
+
+        >>> parse_size("1 parsec")  # doctest: +IGNORE_EXCEPTION_DETAIL
+        Traceback (most recent call last):
+        ConfigError: Invalid size: 1 parsec
+    """
+    if size is None or isinstance(size, int):
+        return size
+
+    units = {"B": 1, "KB": 1024, "MB": 1024**2, "GB": 1024**3, "TB": 1024**4}
+
+    value = size.strip().upper()
+    unit = value.lstrip("0123456789. ")
+    number = value[: len(value) - len(unit)].strip()
+    try:
+        return int(float(number) * units[unit or "B"])
+    except (KeyError, ValueError):
+        raise ConfigError(f"Invalid size: {size}")
@@ -0,0 +1,46 @@
+from __future__ import annotations
+
+import json
+from dataclasses import dataclass, field
+
+
+@dataclass
+class DeltaState:
+    """Record the backup files each table was restored from, so that tables with unchanged backups can be skipped.
+
+    Each file is identified by its path, and its version: the digest of its content
+    when one was recorded (see `checksum`), or otherwise its ETag (or size and
+    modification time, for local files).
+
+    Examples:
+        >>> state = DeltaState()
+        >>> state.record("public.foo", {"backups/public.foo/2021-04-26T09:00:00.csv": "abc123"})
+        >>> state.unchanged("public.foo", {"backups/public.foo/2021-04-26T09:00:00.csv": "abc123"})
+        True
+        >>> state.unchanged("public.foo", {"backups/public.foo/2021-04-27T09:00:00.csv": "def456"})
+        False
+        >>> state.unchanged("public.bar", {})
+        False
+
+        >>> DeltaState.from_bytes(state.to_bytes()) == state
+        True
+    """
+
+    tables: dict[str, dict[str, str]] = field(default_factory=dict)
+
+    def unchanged(self, table: str, files: dict[str, str]) -> bool:
+        return bool(files) and self.tables.get(table) == files
+
+    def record(self, table: str, files: dict[str, str]):
+        self.tables[table] = files
+
+    def discard(self, table: str):
+        self.tables.pop(table, None)
+
+    def to_bytes(self) -> bytes:
+        return json.dumps({"tables": self.tables}, indent=2, sort_keys=True).encode("utf-8")
+
+    @classmethod
+    def from_bytes(cls, content: bytes) -> DeltaState:
+        data = json.loads(content)
+        return cls(tables=data.get("tables", {}))
@@ -6,6 +6,7 @@ import sqlalchemy
 from sqlalchemy import MetaData, Table
 from sqlalchemy.orm import Session
 
+from databudgie.tracing import span
 from databudgie.utils import parse_table
 
 
@@ -50,6 +51,10 @@ class Manifest(metaclass=abc.ABCMeta):
         self._transaction_id = id
 
     def record(self, table_name: str, location: str):
+        with span("manifest.record", table=table_name):
+            self._record(table_name, location)
+
+    def _record(self, table_name: str, location: str):
         self.session.execute(
             self.manifest_table().insert(),
             [
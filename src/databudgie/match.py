@@ -1,5 +1,28 @@
+from __future__ import annotations
+
 import fnmatch
-from typing import Iterable
+import re
+from dataclasses import dataclass, field
+from typing import Iterable, Sequence
+
+GLOB_CHARACTERS = ("*", "?", "[")
+
+
+def compile_patterns(patterns: Iterable[str]) -> re.Pattern | None:
+    """Compile a set of glob patterns into a single regex, which matches a name if any of them would.
+
+    Examples:
+        >>> pattern = compile_patterns(["public.foo*", "*.bar"])
+        >>> [name for name in ["public.food", "other.bar", "other.baz"] if pattern.match(name)]
+        ['public.food', 'other.bar']
+
+        >>> compile_patterns([]) is None
+        True
+    """
+    translated = [fnmatch.translate(pattern) for pattern in patterns]
+    if not translated:
+        return None
+    return re.compile("|".join(translated))
 
 
 def expand_table_globs(existing_tables: Iterable[str], pattern: str):
@@ -9,12 +32,52 @@ def expand_table_globs(existing_tables: Iterable[str], pattern: str):
         >>> expand_table_globs(["foo", "bar", "food", "football"], "foo*")
         ['foo', 'food', 'football']
     """
-    new_tables = []
-    for fq_table_name in existing_tables:
-        match = fnmatch.fnmatch(fq_table_name, pattern)
-        if not match:
-            continue
+    regex = compile_patterns([pattern])
+    assert regex
+    return sorted(fq_table_name for fq_table_name in existing_tables if regex.match(fq_table_name))
+
+
+@dataclass
+class TableMatcher:
+    """An index of the existing tables, which expands many patterns without scanning every table for each.
+
+    Patterns naming a literal table are looked up directly, and patterns with a
+    literal schema (i.e. `public.*`) only scan the tables in that schema. Only
+    patterns which glob the schema itself scan all tables.
+
+    Examples:
+        >>> matcher = TableMatcher.from_tables(["public.foo", "public.bar", "other.foo"])
+        >>> matcher.expand("public.*")
+        ['public.bar', 'public.foo']
+        >>> matcher.expand("*.foo")
+        ['other.foo', 'public.foo']
+        >>> matcher.expand("other.foo")
+        ['other.foo']
+    """
+
+    tables: Sequence[str]
+    table_set: frozenset[str] = field(default_factory=frozenset)
+    schemas: dict[str, list[str]] = field(default_factory=dict)
+
+    @classmethod
+    def from_tables(cls, existing_tables: Iterable[str]):
+        tables = list(existing_tables)
+
+        schemas: dict[str, list[str]] = {}
+        for table in tables:
+            schema, dot, _ = table.partition(".")
+            if dot:
+                schemas.setdefault(schema, []).append(table)
+
+        return cls(tables=tables, table_set=frozenset(tables), schemas=schemas)
+
+    def expand(self, pattern: str) -> list[str]:
+        if not any(char in pattern for char in GLOB_CHARACTERS):
+            return [pattern] if pattern in self.table_set else []
 
-        new_tables.append(fq_table_name)
+        candidates: Iterable[str] = self.tables
+        schema, dot, _ = pattern.partition(".")
+        if dot and not any(char in schema for char in GLOB_CHARACTERS):
+            candidates = self.schemas.get(schema, [])
 
-    return sorted(new_tables)
+        return expand_table_globs(candidates, pattern)
@@ -1,7 +1,6 @@
 from rich import console, progress
 from rich.table import Table
 from rich.theme import Theme
-from rich.traceback import Traceback
 
 
 class Console(console.Console):
@@ -26,6 +25,9 @@ class Console(console.Console):
         return self.log(message, style="error")
 
     def exception(self, e):
+        # Rendering tracebacks pulls in syntax highlighting, which is slow to import.
+        from rich.traceback import Traceback
+
         tb = Traceback.from_exception(type(e), e, e.__traceback__.tb_next, max_frames=1)
         return self.log(tb, style="error")
 
@@ -51,6 +53,5 @@ __all__ = [
     "Console",
     "Progress",
     "Table",
-    "Traceback",
     "default_console",
 ]
@@ -0,0 +1,177 @@
+from __future__ import annotations
+
+import functools
+import queue
+import threading
+import time
+from dataclasses import dataclass, field
+from typing import Any, Callable, Generic, Iterable, Iterator, Optional, TypeVar
+
+from databudgie.tracing import in_context, span
+
+T = TypeVar("T")
+
+_DONE = object()
+
+
+class CancelledError(Exception):
+    """Raised within a stage when another stage of the pipeline has failed."""
+
+
+@dataclass
+class Channel:
+    """A bounded queue between two stages, which gives up once the pipeline is stopped.
+
+    The time each side spends blocked on the other is recorded, so that the time
+    a stage spent working can be separated from the time it spent waiting.
+    """
+
+    stopped: threading.Event
+    maxsize: int = 4
+
+    put_wait: float = 0.0
+    get_wait: float = 0.0
+    queue: queue.Queue = field(init=False)
+
+    def __post_init__(self):
+        self.queue = queue.Queue(maxsize=self.maxsize)
+
+    def put(self, item: Any):
+        start = time.perf_counter()
+        try:
+            while not self.stopped.is_set():
+                try:
+                    self.queue.put(item, timeout=0.05)
+                    return
+                except queue.Full:
+                    continue
+            raise CancelledError()
+        finally:
+            self.put_wait += time.perf_counter() - start
+
+    def get(self) -> Any:
+        start = time.perf_counter()
+        try:
+            while not self.stopped.is_set():
+                try:
+                    return self.queue.get(timeout=0.05)
+                except queue.Empty:
+                    continue
+            raise CancelledError()
+        finally:
+            self.get_wait += time.perf_counter() - start
+
+    def close(self):
+        self.put(_DONE)
+
+    def __iter__(self) -> Iterator:
+        while (item := self.get()) is not _DONE:
+            yield item
+
+
+@dataclass
+class Pipeline(Generic[T]):
+    """Run a `source`, a chain of transforming `stages`, and a `sink`, overlapping each other.
+
+    The source and each stage run on their own thread, connected by bounded
+    channels, so that a slow consumer applies backpressure rather than
+    accumulating memory. The sink runs on the calling thread.
+
+    The first error raised by any stage stops the whole pipeline, and is
+    re-raised by `run`.
+
+    Each stage is given as a `(name, function)` pair. The name is used for its
+    tracing span, and for the time the stage spent working (i.e. excluding time
+    spent waiting on its neighbors), which is recorded in `timings`.
+
+    Examples:
+        >>> pipeline = Pipeline(
+        ...     source=("numbers", lambda: range(5)),
+        ...     stages=[("double", lambda items: (i * 2 for i in items))],
+        ...     sink=("sum", sum),
+        ... )
+        >>> pipeline.run()
+        20
+        >>> list(pipeline.timings)
+        ['numbers', 'double', 'sum']
+    """
+
+    source: tuple[str, Callable[[], Iterable]]
+    sink: tuple[str, Callable[[Iterable], T]]
+    stages: list[tuple[str, Callable[[Iterable], Iterable]]] = field(default_factory=list)
+    maxsize: int = 4
+
+    # Attributes recorded on the span of each stage.
+    attributes: dict[str, Any] = field(default_factory=dict)
+
+    timings: dict[str, float] = field(default_factory=dict)
+
+    def run(self) -> T:
+        stopped = threading.Event()
+        errors: list[BaseException] = []
+
+        channels = [Channel(stopped, maxsize=self.maxsize) for _ in range(len(self.stages) + 1)]
+
+        source_name, source = self.source
+        workers: list[tuple[str, Callable[[], Iterable], Optional[Channel], Channel]] = [
+            (source_name, source, None, channels[0])
+        ]
+        for index, (name, stage) in enumerate(self.stages):
+            workers.append((name, functools.partial(stage, channels[index]), channels[index], channels[index + 1]))
+
+        def work(name: str, produce: Callable[[], Iterable], input: Optional[Channel], output: Channel):
+            start = time.perf_counter()
+            items = None
+            try:
+                with span(name, **self.attributes):
+                    items = iter(produce())
+                    for item in items:
+                        output.put(item)
+                    output.close()
+            except CancelledError:
+                pass
+            except BaseException as e:
+                errors.append(e)
+                stopped.set()
+            finally:
+                # Release any resources (i.e. a database cursor) held by an abandoned generator.
+                close = getattr(items, "close", None)
+                if close:
+                    close()
+                self.record(name, start, input, output)
+
+        threads = [
+            threading.Thread(target=in_context(work), args=worker, name=f"databudgie-{worker[0]}", daemon=True)
+            for worker in workers
+        ]
+        for thread in threads:
+            thread.start()
+
+        sink_name, sink = self.sink
+        start = time.perf_counter()
+        result = None
+        try:
+            with span(sink_name, **self.attributes):
+                result = sink(channels[-1])
+        except CancelledError:
+            pass
+        except BaseException as e:
+            errors.append(e)
+        finally:
+            # Release any stage still blocked on a channel, i.e. if the sink failed.
+            stopped.set()
+            for thread in threads:
+                thread.join()
+            self.record(sink_name, start, channels[-1], None)
+
+        if errors:
+            raise errors[0]
+        return result  # type: ignore
+
+    def record(self, name: str, start: float, input: Optional[Channel], output: Optional[Channel]):
+        elapsed = time.perf_counter() - start
+        if input is not None:
+            elapsed -= input.get_wait
+        if output is not None:
+            elapsed -= output.put_wait
+        self.timings[name] = max(elapsed, 0.0)
@@ -0,0 +1,162 @@
+from __future__ import annotations
+
+import contextlib
+import io
+import tempfile
+from concurrent.futures import Future, ThreadPoolExecutor
+from dataclasses import dataclass, field
+from typing import Callable, Generator, IO, Sequence
+
+from databudgie.config import PrefetchConfig
+from databudgie.output import Console, default_console
+from databudgie.storage import DataFile, StorageBackend
+from databudgie.table_op import TableOp
+from databudgie.tracing import in_context, span
+
+
+@dataclass
+class PrefetchedFile:
+    """A data file of a table (or of one of its partitions), and its content if it was downloaded ahead of time."""
+
+    table_op: TableOp
+    data_file: DataFile
+    content: IO[bytes] | None = None
+
+
+@dataclass
+class Prefetch:
+    table_op: TableOp
+    data_file: DataFile
+    future: Future[IO[bytes]] | None = None
+
+    # The portion of each budget reserved for the download.
+    memory: int = 0
+    disk: int = 0
+
+
+@dataclass
+class Prefetcher:
+    """Download the data of upcoming tables in the background, while earlier tables are loaded.
+
+    Up to `config.tables` tables ahead are downloaded at a time. The data files of each
+    table are found with `find_data_files` (i.e. one per partition, for a partitioned
+    table). Each file is downloaded into memory if it fits within what remains of the
+    `memory` budget, otherwise into a temporary file if it fits within what remains of
+    the `disk` budget. Otherwise, it is left to be downloaded once its table is restored.
+    """
+
+    storage: StorageBackend
+    find_data_files: Callable[[TableOp], list[tuple[TableOp, DataFile]]]
+    config: PrefetchConfig = field(default_factory=PrefetchConfig)
+    console: Console = default_console
+
+    memory_used: int = 0
+    disk_used: int = 0
+
+    pending: dict[str, list[Prefetch]] = field(default_factory=dict)
+    executor: ThreadPoolExecutor | None = None
+
+    def __enter__(self):
+        if self.config.tables > 0:
+            self.executor = ThreadPoolExecutor(self.config.tables, thread_name_prefix="databudgie-prefetch")
+        return self
+
+    def __exit__(self, *_):
+        for name in list(self.pending):
+            self.discard(name)
+
+        if self.executor:
+            self.executor.shutdown()
+            self.executor = None
+
+    def schedule(self, table_ops: Sequence[TableOp]):
+        """Begin downloading the data of the first `config.tables` of the (upcoming) `table_ops`."""
+        if self.executor is None:
+            return
+
+        for table_op in table_ops[: self.config.tables]:
+            name = table_op.full_name
+            if name is None or name in self.pending:
+                continue
+
+            try:
+                data_files = self.find_data_files(table_op)
+            except Exception as e:
+                # The same failure will be reported when the table itself is restored.
+                self.console.trace(f"Unable to prefetch {table_op.pretty_name}: {e}")
+                continue
+
+            prefetches = self.pending[name] = [Prefetch(data_op, data_file) for data_op, data_file in data_files]
+            for prefetch in prefetches:
+                size = prefetch.data_file.size
+                if size <= self.config.memory - self.memory_used:
+                    prefetch.memory = size
+                elif size <= self.config.disk - self.disk_used:
+                    prefetch.disk = size
+                else:
+                    # Too large for what remains of either budget.
+                    continue
+
+                self.memory_used += prefetch.memory
+                self.disk_used += prefetch.disk
+                prefetch.future = self.executor.submit(
+                    in_context(self.download), prefetch.data_file, on_disk=prefetch.disk > 0
+                )
+
+    def download(self, data_file: DataFile, *, on_disk: bool) -> IO[bytes]:
+        content: IO[bytes] = tempfile.TemporaryFile(dir=self.config.directory) if on_disk else io.BytesIO()
+        try:
+            with span("prefetch", path=data_file.path):
+                for chunk in self.storage.choose_storage(data_file.path).read_stream(data_file.path):
+                    content.write(chunk)
+        except BaseException:
+            content.close()
+            raise
+
+        return content
+
+    @contextlib.contextmanager
+    def take(self, name: str) -> Generator[list[PrefetchedFile] | None, None, None]:
+        """Yield the data files of the table `name` (if they were found ahead of time), releasing them on exit.
+
+        The files are released however the context exits, so that a failure to restore the
+        table does not hold onto its portion of the budgets.
+        """
+        prefetches = self.pending.pop(name, None)
+        if prefetches is None:
+            yield None
+            return
+
+        try:
+            yield [
+                PrefetchedFile(table_op=prefetch.table_op, data_file=prefetch.data_file, content=self.result(prefetch))
+                for prefetch in prefetches
+            ]
+        finally:
+            for prefetch in prefetches:
+                self.release(prefetch)
+
+    def result(self, prefetch: Prefetch) -> IO[bytes] | None:
+        if prefetch.future is None:
+            return None
+
+        try:
+            return prefetch.future.result()
+        except Exception as e:
+            # Fall back to downloading the file as it is loaded.
+            self.console.trace(f"Failed to prefetch {prefetch.data_file.path}: {e}")
+            return None
+
+    def discard(self, name: str):
+        """Release the data files of the table `name`, if they have not been taken."""
+        for prefetch in self.pending.pop(name, []):
+            self.release(prefetch)
+
+    def release(self, prefetch: Prefetch):
+        """Close (or cancel) the download of `prefetch`, and return its portion of the budgets."""
+        if prefetch.future and not prefetch.future.cancel():
+            with contextlib.suppress(Exception):
+                prefetch.future.result().close()
+
+        self.memory_used -= prefetch.memory
+        self.disk_used -= prefetch.disk
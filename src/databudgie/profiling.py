@@ -0,0 +1,133 @@
+from __future__ import annotations
+
+import contextlib
+import contextvars
+import cProfile
+import functools
+import os
+import pstats
+import threading
+from dataclasses import dataclass, field
+from typing import Callable, Generator, TypeVar
+
+from databudgie.output import Console, default_console, Table
+
+T = TypeVar("T")
+
+# The phase being profiled (if any), so that work submitted to other threads within it is profiled into it too.
+_active_phase: contextvars.ContextVar[tuple[PhaseProfiler, str] | None] = contextvars.ContextVar(
+    "databudgie_profiled_phase", default=None
+)
+
+
+@dataclass
+class PhaseProfiler:
+    """Profile each phase of a run (i.e. planning, ddl, sequences, data) with cProfile.
+
+    Each phase's profile is written to `{directory}/{operation}-{phase}.prof` as it
+    completes, for inspection with `pstats`, snakeviz, etc.
+
+    Work submitted to other threads during a phase (see `profiled`) is profiled
+    too, and merged into the phase's profile.
+    """
+
+    directory: str
+    operation: str
+    top: int = 15
+
+    profiles: dict[str, list[cProfile.Profile]] = field(default_factory=dict)
+    lock: threading.Lock = field(default_factory=threading.Lock)
+
+    def path(self, phase: str) -> str:
+        return os.path.join(self.directory, f"{self.operation}-{phase}.prof")
+
+    @contextlib.contextmanager
+    def phase(self, phase: str) -> Generator[None, None, None]:
+        profile = cProfile.Profile()
+
+        token = _active_phase.set((self, phase))
+        profile.enable()
+        try:
+            yield
+        finally:
+            profile.disable()
+            _active_phase.reset(token)
+            self.add(phase, profile)
+
+            os.makedirs(self.directory, exist_ok=True)
+            self.stats(phase).dump_stats(self.path(phase))
+
+    def add(self, phase: str, profile: cProfile.Profile):
+        with self.lock:
+            self.profiles.setdefault(phase, []).append(profile)
+
+    def stats(self, phase: str) -> pstats.Stats:
+        """Combine the profiles of each thread which did work in the given phase."""
+        with self.lock:
+            return pstats.Stats(*self.profiles[phase])
+
+    def print_summary(self, console: Console = default_console):
+        """Print the functions which spent the most time, excluding their callees, in each phase."""
+        for phase in self.profiles:
+            stats = self.stats(phase)
+
+            table = Table(title=f"Profile: {phase} ({self.path(phase)})")
+            table.add_column("Function", style="cyan", no_wrap=True)
+            table.add_column("Calls", justify="right")
+            table.add_column("Own (s)", justify="right")
+            table.add_column("Cumulative (s)", justify="right")
+
+            hotspots = sorted(stats.stats.items(), key=lambda item: item[1][2], reverse=True)  # type: ignore
+            for function, (_, calls, own_time, cumulative_time, _) in hotspots[: self.top]:
+                table.add_row(format_function(function), str(calls), f"{own_time:.3f}", f"{cumulative_time:.3f}")
+
+            console.print(table)
+
+
+def profiled(fn: Callable[..., T]) -> Callable[..., T]:
+    """Profile calls to `fn` (i.e. on another thread) into the phase being profiled, if any.
+
+    Before Python 3.12, cProfile only profiles the thread which enabled it, so the
+    phase's own profile would only see the main thread waiting on its workers.
+    From 3.12, it profiles every thread, and no other profile may be enabled alongside it.
+    """
+
+    @functools.wraps(fn)
+    def wrapper(*args, **kwargs) -> T:
+        active = _active_phase.get()
+        if active is None:
+            return fn(*args, **kwargs)
+
+        profile = cProfile.Profile()
+        try:
+            profile.enable()
+        except ValueError:
+            # "Another profiling tool is already active", i.e. the phase's own profile covers this thread.
+            return fn(*args, **kwargs)
+
+        try:
+            return fn(*args, **kwargs)
+        finally:
+            profile.disable()
+            profiler, phase = active
+            profiler.add(phase, profile)
+
+    return wrapper
+
+
+def format_function(function: tuple[str, int, str]) -> str:
+    """Format a pstats function key, shortening paths to their installed package.
+
+    Examples:
+        >>> format_function(("/venv/lib/python3.11/site-packages/databudgie/backup.py", 17, "backup_all"))
+        'databudgie/backup.py:17(backup_all)'
+
+        >>> format_function(("~", 0, "<method 'write' of '_io.BytesIO' objects>"))
+        "<method 'write' of '_io.BytesIO' objects>"
+    """
+    filename, line, name = function
+    if filename == "~":
+        return name
+
+    _, _, short_filename = filename.rpartition("site-packages/")
+    return f"{short_filename}:{line}({name})"
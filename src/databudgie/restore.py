@@ -1,15 +1,20 @@
+import contextlib
+import functools
 import json
-from typing import Optional, Sequence, TYPE_CHECKING, Union
+from typing import ContextManager, Dict, IO, List, Optional, Sequence, Set, Tuple, TYPE_CHECKING, Union
 
 from sqlalchemy.exc import SQLAlchemyError
 from sqlalchemy.orm import Session
 
 from databudgie.adapter import Adapter
-from databudgie.config import RestoreConfig
+from databudgie.config import PrefetchConfig, RestoreConfig
 from databudgie.output import Console, default_console, Progress
-from databudgie.storage import FileTypes, StorageBackend
+from databudgie.prefetch import PrefetchedFile, Prefetcher
+from databudgie.schedule import run_largest_first
+from databudgie.storage import DataFile, FileTypes, StorageBackend
 from databudgie.table_op import expand_table_ops, SchemaOp, TableOp
-from databudgie.utils import capture_failures, wrap_buffer
+from databudgie.tracing import span
+from databudgie.utils import capture_failures
 
 if TYPE_CHECKING:
     pass
@@ -26,56 +31,78 @@ def restore_all(
         storage = StorageBackend.from_config(restore_config)
 
     adapter = Adapter.get_adapter(session, restore_config.adapter)
+    adapter.load_settings = restore_config.fast_load.session_settings()
+    adapter.block_size = restore_config.block_size
+
+    if restore_config.delta:
+        storage.start_delta(restore_config.delta, reset=restore_config.ddl.clean, console=console)
 
     if restore_config.ddl.clean:
         console.warn("Cleaning database")
         adapter.reset_database()
 
-    restore_all_ddl(
-        session,
-        restore_config,
-        storage=storage,
-        adapter=adapter,
-        console=console,
-    )
-
-    console.trace("Collecting existing tables")
-    existing_tables = adapter.collect_existing_tables()
-
-    table_ops = expand_table_ops(
-        session,
-        restore_config.tables,
-        existing_tables,
-        storage=storage,
-        console=console,
-        warn_for_unused_tables=True,
-    )
-
-    table_ops = adapter.materialize_table_dependencies(
-        table_ops,
-        console=console,
-        reverse=True,
-    )
-
-    restore_sequences(
-        session,
-        table_ops,
-        storage=storage,
-        adapter=adapter,
-        console=console,
-    )
-    truncate_tables(
-        list(reversed(table_ops)),
-        adapter=adapter,
-        console=console,
-    )
-    restore_tables(
-        session,
-        table_ops,
-        storage=storage,
-        adapter=adapter,
-        console=console,
-    )
+    with storage.record_phase("ddl"):
+        restore_all_ddl(
+            session,
+            restore_config,
+            storage=storage,
+            adapter=adapter,
+            console=console,
+        )
+
+    with storage.record_phase("planning"):
+        console.trace("Collecting existing tables")
+        existing_tables = adapter.collect_existing_tables()
+
+        table_ops = expand_table_ops(
+            session,
+            restore_config.tables,
+            existing_tables,
+            storage=storage,
+            console=console,
+            warn_for_unused_tables=True,
+        )
+
+        table_ops = adapter.materialize_table_dependencies(
+            table_ops,
+            console=console,
+            reverse=True,
+        )
+
+    with storage.record_phase("sequences"):
+        restore_sequences(
+            session,
+            table_ops,
+            storage=storage,
+            adapter=adapter,
+            console=console,
+        )
+    with storage.record_phase("data"):
+        unchanged_tables = find_unchanged_tables(table_ops, adapter=adapter, storage=storage)
+        if unchanged_tables:
+            console.info(
+                f"Skipping {len(unchanged_tables)} table(s) whose backups are unchanged since their last restore"
+            )
+            table_ops = [table_op for table_op in table_ops if table_op.full_name not in unchanged_tables]
+
+        truncate_tables(
+            list(reversed(table_ops)),
+            adapter=adapter,
+            console=console,
+        )
+        restore_tables(
+            session,
+            table_ops,
+            storage=storage,
+            adapter=adapter,
+            prefetch=restore_config.prefetch,
+            parallelism=restore_config.parallelism,
+            foreign_keys_enforced=not restore_config.fast_load.enabled,
+            console=console,
+        )
+
+        if restore_config.fast_load.enabled and restore_config.fast_load.validate_foreign_keys:
+            validate_foreign_keys(table_ops, adapter=adapter, console=console)
 
 
 def restore_all_ddl(
@@ -157,6 +184,10 @@ def restore_ddl(
 
     adapter.execute_sql(query, commit=True)
 
+    if storage.delta and isinstance(op, TableOp) and op.full_name:
+        # The table was created empty, so is loaded regardless of whether its backups changed.
+        storage.delta.discard(op.full_name)
+
 
 def restore_sequences(
     session: Session,
@@ -191,6 +222,37 @@ def restore_sequences(
     session.commit()
 
 
+def find_unchanged_tables(table_ops: Sequence[TableOp], *, adapter: Adapter, storage: StorageBackend) -> Set[str]:
+    """Find the tables whose backups are unchanged since they were last restored (see `DeltaState`).
+
+    A table which references a table being reloaded is reloaded too, as truncating the
+    referenced table cascades to it.
+    """
+    if not storage.delta:
+        return set()
+
+    data_tables = {table_op.full_name for table_op in table_ops if table_op.full_name and table_op.raw_conf.data}
+
+    unchanged = set()
+    for table_op in table_ops:
+        if table_op.full_name not in data_tables:
+            continue
+
+        with capture_failures(strict=table_op.raw_conf.strict):
+            data_files = [data_file for _, data_file in find_data_files(adapter, storage, table_op)]
+            if storage.delta.unchanged(table_op.full_name, storage.file_versions(data_files)):
+                unchanged.add(table_op.full_name)
+
+    references = {
+        table: {foreign_key.referenced_table for foreign_key in adapter.collect_foreign_keys(table)} & data_tables
+        for table in unchanged
+    }
+    while reloaded := {table for table in unchanged if references[table] - unchanged}:
+        unchanged -= reloaded
+
+    return unchanged
+
+
 def truncate_tables(table_ops: Sequence[TableOp], adapter: Adapter, console: Console):
     with Progress(console) as progress:
         task = progress.add_task("Truncating Tables", total=len(table_ops))
@@ -213,27 +275,141 @@ def restore_tables(
     *,
     adapter: Adapter,
     storage: StorageBackend,
+    prefetch: Optional[PrefetchConfig] = None,
+    parallelism: int = 1,
+    foreign_keys_enforced: bool = True,
     console: Console = default_console,
 ) -> None:
-    with Progress(console) as progress:
+    """Restore the data of each of `table_ops`.
+
+    With a `parallelism` above 1, that many tables are restored at once (each over a
+    session of its own), starting with the tables whose backups are largest. While
+    `foreign_keys_enforced`, a table is only started once the tables it references
+    have been restored.
+    """
+    data_table_ops = [table_op for table_op in table_ops if table_op.full_name and table_op.raw_conf.data]
+
+    if parallelism > 1:
+        restore_tables_parallel(
+            data_table_ops,
+            adapter=adapter,
+            storage=storage,
+            parallelism=parallelism,
+            foreign_keys_enforced=foreign_keys_enforced,
+            total=len(table_ops),
+            console=console,
+        )
+        console.info("Finished restoring tables")
+        return
+
+    prefetcher = Prefetcher(
+        storage,
+        functools.partial(find_data_files, adapter, storage),
+        config=prefetch or PrefetchConfig(tables=0),
+        console=console,
+    )
+    with Progress(console) as progress, prefetcher:
         task = progress.add_task("Restoring tables", total=len(table_ops))
 
+        for index, table_op in enumerate(data_table_ops):
+            assert table_op.full_name
+            progress.update(task, description=f"Restoring table: {table_op.full_name}")
+
+            # Download the following tables while this one is loaded.
+            prefetcher.schedule(data_table_ops[index + 1 :])
+
+            with capture_failures(strict=table_op.raw_conf.strict), span("table", table=table_op.full_name):
+                try:
+                    restore(
+                        session,
+                        table_op=table_op,
+                        adapter=adapter,
+                        storage=storage,
+                        prefetcher=prefetcher,
+                        console=console,
+                    )
+                finally:
+                    # Unless the table's files were taken, i.e. if it failed first.
+                    prefetcher.discard(table_op.full_name)
+
+    console.info("Finished restoring tables")
+
+
+def restore_tables_parallel(
+    table_ops: Sequence[TableOp],
+    *,
+    adapter: Adapter,
+    storage: StorageBackend,
+    parallelism: int,
+    foreign_keys_enforced: bool = True,
+    total: Optional[int] = None,
+    console: Console = default_console,
+) -> None:
+    """Restore `parallelism` of `table_ops` at a time, largest (by the size of their backups) first.
+
+    The backups are found upfront to determine their sizes, and are loaded as they
+    are downloaded, rather than prefetched.
+    """
+    data_files: Dict[int, List[Tuple[TableOp, DataFile]]] = {}
+    for index, table_op in enumerate(table_ops):
+        with capture_failures(strict=table_op.raw_conf.strict):
+            data_files[index] = find_data_files(adapter, storage, table_op)
+
+    dependencies: Dict[int, Set[int]] = {}
+    if foreign_keys_enforced:
+        indexes = {table_ops[index].full_name: index for index in data_files}
+        for index in data_files:
+            table = table_ops[index].full_name
+            assert table
+            referenced = {foreign_key.referenced_table for foreign_key in adapter.collect_foreign_keys(table)}
+            dependencies[index] = {indexes[name] for name in referenced if name in indexes and name != table}
+
+    with Progress(console) as progress:
+        task = progress.add_task("Restoring tables", total=total or len(table_ops))
+
+        def restore_worker(index: int):
+            table_op = table_ops[index]
+            progress.update(task, description=f"Restoring table: {table_op.full_name}")
+
+            with capture_failures(strict=table_op.raw_conf.strict), span("table", table=table_op.full_name):
+                with adapter.worker() as worker:
+                    restore(
+                        worker.session,
+                        table_op=table_op,
+                        adapter=worker,
+                        storage=storage,
+                        data_files=data_files[index],
+                        console=console,
+                    )
+
+        run_largest_first(
+            restore_worker,
+            {index: sum(data_file.size for _, data_file in files) for index, files in data_files.items()},
+            parallelism=parallelism,
+            dependencies=dependencies,
+            thread_name_prefix="databudgie-table",
+        )
+
+
+def validate_foreign_keys(table_ops: Sequence[TableOp], *, adapter: Adapter, console: Console = default_console):
+    """Check the foreign keys of the restored tables, which were not enforced during a `fast_load`."""
+    with Progress(console) as progress:
+        task = progress.add_task("Validating foreign keys", total=len(table_ops))
+
         for table_op in table_ops:
             if not table_op.full_name or not table_op.raw_conf.data:
                 continue
 
-            progress.update(task, description=f"Restoring table: {table_op.full_name}")
+            progress.update(task, description=f"Validating foreign keys: {table_op.full_name}")
 
             with capture_failures(strict=table_op.raw_conf.strict):
-                restore(
-                    session,
-                    table_op=table_op,
-                    adapter=adapter,
-                    storage=storage,
-                    console=console,
-                )
+                violations = adapter.collect_foreign_key_violations(table_op.full_name)
+                invalid = {name: count for name, count in violations.items() if count}
+                if invalid:
+                    details = ", ".join(f"{name} ({count} rows)" for name, count in invalid.items())
+                    raise ValueError(f"{table_op.full_name} violates foreign keys: {details}")
 
-    console.info("Finished restoring tables")
+    console.info("Finished validating foreign keys")
 
 
 def restore(
@@ -242,31 +418,163 @@ def restore(
     adapter: Adapter,
     storage: StorageBackend,
     table_op: TableOp,
+    prefetcher: Optional[Prefetcher] = None,
+    data_files: Optional[List[Tuple[TableOp, DataFile]]] = None,
     console: Console = default_console,
 ) -> None:
-    """Restore a CSV file from S3 to the database."""
+    """Restore a CSV file from S3 to the database.
+
+    A partitioned table is restored from the backups of each of its partitions (see
+    `backup_partitions`), when there are any, rather than from a backup of the table
+    as a whole. The partitions are loaded `load_parallelism` at a time (largest first),
+    sharing that many connections between them.
+
+    The `data_files` to load (see `find_data_files`) can be supplied, when they have
+    already been found, or are otherwise taken from the `prefetcher` (if it found them).
+    """
+    assert table_op.full_name
+
+    prefetched: ContextManager[Optional[List[PrefetchedFile]]]
+    if prefetcher:
+        prefetched = prefetcher.take(table_op.full_name)
+    else:
+        prefetched = contextlib.nullcontext()
+
+    with prefetched as prefetched_files:
+        contents: Dict[str, IO[bytes]] = {}
+        if prefetched_files is not None:
+            data_files = [(prefetched_file.table_op, prefetched_file.data_file) for prefetched_file in prefetched_files]
+            for prefetched_file in prefetched_files:
+                if prefetched_file.content is not None:
+                    contents[prefetched_file.data_file.path] = prefetched_file.content
+        elif data_files is None:
+            data_files = find_data_files(adapter, storage, table_op)
+
+        if not data_files:
+            console.warn(f"Found no backups for {table_op.pretty_name} to restore")
+            return
+
+        parallelism = table_op.raw_conf.load_parallelism
+        failed: List[str] = []
+
+        def load_partition(index: int):
+            assert data_files
+            data_op, op_file = data_files[index]
+            loaded = load_data_file(
+                adapter=adapter,
+                storage=storage,
+                table_op=data_op,
+                data_file=op_file,
+                content=contents.get(op_file.path),
+                parallelism=max(parallelism // len(data_files), 1),
+            )
+            if not loaded:
+                failed.append(op_file.path)
+            console.trace(f"Restored {data_op.pretty_name} from {op_file.path}")
+
+        with indexes_dropped(adapter, table_op, console=console):
+            adapter.release_session()
+            run_largest_first(
+                load_partition,
+                {index: op_file.size for index, (_, op_file) in enumerate(data_files)},
+                parallelism=parallelism,
+                thread_name_prefix="databudgie-partition",
+            )
+            end_load(session, loaded=not failed)
+
+    if not failed:
+        storage.record_delta(table_op.full_name, [op_file for _, op_file in data_files])
+
+
+def find_data_files(adapter: Adapter, storage: StorageBackend, table_op: TableOp) -> List[Tuple[TableOp, DataFile]]:
+    """Find the backups to restore `table_op` from: those of its partitions, or otherwise its own."""
+    partition_files = find_partition_files(adapter, storage, table_op)
+    if partition_files:
+        return partition_files
+
+    data_file = find_data_file(storage, table_op)
+    if data_file is None:
+        return []
+    return [(table_op, data_file)]
+
+
+def find_partition_files(
+    adapter: Adapter, storage: StorageBackend, table_op: TableOp
+) -> List[Tuple[TableOp, DataFile]]:
+    """Find the backups of each leaf partition of `table_op` (if it is partitioned)."""
     assert table_op.full_name
 
-    strategy: str = table_op.raw_conf.strategy
-    compression = table_op.raw_conf.compression
+    partition_files = []
+    for partition in adapter.collect_partitions(table_op.full_name):
+        if not partition.leaf:
+            continue
+
+        partition_op = table_op.partition(partition.name)
+        partition_file = find_data_file(storage, partition_op)
+        if partition_file is not None:
+            partition_files.append((partition_op, partition_file))
+    return partition_files
+
 
-    with storage.get_file_content(
+def find_data_file(storage: StorageBackend, table_op: TableOp) -> Optional[DataFile]:
+    return storage.find_data_file(
         table_op.full_path(),
-        strategy,
-        file_type=FileTypes.data,
+        table_op.raw_conf.strategy,
         name=table_op.full_name,
-        compression=compression,
-    ) as file_object:
-        if not file_object.content:
-            console.warn(f"Found no backups for {table_op.pretty_name} to restore")
-            return
+        compression=table_op.raw_conf.compression,
+        verify_checksum=table_op.raw_conf.verify_checksum,
+    )
+
 
-        with wrap_buffer(file_object.content) as wrapper:
-            try:
-                adapter.import_csv(wrapper, table_op.full_name)
-            except SQLAlchemyError:
-                session.rollback()
-            else:
-                session.commit()
+def indexes_dropped(adapter: Adapter, table_op: TableOp, console: Console = default_console) -> ContextManager[None]:
+    """Drop the secondary indexes of the table for the duration of the context, if `rebuild_indexes` is enabled."""
+    if not table_op.raw_conf.rebuild_indexes:
+        return contextlib.nullcontext()
 
-    console.trace(f"Restored {table_op.pretty_name} from {file_object.path}")
+    assert table_op.full_name
+    return adapter.secondary_indexes_dropped(
+        table_op.full_name,
+        parallelism=table_op.raw_conf.index_parallelism,
+        console=console,
+    )
+
+
+def load_data_file(
+    *,
+    adapter: Adapter,
+    storage: StorageBackend,
+    table_op: TableOp,
+    data_file: DataFile,
+    content: Optional[IO[bytes]] = None,
+    parallelism: Optional[int] = None,
+) -> bool:
+    """Load `data_file` into the table, over `parallelism` connections, returning whether it was loaded.
+
+    The `parallelism` defaults to the table's `load_parallelism`. The load does not touch
+    the adapter's session, so several files may be loaded at once (see `end_load`).
+    """
+    assert table_op.full_name
+    table_name = table_op.full_name
+
+    if parallelism is None:
+        parallelism = table_op.raw_conf.load_parallelism
+
+    try:
+        storage.read_stream(
+            data_file,
+            lambda csv_file: adapter.import_csv(csv_file, table_name, parallelism=parallelism),
+            name=table_name,
+            compression=table_op.raw_conf.compression,
+            content=content,
+        )
+    except SQLAlchemyError:
+        return False
+    return True
+
+
+def end_load(session: Session, *, loaded: bool):
+    """Commit the session once a table's data is loaded, or roll it back if the load failed."""
+    if loaded:
+        session.commit()
+    else:
+        session.rollback()
@@ -0,0 +1,83 @@
+from __future__ import annotations
+
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from typing import Callable, Hashable, Mapping, TypeVar
+
+from databudgie.tracing import in_context
+
+T = TypeVar("T", bound=Hashable)
+
+
+def run_largest_first(
+    work: Callable[[T], object],
+    costs: Mapping[T, float],
+    *,
+    parallelism: int,
+    dependencies: Mapping[T, set[T]] | None = None,
+    thread_name_prefix: str = "databudgie",
+) -> list[T]:
+    """Call `work` for each item of `costs`, `parallelism` at a time, starting the costliest ready item first.
+
+    An item is ready once each of its `dependencies` (among the items) has finished. Starting
+    the costliest items first (i.e. "longest processing time" scheduling) avoids ending
+    the run with one large item running alone, while the rest of the workers sit idle.
+    Dependency cycles are broken by starting the costliest of the remaining items.
+
+    The first failure stops any further items from being started, and is raised once
+    the items already running have finished. Returns the items, in the order they were started.
+
+    Examples:
+        >>> started = run_largest_first(lambda item: None, {"a": 1, "b": 3, "c": 2}, parallelism=1)
+        >>> started
+        ['b', 'c', 'a']
+
+        >>> costs = {"a": 1, "b": 3, "c": 2}
+        >>> run_largest_first(lambda item: None, costs, parallelism=1, dependencies={"b": {"a"}})
+        ['c', 'a', 'b']
+    """
+    dependencies = dependencies or {}
+    order = {item: index for index, item in enumerate(costs)}
+
+    remaining = {item: {d for d in dependencies.get(item, ()) if d in costs and d != item} for item in costs}
+    dependents: dict[T, list[T]] = {}
+    for item, item_dependencies in remaining.items():
+        for dependency in item_dependencies:
+            dependents.setdefault(dependency, []).append(item)
+
+    def priority(item: T):
+        # Ties are started in their original order.
+        return (costs[item], -order[item])
+
+    pending = set(costs)
+    ready = [item for item in costs if not remaining[item]]
+    started: list[T] = []
+    running: dict[Future, T] = {}
+    error: BaseException | None = None
+
+    with ThreadPoolExecutor(max_workers=max(parallelism, 1), thread_name_prefix=thread_name_prefix) as executor:
+        while (error is None and pending) or running:
+            if error is None:
+                if not ready and not running and pending:
+                    ready.append(max(pending, key=priority))
+
+                while ready and len(running) < max(parallelism, 1):
+                    item = max(ready, key=priority)
+                    ready.remove(item)
+                    pending.discard(item)
+                    started.append(item)
+                    running[executor.submit(in_context(work), item)] = item
+
+            done, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in done:
+                item = running.pop(future)
+                if error is None:
+                    error = future.exception()
+
+                for dependent in dependents.get(item, ()):
+                    remaining[dependent].discard(item)
+                    if not remaining[dependent] and dependent in pending and dependent not in ready:
+                        ready.append(dependent)
+
+    if error is not None:
+        raise error
+    return started
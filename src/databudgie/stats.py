@@ -0,0 +1,219 @@
+from __future__ import annotations
+
+import json
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+from typing import Iterable, TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from databudgie.storage import FileTypes
+
+
+@dataclass
+class TableInfo:
+    name: str
+    ddl: bool = False
+    sequences: bool = False
+    data: bool = False
+    rows: int | None = None
+
+    raw_bytes: int | None = None
+    compressed_bytes: int | None = None
+    timings: dict[str, float] = field(default_factory=dict)
+
+    # The seconds spent waiting on each throttle (see `ThrottleConfig`), within the `timings` above.
+    throttled: dict[str, float] = field(default_factory=dict)
+
+    # Set by a dry run, in which `rows` and `raw_bytes` are estimated rather than measured.
+    estimated: bool = False
+    estimated_seconds: float | None = None
+
+    def note_file_type(self, file_type: FileTypes):
+        if file_type == file_type.ddl:
+            self.ddl = True
+        elif file_type == file_type.sequences:
+            self.sequences = True
+        elif file_type == file_type.data:
+            self.data = True
+
+    def add_time(self, stage: str, seconds: float):
+        self.timings[stage] = self.timings.get(stage, 0.0) + seconds
+
+    def add_throttled(self, throttle: str, seconds: float):
+        self.throttled[throttle] = self.throttled.get(throttle, 0.0) + seconds
+
+    @property
+    def seconds(self) -> float:
+        return sum(self.timings.values())
+
+    @property
+    def rows_per_second(self) -> float | None:
+        if self.rows is None or not self.seconds:
+            return None
+        return self.rows / self.seconds
+
+    @property
+    def bytes_per_second(self) -> float | None:
+        if self.raw_bytes is None or not self.seconds:
+            return None
+        return self.raw_bytes / self.seconds
+
+    def to_dict(self) -> dict:
+        return {
+            "name": self.name,
+            "ddl": self.ddl,
+            "sequences": self.sequences,
+            "data": self.data,
+            "rows": self.rows,
+            "raw_bytes": self.raw_bytes,
+            "compressed_bytes": self.compressed_bytes,
+            "stages": self.timings,
+            "seconds": self.seconds,
+            "rows_per_second": self.rows_per_second,
+            "bytes_per_second": self.bytes_per_second,
+            "throttled": self.throttled,
+            "estimated": self.estimated,
+            "estimated_seconds": self.estimated_seconds,
+        }
+
+
+def collect_stages(tables: Iterable[TableInfo]) -> list[str]:
+    """Collect the distinct stages recorded across `tables`, in the order they were first recorded."""
+    stages: dict[str, None] = {}
+    for table in tables:
+        stages.update(dict.fromkeys(table.timings))
+    return list(stages)
+
+
+def format_bytes(size: float | None) -> str:
+    """Format a byte count for humans.
+
+    Examples:
+        >>> format_bytes(None)
+        ''
+        >>> format_bytes(512)
+        '512 B'
+        >>> format_bytes(1536)
+        '1.5 KiB'
+        >>> format_bytes(3 * 1024**3)
+        '3.0 GiB'
+    """
+    if size is None:
+        return ""
+
+    for unit in ("B", "KiB", "MiB", "GiB"):
+        if size < 1024 or unit == "GiB":
+            break
+        size /= 1024
+
+    if unit == "B":
+        return f"{int(size)} {unit}"
+    return f"{size:.1f} {unit}"
+
+
+def json_report(tables: Iterable[TableInfo], phases: dict[str, float], *, operation: str, timestamp: datetime) -> bytes:
+    data = {
+        "operation": operation,
+        "timestamp": timestamp.isoformat(),
+        "phases": phases,
+        "tables": [table.to_dict() for table in tables],
+    }
+    return json.dumps(data, indent=2).encode("utf-8")
+
+
+def prometheus_report(
+    tables: Iterable[TableInfo], phases: dict[str, float], *, operation: str, timestamp: datetime
+) -> bytes:
+    """Render the stats in the Prometheus text exposition format, i.e. for node_exporter's textfile collector.
+
+    Examples:
+        >>> table = TableInfo(name="public.foo", rows=10, raw_bytes=100, timings={"query": 0.5})
+        >>> report = prometheus_report([table], {"data": 0.5}, operation="backup", timestamp=datetime(2021, 4, 26))
+        >>> print(report.decode())
+        # HELP databudgie_last_run_timestamp_seconds When the run started.
+        # TYPE databudgie_last_run_timestamp_seconds gauge
+        databudgie_last_run_timestamp_seconds{operation="backup"} 1619395200.0
+        # HELP databudgie_phase_seconds Wall time spent in each phase of the run.
+        # TYPE databudgie_phase_seconds gauge
+        databudgie_phase_seconds{operation="backup",phase="data"} 0.5
+        # HELP databudgie_table_stage_seconds Wall time spent in each stage of processing a table.
+        # TYPE databudgie_table_stage_seconds gauge
+        databudgie_table_stage_seconds{operation="backup",table="public.foo",stage="query"} 0.5
+        # HELP databudgie_table_throttled_seconds Wall time spent waiting on each throttle for a table.
+        # TYPE databudgie_table_throttled_seconds gauge
+        # HELP databudgie_table_rows Rows processed for a table.
+        # TYPE databudgie_table_rows gauge
+        databudgie_table_rows{operation="backup",table="public.foo"} 10
+        # HELP databudgie_table_bytes Bytes processed for a table, before (raw) and after (compressed) compression.
+        # TYPE databudgie_table_bytes gauge
+        databudgie_table_bytes{operation="backup",table="public.foo",kind="raw"} 100
+    """
+    tables = list(tables)
+    run_labels = {"operation": operation}
+
+    lines = []
+
+    def metric(name: str, help: str, samples: Iterable[tuple[dict[str, str], float | int | None]]):
+        lines.append(f"# HELP {name} {help}")
+        lines.append(f"# TYPE {name} gauge")
+        for labels, value in samples:
+            if value is not None:
+                lines.append(f"{name}{{{format_labels({**run_labels, **labels})}}} {value}")
+
+    # Backup timestamps are naive UTC.
+    epoch = timestamp.replace(tzinfo=timestamp.tzinfo or timezone.utc).timestamp()
+    metric("databudgie_last_run_timestamp_seconds", "When the run started.", [({}, epoch)])
+    metric(
+        "databudgie_phase_seconds",
+        "Wall time spent in each phase of the run.",
+        [({"phase": phase}, seconds) for phase, seconds in phases.items()],
+    )
+    metric(
+        "databudgie_table_stage_seconds",
+        "Wall time spent in each stage of processing a table.",
+        [
+            ({"table": table.name, "stage": stage}, seconds)
+            for table in tables
+            for stage, seconds in table.timings.items()
+        ],
+    )
+    metric(
+        "databudgie_table_throttled_seconds",
+        "Wall time spent waiting on each throttle for a table.",
+        [
+            ({"table": table.name, "throttle": throttle}, seconds)
+            for table in tables
+            for throttle, seconds in table.throttled.items()
+        ],
+    )
+    metric(
+        "databudgie_table_rows",
+        "Rows processed for a table.",
+        [({"table": table.name}, table.rows) for table in tables],
+    )
+    metric(
+        "databudgie_table_bytes",
+        "Bytes processed for a table, before (raw) and after (compressed) compression.",
+        [
+            sample
+            for table in tables
+            for sample in (
+                ({"table": table.name, "kind": "raw"}, table.raw_bytes),
+                ({"table": table.name, "kind": "compressed"}, table.compressed_bytes),
+            )
+        ],
+    )
+    return ("\n".join(lines) + "\n").encode("utf-8")
+
+
+def format_labels(labels: dict[str, str]) -> str:
+    r"""Format Prometheus labels, escaping their values.
+
+    Examples:
+        >>> format_labels({"table": 'public."foo"'})
+        'table="public.\\"foo\\""'
+    """
+    escaped = (
+        (name, value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")) for name, value in labels.items()
+    )
+    return ",".join(f'{name}="{value}"' for name, value in escaped)
@@ -1,30 +1,59 @@
 from __future__ import annotations
 
+import collections
 import contextlib
-import csv
 import enum
 import io
+import itertools
 import os
 import pathlib
 import re
+import threading
+import time
 from dataclasses import dataclass, field
 from datetime import datetime
-from typing import Callable, Generator, Iterable, Optional, TYPE_CHECKING
+from typing import Callable, cast, Generator, IO, Iterable, Iterator, Optional, TYPE_CHECKING, TypeVar
 
 from databudgie.adapter.base import QueryResult
+from databudgie.checkpoint import Checkpoint
+from databudgie.checksum import VerifyingReader
 from databudgie.compression import Compressor
 from databudgie.config import BackupConfig, RestoreConfig
+from databudgie.delta import DeltaState
 from databudgie.manifest.manager import Manifest
 from databudgie.output import Console, default_console, Table
+from databudgie.pipeline import Pipeline
+from databudgie.profiling import PhaseProfiler
 from databudgie.s3 import is_s3_path, optional_s3_resource, S3Location
-from databudgie.utils import join_paths
+from databudgie.stats import collect_stages, format_bytes, json_report, prometheus_report, TableInfo
+from databudgie.throttle import Throttle, throttled
+from databudgie.tracing import span, traced
+from databudgie.utils import ChunkReader, coalesce_chunks, join_paths
+
+T = TypeVar("T")
 
 if TYPE_CHECKING:
     from mypy_boto3_s3.service_resource import Bucket, S3ServiceResource
+    from mypy_boto3_s3.type_defs import CompletedPartTypeDef
 
 DATETIME_FORMAT = r"%Y-%m-%dT%H:%M:%S"
 DATE_FORMAT = r"%Y-%m-%d"
 
+DIGEST_SUFFIX = ".sha256"
+
+# Written in place of a data file whose content is unchanged from a previous backup,
+# followed by the path of the file which contains the data.
+POINTER_PREFIX = b"databudgie:pointer:"
+
+# Pointers are small, so anything larger is known to be data without reading it.
+MAX_POINTER_SIZE = 4096
+
+# The size of each part of a multipart upload to S3 (which requires at least 5 MiB).
+S3_PART_SIZE = 8 * 1024 * 1024
+
+# The size of the chunks in which files are streamed when read.
+READ_CHUNK_SIZE = 1024 * 1024
+
 
 @enum.unique
 class FileTypes(enum.Enum):
@@ -47,12 +76,52 @@ class FileTypes(enum.Enum):
 @dataclass
 class LocalStorage:
     def write_buffer(self, path: str, buffer: io.BytesIO):
+        self.write_stream(path, [buffer.getbuffer()])
+
+    @traced("storage.write", "path")
+    def write_stream(self, path: str, chunks: Iterable[bytes]):
         npath = pathlib.PurePath(path)
 
         parent = npath.parent
         os.makedirs(parent, exist_ok=True)
-        with open(path, "wb") as f:
-            f.write(buffer.getbuffer())
+
+        # Write through a temporary file, so that an interrupted write never
+        # leaves a truncated file at `path`.
+        partial_path = f"{path}.partial"
+        try:
+            with open(partial_path, "wb") as f:
+                for chunk in chunks:
+                    f.write(chunk)
+        except BaseException:
+            with contextlib.suppress(FileNotFoundError):
+                os.remove(partial_path)
+            raise
+
+        os.replace(partial_path, path)
+
+    @traced("storage.read", "path")
+    def read_file(self, path: str) -> io.BytesIO | None:
+        try:
+            with open(path, "rb") as f:
+                return io.BytesIO(f.read())
+        except FileNotFoundError:
+            return None
+
+    def read_stream(self, path: str) -> Iterator[bytes]:
+        with span("storage.read", path=path), open(path, "rb") as f:
+            while chunk := f.read(READ_CHUNK_SIZE):
+                yield chunk
+
+    def file_size(self, path: str) -> int:
+        return os.path.getsize(path)
+
+    def discard_incomplete(self, path: str):
+        with contextlib.suppress(FileNotFoundError):
+            os.remove(f"{path}.partial")
+
+    def file_version(self, path: str) -> str:
+        stat = os.stat(path)
+        return f"{stat.st_size}-{stat.st_mtime_ns}"
 
     def path_exists(self, path: str) -> bool:
         if not os.path.exists("path"):
@@ -60,7 +129,8 @@ class LocalStorage:
 
         return any(dir_entry for dir_entry in os.scandir(path) if dir_entry.is_file())
 
-    def get_file_content(self, path: str, selection_strategy: SelectionStrategy) -> FileObject | None:
+    @traced("storage.find", "path")
+    def find_file(self, path: str, selection_strategy: SelectionStrategy) -> str | None:
         # Pathlib normalizes away any leading `./` or other potential ambiguities that will prevent matching.
         path_str = str(pathlib.PurePath(path))
 
@@ -81,12 +151,14 @@ class LocalStorage:
         if not target_object:
             return None
 
-        buffer = io.BytesIO()
-        with open(target_object.path, "rb") as f:
-            buffer.write(f.read())
-        buffer.seek(0)
+        return str(target_object.path)
 
-        return FileObject(path=str(target_object.path), content=buffer)
+    def get_file_content(self, path: str, selection_strategy: SelectionStrategy) -> FileObject | None:
+        target_path = self.find_file(path, selection_strategy)
+        if target_path is None:
+            return None
+
+        return FileObject(path=target_path, content=self.read_file(target_path))
 
 
 @dataclass
@@ -101,20 +173,106 @@ class S3Storage:
 
         return cls(resource=resource)
 
+    @traced("storage.write", "path")
     def write_buffer(self, path: str, buffer: io.BytesIO):
         s3_location = S3Location(path)
         s3_bucket: Bucket = self.resource.Bucket(s3_location.bucket)
         s3_bucket.put_object(Key=s3_location.key, Body=buffer)
 
+    @traced("storage.write", "path")
+    def write_stream(self, path: str, chunks: Iterable[bytes]):
+        """Upload `chunks` as they are produced.
+
+        Content larger than a single part is sent as a multipart upload, which is
+        aborted if producing the content fails.
+        """
+        s3_location = S3Location(path)
+        client = self.resource.meta.client
+
+        parts = coalesce_chunks(chunks, size=S3_PART_SIZE)
+        first_part = next(parts, b"")
+        second_part = next(parts, None)
+        if second_part is None:
+            client.put_object(Bucket=s3_location.bucket, Key=s3_location.key, Body=first_part)
+            return
+
+        upload = client.create_multipart_upload(Bucket=s3_location.bucket, Key=s3_location.key)
+        upload_id = upload["UploadId"]
+        try:
+            completed_parts: list[CompletedPartTypeDef] = []
+            for number, part in enumerate(itertools.chain([first_part, second_part], parts), start=1):
+                response = client.upload_part(
+                    Bucket=s3_location.bucket, Key=s3_location.key, UploadId=upload_id, PartNumber=number, Body=part
+                )
+                completed_parts.append({"ETag": response["ETag"], "PartNumber": number})
+
+            client.complete_multipart_upload(
+                Bucket=s3_location.bucket,
+                Key=s3_location.key,
+                UploadId=upload_id,
+                MultipartUpload={"Parts": completed_parts},
+            )
+        except BaseException:
+            client.abort_multipart_upload(Bucket=s3_location.bucket, Key=s3_location.key, UploadId=upload_id)
+            raise
+
+    @traced("storage.read", "path")
+    def read_file(self, path: str) -> io.BytesIO | None:
+        from botocore.exceptions import ClientError
+
+        s3_location = S3Location(path)
+        s3_bucket: Bucket = self.resource.Bucket(s3_location.bucket)
+
+        buffer = io.BytesIO()
+        try:
+            s3_bucket.download_fileobj(s3_location.key, buffer)
+        except ClientError as e:
+            if e.response.get("Error", {}).get("Code") in ("404", "NoSuchKey"):
+                return None
+            raise
+
+        buffer.seek(0)
+        return buffer
+
+    def read_stream(self, path: str) -> Iterator[bytes]:
+        s3_location = S3Location(path)
+        with span("storage.read", path=path):
+            response = self.resource.meta.client.get_object(Bucket=s3_location.bucket, Key=s3_location.key)
+            with contextlib.closing(response["Body"]) as body:
+                yield from body.iter_chunks(READ_CHUNK_SIZE)
+
+    def file_size(self, path: str) -> int:
+        s3_location = S3Location(path)
+        response = self.resource.meta.client.head_object(Bucket=s3_location.bucket, Key=s3_location.key)
+        return response["ContentLength"]
+
+    def discard_incomplete(self, path: str):
+        s3_location = S3Location(path)
+        client = self.resource.meta.client
+
+        paginator = client.get_paginator("list_multipart_uploads")
+        for page in paginator.paginate(Bucket=s3_location.bucket, Prefix=s3_location.key):
+            for upload in page.get("Uploads", []):
+                if upload.get("Key") != s3_location.key:
+                    continue
+
+                client.abort_multipart_upload(
+                    Bucket=s3_location.bucket, Key=s3_location.key, UploadId=upload["UploadId"]
+                )
+
+    def file_version(self, path: str) -> str:
+        s3_location = S3Location(path)
+        response = self.resource.meta.client.head_object(Bucket=s3_location.bucket, Key=s3_location.key)
+        return response["ETag"].strip('"')
+
     def path_exists(self, path: str) -> bool:
         s3_location = S3Location(path)
         s3_bucket: Bucket = self.resource.Bucket(s3_location.bucket)
         matching_objects = list(s3_bucket.objects.filter(Prefix=s3_location.key).all())
         return len(matching_objects) >= 1
 
-    def get_file_content(self, path: str, selection_strategy: SelectionStrategy) -> FileObject | None:
-        buffer = io.BytesIO()
-
+    @traced("storage.find", "path")
+    def find_file(self, path: str, selection_strategy: SelectionStrategy) -> str | None:
         # this path.key should be a folder
         s3_location = S3Location(path)
         s3_bucket: Bucket = self.resource.Bucket(s3_location.bucket)
@@ -124,11 +282,14 @@ class S3Storage:
         if not target_object:
             return None
 
-        s3_bucket.download_fileobj(str(target_object.path), buffer)
-        path = f"s3://{s3_location.bucket}/{target_object.path}"
+        return f"s3://{s3_location.bucket}/{target_object.path}"
 
-        buffer.seek(0)
-        return FileObject(path, buffer)
+    def get_file_content(self, path: str, selection_strategy: SelectionStrategy) -> FileObject | None:
+        target_path = self.find_file(path, selection_strategy)
+        if target_path is None:
+            return None
+
+        return FileObject(path=target_path, content=self.read_file(target_path))
 
     def _generate_s3_object_summaries(self, s3_bucket, s3_location):
         parent_path = str(pathlib.PurePath(s3_location.key).parent)
@@ -147,9 +308,21 @@ class StorageBackend:
 
     manifest: Manifest | None = None
     events: dict[str, TableInfo] = field(default_factory=dict)
+    phases: dict[str, float] = field(default_factory=dict)
+
+    checkpoint: Checkpoint | None = None
+    checkpoint_path: str | None = None
+    resuming: bool = False
+
+    delta: DeltaState | None = None
+    delta_path: str | None = None
 
     record_stats: bool = False
     perform_writes: bool = False
+    profiler: PhaseProfiler | None = None
+
+    # Guards the manifest and checkpoint, which files may be recorded to concurrently (i.e. partitions, or parallel tables).
+    lock: threading.Lock = field(default_factory=threading.Lock)
 
     @classmethod
     def from_config(
@@ -158,6 +331,7 @@ class StorageBackend:
         manifest: Manifest | None = None,
         perform_writes=True,
         record_stats=False,
+        profiler: PhaseProfiler | None = None,
     ) -> StorageBackend:
         return cls(
             local_storage=LocalStorage(),
@@ -165,11 +339,136 @@ class StorageBackend:
             manifest=manifest,
             perform_writes=perform_writes,
             record_stats=record_stats,
+            profiler=profiler,
         )
 
     def check_manifest(self, table_name: str):
         return self.manifest and table_name in self.manifest
 
+    def start_checkpoint(self, path: str, *, resume: bool = False, console: Console = default_console):
+        """Begin recording completed files to the checkpoint at `path`.
+
+        When `resume` is set, an existing checkpoint is loaded instead, and its
+        `timestamp` is adopted so that the remaining files are written alongside
+        the files which were already completed. A checkpoint whose backup already
+        finished is not resumed, and a new backup is started instead.
+        """
+        self.checkpoint_path = path
+
+        checkpoint = None
+        if resume:
+            content = self.choose_storage(path).read_file(path)
+            if content is None:
+                console.warn(f"Found no checkpoint at {path} to resume from, starting a new backup")
+            else:
+                checkpoint = Checkpoint.from_bytes(content.getvalue())
+
+        if checkpoint and checkpoint.finished:
+            console.info(
+                f"The backup from {checkpoint.timestamp.strftime(DATETIME_FORMAT)} already finished, "
+                "starting a new backup"
+            )
+            checkpoint = None
+
+        if checkpoint is None:
+            self.checkpoint = Checkpoint(timestamp=self.timestamp)
+            self.save_checkpoint()
+            return
+
+        self.checkpoint = checkpoint
+        self.timestamp = checkpoint.timestamp
+        self.resuming = True
+        console.info(
+            f"Resuming backup from {self.timestamp.strftime(DATETIME_FORMAT)}, "
+            f"{len(self.checkpoint.completed)} file(s) already complete"
+        )
+
+    def finish_checkpoint(self):
+        """Mark the checkpoint (when in use) as finished, so that a later `--resume` starts a new backup."""
+        if not self.checkpoint:
+            return
+
+        with self.lock:
+            self.checkpoint.finished = True
+            self.save_checkpoint()
+
+    def save_checkpoint(self):
+        if not self.checkpoint or not self.checkpoint_path or not self.perform_writes:
+            return
+
+        storage = self.choose_storage(self.checkpoint_path)
+        storage.write_buffer(self.checkpoint_path, io.BytesIO(self.checkpoint.to_bytes()))
+
+    def start_delta(self, path: str, *, reset: bool = False, console: Console = default_console):
+        """Begin recording the backups each table is restored from to the delta state at `path`.
+
+        The existing state (if any) is loaded, so that tables whose backups are
+        unchanged since they were last restored can be skipped (see `DeltaState`).
+        When `reset` (i.e. the database was cleaned), the existing state is ignored.
+        """
+        self.delta_path = path
+
+        content = None if reset else self.choose_storage(path).read_file(path)
+        if content is None:
+            console.info(f"Found no delta state at {path}, restoring all tables")
+            self.delta = DeltaState()
+            return
+
+        self.delta = DeltaState.from_bytes(content.getvalue())
+
+    def save_delta(self):
+        if not self.delta or not self.delta_path or not self.perform_writes:
+            return
+
+        storage = self.choose_storage(self.delta_path)
+        storage.write_buffer(self.delta_path, io.BytesIO(self.delta.to_bytes()))
+
+    def file_versions(self, data_files: Iterable[DataFile]) -> dict[str, str]:
+        """Identify the version of each of `data_files`: its recorded digest, or otherwise its ETag (or mtime)."""
+        return {
+            data_file.path: data_file.digest.digest
+            if data_file.digest
+            else self.choose_storage(data_file.path).file_version(data_file.path)
+            for data_file in data_files
+        }
+
+    def record_delta(self, name: str, data_files: Iterable[DataFile]):
+        """Record the `data_files` the table `name` was restored from, in the delta state (when in use)."""
+        if not self.delta:
+            return
+
+        files = self.file_versions(data_files)
+        with self.lock:
+            self.delta.record(name, files)
+            self.save_delta()
+
+    def check_checkpoint(
+        self,
+        path: str,
+        *,
+        file_type: FileTypes,
+        name: str | None = None,
+        compression: str | None = None,
+    ) -> bool:
+        """Return whether the given file was already written by the checkpointed backup."""
+        if not self.checkpoint:
+            return False
+
+        filename = self.format_path(path, name=name, file_type=file_type, compression=compression)
+        return filename in self.checkpoint
+
+    def discard_incomplete(self, path: str, *, name: str | None = None, compression: str | None = None):
+        """Discard any partial write of the given data file, left behind by the interrupted backup being resumed.
+
+        That is, a local `.partial` file, or an S3 multipart upload which was never
+        completed (and whose parts are otherwise retained, and billed, indefinitely).
+        """
+        if not self.resuming or not self.perform_writes:
+            return
+
+        filename = self.format_path(path, name=name, file_type=FileTypes.data, compression=compression)
+        self.choose_storage(filename).discard_incomplete(filename)
+
     def choose_storage(self, path: str) -> LocalStorage | S3Storage:
         if is_s3_path(path):
             assert self.s3_storage
@@ -187,11 +486,16 @@ class StorageBackend:
         file_type: FileTypes,
         name: str | None = None,
         compression: str | None = None,
+        skip_if_unchanged: bool = False,
+        checksum: bool = False,
+        throttle: Throttle | None = None,
     ):
         if isinstance(_buffer, QueryResult):
             buffer = _buffer.buffer
+            digest = _buffer.digest
         else:
             buffer = _buffer
+            digest = None
 
         if name and self.record_stats:
             table_info = self.events.setdefault(name, TableInfo(name=name))
@@ -202,20 +506,176 @@ class StorageBackend:
                 row_count = _buffer.row_count
                 table_info.rows = row_count
 
-        filename = self.format_path(filename, name=name, file_type=file_type, compression=compression)
+        path = filename
+        filename = self.format_path(path, name=name, file_type=file_type, compression=compression)
 
         if self.perform_writes:
-            final_buffer = Compressor.get_with_name(compression).compress(buffer)
-
             storage = self.choose_storage(filename)
 
-            storage.write_buffer(filename, final_buffer)
+            previous: FileDigest | None = None
+            if skip_if_unchanged and digest:
+                previous = self.find_previous_digest(path, file_type=file_type, name=name, compression=compression)
+
+            if previous and previous.digest == digest:
+                # The content is identical to the previous backup, so only a pointer to
+                # its data is written (unless that data is already at `filename`).
+                file_digest: FileDigest | None = previous
+                if previous.path != filename:
+                    storage.write_buffer(filename, io.BytesIO(POINTER_PREFIX + previous.path.encode("utf-8")))
+            else:
+                file_digest = FileDigest(digest=digest, path=filename) if digest else None
+
+                stage_name = name if file_type == FileTypes.data else None
+                with self.record_stage("compress", name=stage_name):
+                    final_buffer = Compressor.get_with_name(compression).compress(buffer)
+
+                with self.record_stage("upload", name=stage_name):
+                    if throttle and throttle.write:
+                        self.record_throttled(name, "write", throttle.write.acquire(final_buffer.getbuffer().nbytes))
+                    storage.write_buffer(filename, final_buffer)
+
+                if stage_name and self.record_stats:
+                    table_info = self.events[stage_name]
+                    table_info.raw_bytes = buffer.getbuffer().nbytes
+                    table_info.compressed_bytes = final_buffer.getbuffer().nbytes
 
+            if (checksum or skip_if_unchanged) and file_digest:
+                storage.write_buffer(f"{filename}{DIGEST_SUFFIX}", io.BytesIO(file_digest.to_bytes()))
+
+            self.record_completed(filename, file_type=file_type, name=name)
+
+        return filename
+
+    def write_stream(
+        self,
+        filename: str,
+        chunks: Iterable[bytes],
+        *,
+        result: QueryResult,
+        name: str | None = None,
+        compression: str | None = None,
+        checksum: bool = False,
+        throttle: Throttle | None = None,
+    ):
+        """Write the data of the table `name`, compressing and uploading `chunks` as they are produced.
+
+        Producing, compressing and uploading the content each happen concurrently
+        (see `Pipeline`), so that the database is not left idle while the content
+        is written. `result` is populated as the `chunks` are exhausted.
+
+        The `chunks` are read, and the compressed content is uploaded, no faster than
+        the `read` and `write` limits of the `throttle` (if any).
+        """
+        throttle = throttle or Throttle()
+        path = filename
+        filename = self.format_path(path, name=name, file_type=FileTypes.data, compression=compression)
+
+        sizes = {"raw": 0, "compressed": 0}
+
+        def measure(chunks: Iterable[bytes], kind: str) -> Iterable[bytes]:
+            for chunk in chunks:
+                sizes[kind] += len(chunk)
+                yield chunk
+
+        def record_wait(kind: str) -> Callable[[float], None]:
+            return lambda seconds: self.record_throttled(name, kind, seconds)
+
+        def upload(chunks: Iterable[bytes]):
+            chunks = throttled(measure(chunks, "compressed"), throttle.write, record_wait("write"))
+            if self.perform_writes:
+                self.choose_storage(filename).write_stream(filename, chunks)
+            else:
+                collections.deque(chunks, maxlen=0)
+
+        compressor = Compressor.get_with_name(compression)
+        pipeline: Pipeline[None] = Pipeline(
+            source=("query", lambda: throttled(chunks, throttle.read, record_wait("read"))),
+            stages=[("compress", lambda chunks: compressor.compress_stream(measure(chunks, "raw")))],
+            sink=("upload", upload),
+            attributes={"table": name},
+        )
+        pipeline.run()
+
+        if name and self.record_stats:
+            table_info = self.events.setdefault(name, TableInfo(name=name))
+            table_info.note_file_type(FileTypes.data)
+            table_info.rows = result.row_count
+            table_info.raw_bytes = sizes["raw"]
+            table_info.compressed_bytes = sizes["compressed"]
+            for stage, seconds in pipeline.timings.items():
+                table_info.add_time(stage, seconds)
+
+        if self.perform_writes:
+            if checksum and result.digest:
+                file_digest = FileDigest(digest=result.digest, path=filename)
+                self.choose_storage(filename).write_buffer(
+                    f"{filename}{DIGEST_SUFFIX}", io.BytesIO(file_digest.to_bytes())
+                )
+
+            self.record_completed(filename, file_type=FileTypes.data, name=name)
+
+        return filename
+
+    def record_completed(self, filename: str, *, file_type: FileTypes, name: str | None = None):
+        """Record a written file in the manifest and checkpoint (when in use)."""
+        with self.lock:
             # `name` is primarily omitted for things spanning individual tables, like schemas.
             if name and self.manifest and file_type == FileTypes.data:
                 self.manifest.record(name, filename)
 
-        return filename
+            if self.checkpoint:
+                self.checkpoint.record(filename)
+
+                # DDL and sequences are cheap to reproduce, and numerous, so they are
+                # only persisted at the end of their phase (see `save_checkpoint`).
+                if file_type == FileTypes.data:
+                    self.save_checkpoint()
+
+    def find_previous_digest(
+        self,
+        path: str,
+        *,
+        file_type: FileTypes,
+        name: str | None = None,
+        compression: str | None = None,
+    ) -> FileDigest | None:
+        """Find the digest recorded for the most recent existing backup of the given file."""
+        pattern = self.format_path(
+            path, name=name, file_type=file_type, compression=compression, format_timestamp=False
+        )
+        storage = self.choose_storage(pattern)
+
+        previous_path = storage.find_file(pattern, FileSelectionStrategy.use_filename_strategy)
+        if previous_path is None:
+            return None
+
+        return self.read_digest(previous_path)
+
+    def read_digest(self, path: str) -> FileDigest | None:
+        """Read the digest recorded alongside the file at `path`, if there is one."""
+        content = self.choose_storage(path).read_file(f"{path}{DIGEST_SUFFIX}")
+        if content is None:
+            return None
+
+        return FileDigest.from_bytes(content.getvalue())
+
+    def resolve_pointer(self, file_object: FileObject) -> FileObject:
+        """Follow a pointer written in place of unchanged data, to the data it refers to."""
+        content = file_object.content
+        if content is None:
+            return file_object
+
+        prefix = content.read(len(POINTER_PREFIX))
+        if prefix != POINTER_PREFIX:
+            content.seek(0)
+            return file_object
+
+        target_path = content.read().decode("utf-8")
+        target_content = self.choose_storage(target_path).read_file(target_path)
+        if target_content is None:
+            raise FileNotFoundError(f"{file_object.path} refers to {target_path}, which does not exist")
+
+        return FileObject(path=target_path, content=target_content)
 
     def format_path(
         self,
@@ -272,51 +732,211 @@ class StorageBackend:
             table_info = self.events.setdefault(name, TableInfo(name=name))
             table_info.note_file_type(file_type)
 
-            if file_type == FileTypes.data:
-                cbuffer.seek(0)
-                row_count = len(list(csv.DictReader(io.TextIOWrapper(cbuffer))))
-                table_info.rows = row_count
-
-        if self.manifest and self.perform_writes and file_type == file_type.data and name and file_object:
-            self.manifest.record(name, file_object.path)
         cbuffer.close()
 
+    def find_data_file(
+        self,
+        path: str,
+        strategy: str,
+        *,
+        name: str | None = None,
+        compression: str | None = None,
+        verify_checksum: bool = False,
+    ) -> DataFile | None:
+        """Find the file containing the data to restore for the table `name`, following any pointer."""
+        full_path = self.format_path(
+            path, name=name, file_type=FileTypes.data, compression=compression, format_timestamp=False
+        )
+        storage = self.choose_storage(full_path)
+
+        target_path = storage.find_file(full_path, FileSelectionStrategy.by_name(strategy))
+        if target_path is None:
+            return None
+
+        # The digest is recorded alongside the file which was found, even when it is a pointer.
+        digest = self.read_digest(target_path) if verify_checksum else None
+
+        size = storage.file_size(target_path)
+        if size <= MAX_POINTER_SIZE:
+            file_object = self.resolve_pointer(FileObject(path=target_path, content=storage.read_file(target_path)))
+            if file_object.path != target_path:
+                target_path = file_object.path
+                size = self.choose_storage(target_path).file_size(target_path)
+
+        return DataFile(path=target_path, size=size, digest=digest)
+
+    def read_stream(
+        self,
+        data_file: DataFile,
+        load: Callable[[io.TextIOBase], T],
+        *,
+        name: str | None = None,
+        compression: str | None = None,
+        content: IO[bytes] | None = None,
+    ) -> T:
+        """Load the data of the table `name`, by passing its decompressed content to `load`.
+
+        Downloading, decompressing and loading the content each happen concurrently
+        (see `Pipeline`). The content is read from `content` instead, when it was
+        already downloaded (i.e. prefetched).
+        """
+        sizes = {"compressed": 0, "raw": 0}
+
+        def measure(chunks: Iterable[bytes], kind: str) -> Iterable[bytes]:
+            for chunk in chunks:
+                sizes[kind] += len(chunk)
+                yield chunk
+
+        def download() -> Iterable[bytes]:
+            if content is None:
+                return self.choose_storage(data_file.path).read_stream(data_file.path)
+
+            content.seek(0)
+            return iter(lambda: content.read(READ_CHUNK_SIZE), b"")
+
+        def load_chunks(chunks: Iterable[bytes]) -> T:
+            reader: IO[bytes] = io.BufferedReader(ChunkReader(measure(chunks, "raw")))
+            if data_file.digest:
+                reader = cast(IO[bytes], VerifyingReader(reader, data_file.digest.digest, path=data_file.path))
+
+            with io.TextIOWrapper(reader) as wrapper:
+                return load(wrapper)
+
+        compressor = Compressor.get_with_name(compression)
+        pipeline: Pipeline[T] = Pipeline(
+            source=("download", download),
+            stages=[("decompress", lambda chunks: compressor.extract_stream(measure(chunks, "compressed")))],
+            sink=("load", load_chunks),
+            attributes={"table": name},
+        )
+        result = pipeline.run()
+
+        if name and self.record_stats:
+            table_info = self.events.setdefault(name, TableInfo(name=name))
+            table_info.note_file_type(FileTypes.data)
+            if isinstance(result, int):
+                table_info.rows = result
+            table_info.raw_bytes = sizes["raw"]
+            table_info.compressed_bytes = sizes["compressed"]
+            for stage, seconds in pipeline.timings.items():
+                table_info.add_time(stage, seconds)
+
+        if name and self.manifest and self.perform_writes:
+            with self.lock:
+                self.manifest.record(name, data_file.path)
+
+        return result
+
+    def record_estimate(self, name: str | None, *, rows: int | None, size: int | None, seconds: float | None):
+        """Record the estimated rows, size and duration of backing up the data of the table `name` (i.e. dry runs)."""
+        if not name or not self.record_stats:
+            return
+
+        table_info = self.events.setdefault(name, TableInfo(name=name))
+        table_info.rows = rows
+        table_info.raw_bytes = size
+        table_info.estimated = True
+        table_info.estimated_seconds = seconds
+
+    def record_throttled(self, name: str | None, throttle: str, seconds: float):
+        """Record the seconds spent waiting on a `throttle` while processing the table `name`."""
+        if not name or not self.record_stats or not seconds:
+            return
+
+        with self.lock:
+            table_info = self.events.setdefault(name, TableInfo(name=name))
+            table_info.add_throttled(throttle, seconds)
+
+    @contextlib.contextmanager
+    def record_stage(self, stage: str, *, name: str | None = None) -> Generator[None, None, None]:
+        """Accumulate the wall time spent in a `stage` of processing the table `name`."""
+        table_info = self.events.setdefault(name, TableInfo(name=name)) if name and self.record_stats else None
+
+        start = time.perf_counter()
+        try:
+            with span(stage, table=name):
+                yield
+        finally:
+            if table_info:
+                table_info.add_time(stage, time.perf_counter() - start)
+
+    @contextlib.contextmanager
+    def record_phase(self, phase: str) -> Generator[None, None, None]:
+        """Accumulate the wall time spent in a `phase` (i.e. ddl, sequences, data) of the whole run.
+
+        When profiling, each phase is also profiled separately.
+        """
+        profiled = self.profiler.phase(phase) if self.profiler else contextlib.nullcontext()
+
+        start = time.perf_counter()
+        try:
+            with span(phase), profiled:
+                yield
+        finally:
+            if self.record_stats:
+                self.phases[phase] = self.phases.get(phase, 0.0) + time.perf_counter() - start
+
     def print_stats(self, console: Console = default_console):
         table = Table(title="Stats")
 
+        stages = collect_stages(self.events.values())
+        estimated = any(row.estimated for row in self.events.values())
+        throttled = any(row.throttled for row in self.events.values())
+
         table.add_column("Table", justify="right", style="cyan", no_wrap=True)
         table.add_column("DDL", justify="right", style="green")
         table.add_column("Sequences", justify="right", style="green")
         table.add_column("Data", justify="right", style="green")
         table.add_column("Rows", justify="right")
+        if stages:
+            table.add_column("Raw", justify="right")
+            table.add_column("Compressed", justify="right")
+            for stage in stages:
+                table.add_column(f"{stage.title()} (s)", justify="right")
+            table.add_column("Rows/s", justify="right")
+            table.add_column("Bytes/s", justify="right")
+        if throttled:
+            table.add_column("Throttled (s)", justify="right")
+        if estimated:
+            table.add_column("Est. Size", justify="right")
+            table.add_column("Est. Time (s)", justify="right")
 
         for row in self.events.values():
-            table.add_row(
+            cells = [
                 row.name,
                 "✓" if row.ddl else "",
                 "✓" if row.sequences else "",
                 "✓" if row.data else "",
-                str(row.rows) if row.rows is not None else "",
-            )
+                ("~" if row.estimated else "") + str(row.rows) if row.rows is not None else "",
+            ]
+            if stages:
+                cells.extend([format_bytes(row.raw_bytes), format_bytes(row.compressed_bytes)])
+                cells.extend(f"{row.timings[stage]:.2f}" if stage in row.timings else "" for stage in stages)
+                cells.append(f"{row.rows_per_second:,.0f}" if row.rows_per_second is not None else "")
+                cells.append(format_bytes(row.bytes_per_second))
+            if throttled:
+                cells.append(f"{sum(row.throttled.values()):.2f}" if row.throttled else "")
+            if estimated:
+                cells.append(format_bytes(row.raw_bytes) if row.estimated else "")
+                cells.append(f"{row.estimated_seconds:.2f}" if row.estimated_seconds is not None else "")
+
+            table.add_row(*cells)
 
         console.print(table)
 
+        if self.phases:
+            phase_table = Table(title="Phases")
+            phase_table.add_column("Phase", justify="right", style="cyan")
+            phase_table.add_column("Time (s)", justify="right")
+            for phase, seconds in self.phases.items():
+                phase_table.add_row(phase, f"{seconds:.2f}")
+            console.print(phase_table)
 
-@dataclass
-class TableInfo:
-    name: str
-    ddl: bool = False
-    sequences: bool = False
-    data: bool = False
-    rows: int | None = None
-
-    def note_file_type(self, file_type: FileTypes):
-        if file_type == file_type.ddl:
-            self.ddl = True
-        elif file_type == file_type.sequences:
-            self.sequences = True
-        elif file_type == file_type.data:
-            self.data = True
+    def write_stats(self, path: str, *, operation: str, format: str = "json"):
+        """Write the recorded stats to `path`, as either a "json" report or a "prometheus" textfile."""
+        render = prometheus_report if format == "prometheus" else json_report
+        content = render(self.events.values(), self.phases, operation=operation, timestamp=self.timestamp)
+        self.choose_storage(path).write_buffer(path, io.BytesIO(content))
 
 
 @dataclass(frozen=True)
@@ -325,6 +945,42 @@ class FileObject:
     content: io.BytesIO | None
 
 
+@dataclass(frozen=True)
+class DataFile:
+    """The file containing a table's data, and the digest recorded for it (if verifying checksums)."""
+
+    path: str
+    size: int
+    digest: FileDigest | None = None
+
+
+@dataclass(frozen=True)
+class FileDigest:
+    r"""The digest of a file's (uncompressed) content, and the path of the file containing it.
+
+    Stored alongside each file in the format of `sha256sum`.
+
+    Examples:
+        >>> file_digest = FileDigest(digest="abc123", path="backups/public.foo/2021-04-26T09:00:00.csv")
+        >>> file_digest.to_bytes()
+        b'abc123  backups/public.foo/2021-04-26T09:00:00.csv\n'
+
+        >>> FileDigest.from_bytes(file_digest.to_bytes()) == file_digest
+        True
+    """
+
+    digest: str
+    path: str
+
+    def to_bytes(self) -> bytes:
+        return f"{self.digest}  {self.path}\n".encode()
+
+    @classmethod
+    def from_bytes(cls, content: bytes) -> FileDigest:
+        digest, path = content.decode("utf-8").rstrip("\n").split("  ", 1)
+        return cls(digest=digest, path=path)
+
+
 @dataclass(frozen=True)
 class FileStat:
     path_str: str
@@ -376,4 +1032,4 @@ def match_path(path: str, pattern: str) -> bool:
         .replace(r"\{timestamp\}", r"\d\d\d\d-\d\d-\d\dT\d\d:\d\d:\d\d")
         .replace(r"\{date\}", r"\d\d\d\d-\d\d-\d\d")
     )
-    return bool(re.match(escaped_pattern, path))
+    return bool(re.fullmatch(escaped_pattern, path))
@@ -1,5 +1,6 @@
 from __future__ import annotations
 
+import dataclasses
 from dataclasses import dataclass
 from typing import Generic, Sequence, TYPE_CHECKING, TypeVar
 
@@ -7,7 +8,7 @@ from sqlalchemy import inspect
 from sqlalchemy.orm import Session
 
 from databudgie.config import BackupTableConfig, RestoreTableConfig
-from databudgie.match import expand_table_globs
+from databudgie.match import compile_patterns, TableMatcher
 from databudgie.output import Console, default_console
 from databudgie.utils import join_paths, parse_table
 
@@ -69,12 +70,23 @@ class TableOp(Generic[T]):
         filename = self.raw_conf.filename
         return join_paths(location, filename)
 
-    def query(self) -> str:
+    def query(self, table: str | None = None) -> str:
+        """Produce the table's query, substituting `table` (the table's name, by default) for `{table}`."""
         query = getattr(self.raw_conf, "query")  # RestoreTableConfig has no query attribute
         if query is None:
             query = "SELECT * FROM {table}"
 
-        return query.format(table=self.full_name)
+        return query.format(table=table or self.full_name)
+
+    def partition(self, name: str) -> TableOp[T]:
+        """Produce the operation on the partition `name` of this (partitioned) table.
+
+        The partition's files are grouped under the table's own location, i.e.
+        `backups/public.events/partitions/public.events_2024/`.
+        """
+        assert self.full_name
+        location = join_paths(self.raw_conf.location.replace("{table}", self.full_name), "partitions", "{table}")
+        return TableOp.from_name(name, raw_conf=dataclasses.replace(self.raw_conf, location=location))
 
     def schema_op(self) -> SchemaOp | None:
         if self.schema is None:
@@ -114,6 +126,7 @@ def expand_table_ops(
     default_schema_name = insp.default_schema_name
 
     # expand table globs into fully qualified mappings to the config.
+    matcher = TableMatcher.from_tables(existing_tables)
     matching_tables: dict[str, list[T]] = {}
     unnamed_tables: list[T] = []
     for table_conf in tables:
@@ -125,26 +138,23 @@ def expand_table_ops(
         if "." not in pattern:
             pattern = f"{default_schema_name}.{pattern}"
 
-        expanded_tables = expand_table_globs(existing_tables, pattern)
+        expanded_tables = matcher.expand(pattern)
         if warn_for_unused_tables and not expanded_tables:
             console.warn(f"Skipping table definition `{pattern}` which did not match any tables.")
             continue
 
+        # All of a table config's exclusions are compiled into one regex, up front.
+        exclusions = compile_patterns(table_conf.exclude)
+
         for table_name in expanded_tables:
             if storage.check_manifest(table_name):
                 console.trace(f"Skipping {table_name}...")
                 continue
 
-            for exclusion_pattern in table_conf.exclude:
-                exclusions = set(expand_table_globs(existing_tables, exclusion_pattern))
-                if table_name in exclusions:
-                    break
+            if exclusions and exclusions.match(table_name):
+                continue
 
-                # Breaking out of this loop implies we've identified that this
-                # table should be excluded. Thus backup being gated on unbroken
-                # iteration of this loop.
-            else:
-                matching_tables.setdefault(table_name, []).append(table_conf)
+            matching_tables.setdefault(table_name, []).append(table_conf)
 
     # Notably, `existing_tables` is assumed to be sorted by table-fk dependencies,
     # which is why this collected separately from this loop, where we iterate
@@ -0,0 +1,108 @@
+from __future__ import annotations
+
+import contextlib
+import threading
+import time
+from dataclasses import dataclass
+from typing import Callable, Iterable, Iterator
+
+from databudgie.config import ThrottleConfig
+
+
+class TokenBucket:
+    """Limit the rate (i.e. bytes per second) of some work, shared across threads.
+
+    Tokens accumulate at `rate` per second, up to `capacity` (a second's worth, by
+    default), and are taken for each unit of work. Taking more tokens than are
+    available puts the bucket into debt, which is repaid by waiting, so that work
+    larger than the capacity (i.e. a large block) is still limited to `rate` on average.
+
+    Examples:
+        >>> now = [0.0]
+        >>> bucket = TokenBucket(100, clock=lambda: now[0], sleep=lambda seconds: None)
+        >>> bucket.acquire(100)
+        0.0
+        >>> bucket.acquire(50)
+        0.5
+        >>> now[0] = 2.0
+        >>> bucket.acquire(100)
+        0.0
+    """
+
+    def __init__(
+        self,
+        rate: float,
+        capacity: float | None = None,
+        *,
+        clock: Callable[[], float] | None = None,
+        sleep: Callable[[float], None] | None = None,
+    ):
+        self.rate = rate
+        self.capacity = capacity or rate
+        self.clock = clock or time.monotonic
+        self.sleep = sleep or time.sleep
+
+        self.tokens = self.capacity
+        self.updated = self.clock()
+        self.lock = threading.Lock()
+
+    def acquire(self, amount: float) -> float:
+        """Take `amount` tokens, waiting for them to accumulate if necessary. Returns the seconds waited."""
+        with self.lock:
+            now = self.clock()
+            self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+
+            self.tokens -= amount
+            wait = max(0.0, -self.tokens / self.rate)
+
+        if wait:
+            self.sleep(wait)
+        return wait
+
+
+def throttled(
+    chunks: Iterable[bytes],
+    bucket: TokenBucket | None,
+    on_wait: Callable[[float], None] | None = None,
+) -> Iterable[bytes]:
+    """Yield `chunks`, no faster than `bucket` allows (if any), reporting any time waited to `on_wait`."""
+    if bucket is None:
+        return chunks
+
+    def generate() -> Iterator[bytes]:
+        for chunk in chunks:
+            wait = bucket.acquire(len(chunk))
+            if wait and on_wait:
+                on_wait(wait)
+            yield chunk
+
+    return generate()
+
+
+@dataclass
+class Throttle:
+    """The limits applied to a backup, shared by every table (and partition) it exports. See `ThrottleConfig`."""
+
+    read: TokenBucket | None = None
+    write: TokenBucket | None = None
+    exports: threading.Semaphore | None = None
+
+    @classmethod
+    def from_config(cls, config: ThrottleConfig) -> Throttle:
+        return cls(
+            read=TokenBucket(config.read) if config.read else None,
+            write=TokenBucket(config.write) if config.write else None,
+            exports=threading.Semaphore(config.exports) if config.exports else None,
+        )
+
+    @contextlib.contextmanager
+    def export_slot(self) -> Iterator[float]:
+        """Hold one of the `exports` slots for the duration of the context, yielding the seconds waited for it."""
+        if self.exports is None:
+            yield 0.0
+            return
+
+        start = time.perf_counter()
+        with self.exports:
+            yield time.perf_counter() - start
@@ -0,0 +1,168 @@
+"""Lightweight tracing of a run, as nested spans written to a JSON-lines file.
+
+Spans are no-ops unless a `Tracer` is active (see `trace_to`). The current span
+is tracked with a `contextvars.ContextVar`, so spans nest correctly across
+threads, so long as work submitted to other threads runs in a copy of the
+submitting context (see `in_context`).
+"""
+
+from __future__ import annotations
+
+import contextlib
+import contextvars
+import functools
+import inspect
+import json
+import os
+import threading
+import time
+from dataclasses import dataclass, field
+from typing import Any, Callable, Generator, IO, TypeVar
+
+from databudgie.profiling import profiled
+
+T = TypeVar("T")
+
+
+@dataclass
+class Span:
+    name: str
+    trace_id: str
+    span_id: str
+    parent_id: str | None
+    attributes: dict[str, Any] = field(default_factory=dict)
+
+    start_ns: int = field(default_factory=time.time_ns)
+    duration_ns: int | None = None
+    error: str | None = None
+
+    def set(self, **attributes: Any):
+        self.attributes.update(attributes)
+
+    def to_dict(self) -> dict:
+        return {
+            "trace_id": self.trace_id,
+            "span_id": self.span_id,
+            "parent_id": self.parent_id,
+            "name": self.name,
+            "start_ns": self.start_ns,
+            "duration_ns": self.duration_ns,
+            "thread": threading.current_thread().name,
+            "status": "error" if self.error else "ok",
+            "error": self.error,
+            "attributes": self.attributes,
+        }
+
+
+@dataclass
+class Tracer:
+    """Write completed spans to `file`, one JSON object per line."""
+
+    file: IO[str]
+    trace_id: str = field(default_factory=lambda: os.urandom(16).hex())
+
+    lock: threading.Lock = field(default_factory=threading.Lock)
+
+    def start(self, name: str, parent: Span | None, attributes: dict[str, Any]) -> Span:
+        return Span(
+            name=name,
+            trace_id=self.trace_id,
+            span_id=os.urandom(8).hex(),
+            parent_id=parent.span_id if parent else None,
+            attributes=attributes,
+        )
+
+    def finish(self, span: Span):
+        line = json.dumps(span.to_dict(), default=str)
+        with self.lock:
+            self.file.write(line + "\n")
+            self.file.flush()
+
+
+current_tracer: contextvars.ContextVar[Tracer | None] = contextvars.ContextVar("current_tracer", default=None)
+current_span: contextvars.ContextVar[Span | None] = contextvars.ContextVar("current_span", default=None)
+
+
+@contextlib.contextmanager
+def trace_to(path: str | None) -> Generator[Tracer | None, None, None]:
+    """Record all spans within the context to the JSON-lines file at `path` (if given)."""
+    if not path:
+        yield None
+        return
+
+    with open(path, "w") as f:
+        tracer = Tracer(file=f)
+        token = current_tracer.set(tracer)
+        try:
+            yield tracer
+        finally:
+            current_tracer.reset(token)
+
+
+@contextlib.contextmanager
+def span(name: str, **attributes: Any) -> Generator[Span | None, None, None]:
+    """Record the time spent within the context as a span, nested under the current span.
+
+    Examples:
+        Without an active tracer, spans are free:
+        >>> with span("backup", table="public.foo") as s:
+        ...     s is None
+        True
+    """
+    tracer = current_tracer.get()
+    if tracer is None:
+        yield None
+        return
+
+    new_span = tracer.start(name, current_span.get(), attributes)
+    token = current_span.set(new_span)
+
+    start = time.perf_counter_ns()
+    try:
+        yield new_span
+    except BaseException as e:
+        new_span.error = f"{type(e).__name__}: {e}"
+        raise
+    finally:
+        new_span.duration_ns = time.perf_counter_ns() - start
+        current_span.reset(token)
+        tracer.finish(new_span)
+
+
+def traced(name: str, *attributes: str) -> Callable[[Callable[..., T]], Callable[..., T]]:
+    """Decorate a function, such that each call is recorded as a span.
+
+    The named `attributes` are taken from the arguments of each call.
+    """
+
+    def decorator(fn: Callable[..., T]) -> Callable[..., T]:
+        signature = inspect.signature(fn)
+
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs) -> T:
+            if current_tracer.get() is None:
+                return fn(*args, **kwargs)
+
+            arguments = signature.bind_partial(*args, **kwargs).arguments
+            with span(name, **{attribute: arguments.get(attribute) for attribute in attributes}):
+                return fn(*args, **kwargs)
+
+        return wrapper
+
+    return decorator
+
+
+def in_context(fn: Callable[..., T]) -> Callable[..., T]:
+    """Bind `fn` to (a copy of) the current context, i.e. before submitting it to another thread.
+
+    Each call runs in its own copy, so the result may be submitted more than once.
+    When the current phase is being profiled, the call is profiled into it (see `profiled`).
+    """
+    context = contextvars.copy_context()
+    target = profiled(fn)
+
+    @functools.wraps(fn)
+    def wrapper(*args, **kwargs) -> T:
+        return context.copy().run(target, *args, **kwargs)
+
+    return wrapper
@@ -1,7 +1,7 @@
 import contextlib
 import io
 import os
-from typing import Optional, Tuple
+from typing import Iterable, Iterator, List, Optional, Tuple, Union
 
 from databudgie.output import Console, default_console
 from databudgie.s3 import is_s3_path, S3Location
@@ -45,6 +45,109 @@ def wrap_buffer(buffer: io.BytesIO):
     buffer.seek(0)
 
 
+class ChunkReader(io.RawIOBase):
+    r"""Present an iterable of `chunks` as a (raw, unbuffered) binary file.
+
+    Examples:
+        >>> reader = io.BufferedReader(ChunkReader([b"id,name\n", b"", b"1,foo\n"]))
+        >>> reader.readline()
+        b'id,name\n'
+        >>> reader.read()
+        b'1,foo\n'
+    """
+
+    def __init__(self, chunks: Iterable[bytes]):
+        self.chunks = iter(chunks)
+        self.pending = memoryview(b"")
+
+    def readable(self) -> bool:
+        return True
+
+    def readinto(self, buffer) -> int:
+        while not self.pending:
+            chunk = next(self.chunks, None)
+            if chunk is None:
+                return 0
+            self.pending = memoryview(chunk)
+
+        size = min(len(buffer), len(self.pending))
+        buffer[:size] = self.pending[:size]
+        self.pending = self.pending[size:]
+        return size
+
+
+def coalesce_chunks(chunks: Iterable[Union[bytes, bytearray, memoryview]], size: int) -> Iterator[bytes]:
+    """Join consecutive `chunks` until they are at least `size` bytes (save for the last one).
+
+    Examples:
+        >>> list(coalesce_chunks([b"a", b"bc", b"d", b"e"], size=3))
+        [b'abc', b'de']
+
+        >>> list(coalesce_chunks([], size=3))
+        []
+    """
+    pending = bytearray()
+    for chunk in chunks:
+        pending += chunk
+        if len(pending) >= size:
+            yield bytes(pending)
+            pending.clear()
+
+    if pending:
+        yield bytes(pending)
+
+
+def split_records(blocks: Iterable[str]) -> Iterator[str]:
+    r"""Re-align blocks of CSV content, such that each ends on a record boundary.
+
+    A newline within a quoted field is part of the field, rather than the end of
+    a record. Escaped quotes are doubled, so each quote toggles whether the content
+    is within a quoted field. That state is carried from one block to the next, so
+    each block is scanned only once, however many blocks a record spans.
+
+    Examples:
+        >>> list(split_records(["a,b\nc,", "d\ne", ",f\n"]))
+        ['a,b\n', 'c,d\n', 'e,f\n']
+
+        >>> list(split_records(['a,"multi\nline"\nb,', '"quoted ""x""\n"\n']))
+        ['a,"multi\nline"\n', 'b,"quoted ""x""\n"\n']
+
+        >>> list(split_records(['a,"x\n', "y\n", 'z"\nb\n']))
+        ['a,"x\ny\nz"\nb\n']
+    """
+    pending: List[str] = []
+    quoted = False
+    for block in blocks:
+        # The parts of the block alternate between being outside, and within, a quoted field.
+        parts = block.split('"')
+
+        end = -1
+        offset = len(block)
+        for index in range(len(parts) - 1, -1, -1):
+            part = parts[index]
+            offset -= len(part)
+            if quoted == bool(index % 2):
+                newline = part.rfind("\n")
+                if newline != -1:
+                    end = offset + newline
+                    break
+            offset -= 1
+
+        if (len(parts) - 1) % 2:
+            quoted = not quoted
+
+        if end == -1:
+            pending.append(block)
+            continue
+
+        yield "".join(pending) + block[: end + 1]
+        pending = [block[end + 1 :]]
+
+    remainder = "".join(pending)
+    if remainder:
+        yield remainder
+
+
 def parse_table(table: str) -> Tuple[str, str]:
     """Split a schema-qualified table name into two parts.
 
@@ -1,12 +1,16 @@
 from unittest.mock import patch
 
+from sqlalchemy import MetaData
+
 from databudgie.adapter import Adapter
 from databudgie.backup import backup_all
 from databudgie.config import RootConfig
+from databudgie.restore import restore_all
 from tests.adapter import test_postgres
+from tests.mockmodels.models import Store
 from tests.test_backup import _validate_backup_contents
 from tests.test_restore import test_restore_one
-from tests.utils import get_file_buffer, s3_config
+from tests.utils import get_file_buffer, mock_s3_csv, s3_config
 
 
 def test_backup(pg, mf, s3_resource):
@@ -36,3 +40,55 @@ def test_restore(pg, mf, s3_resource):
 def test_type_conversion(pg, mf, s3_resource):
     with patch("databudgie.backup.Adapter.get_adapter", return_value=Adapter(pg)):
         test_postgres.test_type_conversion(pg, mf, s3_resource)
+
+
+def test_collect_existing_tables(pg):
+    """Validate tables are collected in dependency order, without reflecting them in full."""
+    metadata = MetaData()
+    metadata.reflect(bind=pg.connection(), schema="public")
+    expected = {table.fullname for table in metadata.sorted_tables}
+
+    with patch("databudgie.adapter.base.MetaData.reflect", side_effect=AssertionError("reflected")):
+        result = Adapter(pg).collect_existing_tables()
+
+    assert set(result) == expected
+    for table in metadata.sorted_tables:
+        for foreign_key in table.foreign_keys:
+            referred = foreign_key.column.table.fullname
+            if referred != table.fullname:
+                assert result.index(referred) < result.index(table.fullname)
+
+
+def test_rebuild_indexes(pg, s3_resource):
+    """Validate `rebuild_indexes` loads the data with its indexes in place, as none are collected by default."""
+    mock_s3_csv(s3_resource, "stores/2021-04-26T09:00:00.csv", [{"id": 1, "name": "store"}])
+    config = RootConfig.from_dict(
+        {
+            **s3_config,
+            "strict": True,
+            "tables": {"store": {"rebuild_indexes": True, "location": "s3://sample-bucket/stores"}},
+        }
+    )
+
+    with patch("databudgie.restore.Adapter.get_adapter", return_value=Adapter(pg)):
+        restore_all(pg, config.restore)
+
+    assert pg.query(Store).count() == 1
+
+
+def test_fast_load_validates_foreign_keys(pg, s3_resource):
+    """Validate the foreign key validation pass finds nothing, as foreign keys are checked during the load."""
+    mock_s3_csv(s3_resource, "stores/2021-04-26T09:00:00.csv", [{"id": 1, "name": "store"}])
+    config = RootConfig.from_dict(
+        {
+            **s3_config,
+            "strict": True,
+            "fast_load": True,
+            "tables": {"store": {"location": "s3://sample-bucket/stores"}},
+        }
+    )
+
+    with patch("databudgie.restore.Adapter.get_adapter", return_value=Adapter(pg)):
+        restore_all(pg, config.restore)
+
+    assert pg.query(Store).count() == 1
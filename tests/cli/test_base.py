@@ -3,7 +3,7 @@ import pytest
 from pytest_mock_resources import create_postgres_fixture
 from sqlalchemy import text
 
-from databudgie.cli.base import _create_postgres_session
+from databudgie.cli.base import _create_postgres_session, backup_data_db
 from databudgie.config import BackupConfig, ConfigStack
 
 pg_engine = create_postgres_fixture()
@@ -53,3 +53,29 @@ def test_missing_connection():
 
     with pytest.raises(click.UsageError):
         _create_postgres_session(config)
+
+
+def test_create_postgres_session_pool(pg_engine):
+    url_parts = pg_engine.pmr_credentials.as_sqlalchemy_url_kwargs()
+
+    config = BackupConfig.from_stack(ConfigStack({"url": url_parts, "pool": {"size": 3, "recycle": 60}}))
+    session = _create_postgres_session(config)
+    session.execute(text("select 1"))
+
+    pool = session.get_bind().pool
+    assert pool.size() == 3
+    assert pool._recycle == 60
+    assert pool._pre_ping is True
+
+
+def test_backup_data_db(pg_engine):
+    url_parts = pg_engine.pmr_credentials.as_sqlalchemy_url_kwargs()
+
+    config = BackupConfig.from_stack(
+        ConfigStack({"connections": {"replica": url_parts}, "data_connection": ["replica", {"url": url_parts}]})
+    )
+    engines = backup_data_db(config)
+    assert len(engines) == 2
+    for engine in engines:
+        with engine.connect() as connection:
+            connection.execute(text("select 1"))
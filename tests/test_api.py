@@ -1,4 +1,10 @@
-from databudgie.api import backup, root_config
+import faker
+
+from databudgie.api import backup, restore, root_config
+from databudgie.output import default_console
+from tests.mockmodels.models import Store
+
+fake = faker.Faker()
 
 
 def test_backup(pg):
@@ -8,3 +14,21 @@ def test_backup(pg):
         }""",
     )
     backup(pg, config.backup)
+
+
+def test_backup_restore_engine(pg, mf, tmp_path):
+    """Validate an `Engine` can be given in place of a session, sharing its pool."""
+    mf.store.new(name=fake.name())
+    pg.commit()
+
+    config = root_config(
+        raw_config=f"""{{
+            "location": "{tmp_path}/{{table}}",
+            "tables": {{"public.store": {{"truncate": true}}}}
+        }}""",
+    )
+    engine = pg.get_bind()
+    backup(engine, config.backup)
+    restore(engine, config.restore, console=default_console)
+
+    assert pg.query(Store).count() == 1
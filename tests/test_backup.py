@@ -1,20 +1,28 @@
 import csv
 import gzip
 import io
+import json
 import tempfile
+import threading
 from typing import Any, Dict, List
 from unittest.mock import patch
 
 import faker
 import pytest
+from pytest_mock_resources import create_postgres_fixture
+from sqlalchemy import create_engine, event, text
+from sqlalchemy.orm import Session
 
+from databudgie.adapter.postgres import PostgresAdapter
 from databudgie.backup import backup_all
 from databudgie.config import RootConfig
-from tests.mockmodels.models import Customer
+from tests.mockmodels.models import Base, Customer
 from tests.utils import get_file_buffer, s3_config
 
 fake = faker.Faker()
 
+replica = create_postgres_fixture(Base, session=True, createdb_template="template0")
+
 
 def test_backup_all(pg, s3_resource):
     """Validate the backup_all performs backup for all tables in the backup config."""
@@ -37,6 +45,64 @@ def test_backup_all(pg, s3_resource):
     ]
 
 
+def test_backup_parallelism(pg, s3_resource):
+    """Validate tables are backed up concurrently, when `parallelism` is above 1."""
+    config = RootConfig.from_dict(
+        {
+            "location": "s3://sample-bucket/databudgie/test/{table}",
+            "tables": ["public.customer", "public.store", "public.product"],
+            "sequences": False,
+            "strict": True,
+            "parallelism": 2,
+            **s3_config,
+        }
+    )
+
+    backup_all(pg, config.backup)
+
+    all_object_keys = [obj.key for obj in s3_resource.Bucket("sample-bucket").objects.all()]
+    assert sorted(all_object_keys) == [
+        "databudgie/test/public.customer/2021-04-26T09:00:00.csv",
+        "databudgie/test/public.product/2021-04-26T09:00:00.csv",
+        "databudgie/test/public.store/2021-04-26T09:00:00.csv",
+    ]
+
+
+def test_backup_parallelism_pool(pg, s3_resource):
+    """Validate each table backed up in parallel holds a single connection while its data is streamed."""
+    config = RootConfig.from_dict(
+        {
+            "location": "s3://sample-bucket/databudgie/test/{table}",
+            "tables": ["public.customer", "public.store"],
+            "sequences": False,
+            "strict": True,
+            "parallelism": 2,
+            "partition_parallelism": 1,
+            **s3_config,
+        }
+    )
+
+    # Both tables are streamed at once.
+    barrier = threading.Barrier(2, timeout=10)
+    stream_query = PostgresAdapter.stream_query
+
+    def stream_together(self, query, result, sample=None):
+        barrier.wait()
+        yield from stream_query(self, query, result, sample=sample)
+
+    engine = create_engine(pg.get_bind().url, **config.backup.pool.engine_options())
+    checked_out = []
+    event.listen(engine, "checkout", lambda *_: checked_out.append(engine.pool.checkedout()))
+    try:
+        with Session(bind=engine) as session, patch.object(PostgresAdapter, "stream_query", stream_together):
+            backup_all(session, config.backup)
+    finally:
+        engine.dispose()
+
+    # The session's own connection, and one per table.
+    assert max(checked_out) == config.backup.max_connections() == 3
+
+
 def test_backup_all_glob(pg, s3_resource):
     config = RootConfig.from_dict(
         {
@@ -243,3 +309,39 @@ def _comparable_bool(value):
         return (False, "False", "f", "false")
 
     raise ValueError(f"Invalid boolean value: {value}")
+
+
+def test_backup_data_connection(pg, replica, tmp_path):
+    """Validate table data is exported from the data connections, while sequences are read from the primary."""
+    for name in ("primary 1", "primary 2", "primary 3"):
+        pg.execute(text("INSERT INTO public.store (name) VALUES (:name)"), {"name": name})
+    pg.commit()
+
+    replica.execute(text("INSERT INTO public.store (name) VALUES ('replica 1')"))
+    replica.commit()
+
+    config = RootConfig.from_dict(
+        {
+            "location": f"{tmp_path}/{{table}}",
+            "tables": ["public.store"],
+            "strict": True,
+        }
+    )
+    stream_query = PostgresAdapter.stream_query
+
+    def write_to_primary(self, query, result, sample=None):
+        # The primary continues to be written to while the data is exported.
+        with pg.get_bind().begin() as connection:
+            connection.execute(text("INSERT INTO public.store (name) VALUES ('primary 4')"))
+        return stream_query(self, query, result, sample=sample)
+
+    with patch.object(PostgresAdapter, "stream_query", write_to_primary):
+        backup_all(pg, config.backup, data_sessions=[replica])
+
+    with open(tmp_path / "public.store" / "2021-04-26T09:00:00.csv") as f:
+        names = [row["name"] for row in csv.DictReader(f)]
+    assert names == ["replica 1"]
+
+    # Sequences are read once the data is exported, so they are never behind the exported data.
+    with open(tmp_path / "public.store" / "sequences" / "2021-04-26T09:00:00.json") as f:
+        assert list(json.load(f).values()) == [4]
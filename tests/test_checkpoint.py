@@ -0,0 +1,110 @@
+import json
+from unittest.mock import patch
+
+import pytest
+from freezegun import freeze_time
+
+from databudgie.adapter.postgres import PostgresAdapter
+from databudgie.api import backup
+from databudgie.config import ConfigError, RootConfig
+from databudgie.output import default_console
+from tests.utils import s3_config
+
+
+def _config():
+    return RootConfig.from_dict(
+        {
+            "root_location": "s3://sample-bucket",
+            "location": "databudgie/test/{table}",
+            "tables": ["public.customer", "public.store"],
+            "sequences": False,
+            "strict": True,
+            "checkpoint": True,
+            **s3_config,
+        }
+    )
+
+
+def test_checkpoint_records_completed_files(pg, s3_resource):
+    config = _config()
+    backup(pg, config.backup)
+
+    checkpoint = s3_resource.Object("sample-bucket", "backups/checkpoint.json").get()["Body"].read()
+    assert json.loads(checkpoint) == {
+        "timestamp": "2021-04-26T09:00:00",
+        "completed": [
+            "s3://sample-bucket/databudgie/test/public.customer/2021-04-26T09:00:00.csv",
+            "s3://sample-bucket/databudgie/test/public.store/2021-04-26T09:00:00.csv",
+        ],
+        "finished": True,
+    }
+
+
+def test_resume_skips_completed_files(pg, s3_resource):
+    config = _config()
+    stream_query = PostgresAdapter.stream_query
+
+    def fail_on_customer(self, query, result, sample=None):
+        if "public.customer" in query:
+            raise RuntimeError("Dummy error")
+        return stream_query(self, query, result, sample=sample)
+
+    with patch.object(PostgresAdapter, "stream_query", fail_on_customer):
+        with pytest.raises(RuntimeError):
+            backup(pg, config.backup)
+
+    # An upload left behind by the interrupted backup, as though it had been killed mid-upload.
+    client = s3_resource.meta.client
+    client.create_multipart_upload(
+        Bucket="sample-bucket", Key="databudgie/test/public.customer/2021-04-26T09:00:00.csv"
+    )
+
+    with freeze_time("2021-04-27 09:00:00"):
+        with patch.object(PostgresAdapter, "stream_query", autospec=True, side_effect=stream_query) as export:
+            backup(pg, config.backup, resume=True)
+
+    assert client.list_multipart_uploads(Bucket="sample-bucket").get("Uploads", []) == []
+
+    # Only the failed table is re-exported, and it is written under the original timestamp.
+    assert export.call_count == 1
+    all_object_keys = [obj.key for obj in s3_resource.Bucket("sample-bucket").objects.all()]
+    assert all_object_keys == [
+        "backups/checkpoint.json",
+        "databudgie/test/public.customer/2021-04-26T09:00:00.csv",
+        "databudgie/test/public.store/2021-04-26T09:00:00.csv",
+    ]
+
+
+def test_resume_finished_backup_starts_new_backup(pg, s3_resource):
+    config = _config()
+    backup(pg, config.backup)
+
+    with freeze_time("2021-04-27 09:00:00"):
+        backup(pg, config.backup, resume=True)
+
+    all_object_keys = [obj.key for obj in s3_resource.Bucket("sample-bucket").objects.all()]
+    assert all_object_keys == [
+        "backups/checkpoint.json",
+        "databudgie/test/public.customer/2021-04-26T09:00:00.csv",
+        "databudgie/test/public.customer/2021-04-27T09:00:00.csv",
+        "databudgie/test/public.store/2021-04-26T09:00:00.csv",
+        "databudgie/test/public.store/2021-04-27T09:00:00.csv",
+    ]
+
+
+def test_resume_without_checkpoint_starts_new_backup(pg, s3_resource):
+    config = _config()
+
+    with patch.object(default_console, "warn") as warn:
+        backup(pg, config.backup, resume=True)
+
+    warn.assert_called_once_with(
+        "Found no checkpoint at s3://sample-bucket/backups/checkpoint.json to resume from, starting a new backup"
+    )
+
+
+def test_resume_requires_checkpoint(pg):
+    config = RootConfig.from_dict({"tables": []})
+
+    with pytest.raises(ConfigError):
+        backup(pg, config.backup, resume=True)
@@ -0,0 +1,77 @@
+import hashlib
+
+import faker
+import pytest
+
+from databudgie.backup import backup_all
+from databudgie.checksum import ChecksumError
+from databudgie.config import RootConfig
+from databudgie.restore import restore_all
+from tests.mockmodels.models import Store
+from tests.utils import s3_config
+
+fake = faker.Faker()
+
+DATA_KEY = "public.store/2021-04-26T09:00:00.csv"
+
+
+def _config(**extra):
+    return RootConfig.from_dict(
+        {
+            "location": "s3://sample-bucket/{table}",
+            "tables": ["public.store"],
+            "sequences": False,
+            "strict": True,
+            "truncate": True,
+            "checksum": True,
+            **extra,
+            **s3_config,
+        }
+    )
+
+
+def _backup_and_truncate(pg, mf, s3_resource, config):
+    mf.store.new(name=fake.name())
+    mf.store.new(name=fake.name())
+    backup_all(pg, config.backup)
+
+    data_object = s3_resource.Object("sample-bucket", DATA_KEY)
+    content = data_object.get()["Body"].read()
+    data_object.put(Body=content[: content.rindex(b"\n", 0, -1) + 1])
+
+    pg.query(Store).delete()
+    pg.commit()
+
+
+def test_checksum_written(pg, mf, s3_resource):
+    mf.store.new(name=fake.name())
+    config = _config()
+    backup_all(pg, config.backup)
+
+    content = s3_resource.Object("sample-bucket", DATA_KEY).get()["Body"].read()
+    checksum = s3_resource.Object("sample-bucket", f"{DATA_KEY}.sha256").get()["Body"].read()
+    assert checksum == f"{hashlib.sha256(content).hexdigest()}  s3://sample-bucket/{DATA_KEY}\n".encode()
+
+    pg.query(Store).delete()
+    pg.commit()
+
+    restore_all(pg, config.restore)
+    assert pg.query(Store).count() == 1
+
+
+def test_truncated_data_fails_verification(pg, mf, s3_resource):
+    config = _config()
+    _backup_and_truncate(pg, mf, s3_resource, config)
+
+    with pytest.raises(ChecksumError):
+        restore_all(pg, config.restore)
+
+    assert pg.query(Store).count() == 0
+
+
+def test_verification_disabled(pg, mf, s3_resource):
+    config = _config(verify_checksum=False)
+    _backup_and_truncate(pg, mf, s3_resource, config)
+
+    restore_all(pg, config.restore)
+    assert pg.query(Store).count() == 1
@@ -1,4 +1,15 @@
-from databudgie.config import ConfigStack, Connection, RootConfig
+import pytest
+
+from databudgie.config import (
+    ConfigError,
+    ConfigStack,
+    Connection,
+    PoolConfig,
+    PrefetchConfig,
+    RootConfig,
+    SampleConfig,
+    ThrottleConfig,
+)
 
 
 def test_only_leaf_values():
@@ -313,3 +324,169 @@ def test_connection_strings():
     config = RootConfig.from_dict({"connection": {"dialect": "postgres"}})
     assert isinstance(config.backup.connection, Connection)
     assert config.backup.connection.url == {"dialect": "postgres"}
+
+
+def test_fast_load():
+    config = RootConfig.from_dict({})
+    assert config.restore.fast_load.enabled is False
+
+    config = RootConfig.from_dict({"fast_load": True})
+    assert config.restore.fast_load.enabled is True
+    assert config.restore.fast_load.validate_foreign_keys is True
+
+    config = RootConfig.from_dict({"restore": {"fast_load": {"maintenance_work_mem": "4GB"}}})
+    assert config.restore.fast_load.enabled is True
+    assert config.restore.fast_load.maintenance_work_mem == "4GB"
+    assert config.backup.fast_load.enabled is False
+
+
+@pytest.mark.parametrize(
+    "fast_load, enabled", (("false", False), ("no", False), ("true", True), ({"enabled": "false"}, False))
+)
+def test_fast_load_string(fast_load, enabled):
+    """Validate a string (i.e. from an environment variable) is parsed, rather than any string enabling it."""
+    config = RootConfig.from_dict({"fast_load": fast_load})
+    assert config.restore.fast_load.enabled is enabled
+
+
+@pytest.mark.parametrize("fast_load", ("replica", 1, {"validate_foreign_keys": "sometimes"}))
+def test_fast_load_invalid(fast_load):
+    with pytest.raises(ConfigError):
+        RootConfig.from_dict({"fast_load": fast_load})
+
+
+def test_prefetch():
+    config = RootConfig.from_dict({})
+    assert config.restore.prefetch == PrefetchConfig()
+
+    config = RootConfig.from_dict({"prefetch": False})
+    assert config.restore.prefetch.tables == 0
+
+    config = RootConfig.from_dict({"restore": {"prefetch": {"tables": 4, "memory": "1GB", "disk": "10GB"}}})
+    assert config.restore.prefetch == PrefetchConfig(tables=4, memory=1024**3, disk=10 * 1024**3)
+    assert not hasattr(config.backup, "prefetch")
+
+
+def test_pool():
+    config = RootConfig.from_dict({})
+    assert config.backup.pool == PoolConfig()
+
+    config = RootConfig.from_dict({"pool": 2})
+    assert config.restore.pool.size == 2
+
+    config = RootConfig.from_dict({"backup": {"pool": {"size": 8, "pre_ping": False, "recycle": "3600"}}})
+    assert config.backup.pool == PoolConfig(size=8, pre_ping=False, recycle=3600)
+    assert config.restore.pool == PoolConfig()
+
+
+def test_sample():
+    config = RootConfig.from_dict({"tables": ["public.foo"]})
+    assert config.backup.tables[0].sample is None
+
+    config = RootConfig.from_dict({"sample": "1%", "tables": ["public.foo", {"name": "public.bar", "sample": 100}]})
+    assert config.backup.tables[0].sample == SampleConfig(percent=1)
+    assert config.backup.tables[1].sample == SampleConfig(rows=100)
+    assert not hasattr(config.restore.tables[0], "sample")
+
+    config = RootConfig.from_dict(
+        {"sample": {"percent": 5, "rows": 10, "method": "bernoulli", "seed": 3}, "tables": ["public.foo"]}
+    )
+    assert config.backup.tables[0].sample == SampleConfig(percent=5, rows=10, method="bernoulli", seed=3)
+
+    with pytest.raises(ConfigError):
+        RootConfig.from_dict({"sample": {"method": "bernoulli"}, "tables": ["public.foo"]})
+
+    with pytest.raises(ConfigError):
+        RootConfig.from_dict({"sample": "200%", "tables": ["public.foo"]})
+
+
+@pytest.mark.parametrize("sample", (0.5, "10", [10]))
+def test_sample_ambiguous(sample):
+    """Validate a sample is either a percentage (with a `%`), or a whole number of rows."""
+    with pytest.raises(ConfigError):
+        RootConfig.from_dict({"sample": sample, "tables": ["public.foo"]})
+
+
+def test_block_size():
+    config = RootConfig.from_dict({})
+    assert config.backup.block_size == 1024 * 1024
+
+    config = RootConfig.from_dict({"restore": {"block_size": "8MB"}})
+    assert config.restore.block_size == 8 * 1024 * 1024
+    assert config.backup.block_size == 1024 * 1024
+
+    with pytest.raises(ConfigError):
+        RootConfig.from_dict({"restore": {"block_size": 0}})
+
+
+def test_estimated_throughput():
+    config = RootConfig.from_dict({"backup": {"estimated_throughput": "100MB"}})
+    assert config.backup.estimated_throughput == 100 * 1024 * 1024
+
+    assert RootConfig.from_dict({}).backup.estimated_throughput == 50 * 1024 * 1024
+
+    with pytest.raises(ConfigError):
+        RootConfig.from_dict({"estimated_throughput": 0})
+
+
+def test_parallelism():
+    config = RootConfig.from_dict({"parallelism": 4, "restore": {"parallelism": 2}})
+    assert config.backup.parallelism == 4
+    assert config.restore.parallelism == 2
+
+    assert RootConfig.from_dict({}).backup.parallelism == 1
+
+    with pytest.raises(ConfigError):
+        RootConfig.from_dict({"parallelism": 0})
+
+
+def test_parallelism_pool():
+    # Each of the tables may export `partition_parallelism` partitions at once, besides the session's own connection.
+    config = RootConfig.from_dict({"parallelism": 4, "tables": ["public.foo"]})
+    assert config.backup.max_connections() == 17
+    assert config.backup.pool.limit() == 17
+
+    config = RootConfig.from_dict({"parallelism": 2, "partition_parallelism": 1, "tables": ["public.foo"]})
+    assert config.backup.pool.limit() == 15
+
+    config = RootConfig.from_dict(
+        {"restore": {"parallelism": 2, "rebuild_indexes": True, "index_parallelism": 8, "tables": ["public.foo"]}}
+    )
+    assert config.restore.max_connections() == 17
+
+    with pytest.raises(ConfigError):
+        RootConfig.from_dict({"parallelism": 4, "pool": {"size": 5, "max_overflow": 0}, "tables": ["public.foo"]})
+
+    config = RootConfig.from_dict({"parallelism": 4, "pool": {"max_overflow": -1}, "tables": ["public.foo"]})
+    assert config.backup.pool.limit() is None
+
+
+def test_throttle():
+    config = RootConfig.from_dict({"backup": {"throttle": {"read": "10MB", "write": 1024, "exports": 2}}})
+    assert config.backup.throttle == ThrottleConfig(read=10 * 1024 * 1024, write=1024, exports=2)
+
+    assert RootConfig.from_dict({}).backup.throttle == ThrottleConfig()
+
+    with pytest.raises(ConfigError):
+        RootConfig.from_dict({"throttle": {"exports": 0}})
+
+
+def test_data_connection():
+    config = RootConfig.from_dict({"backup": {"data_connection": "replica"}})
+    assert config.backup.data_connection == ["replica"]
+
+    config = RootConfig.from_dict({"data_connection": ["postgresql://replica-1", {"name": "replica-2", "host": "r2"}]})
+    assert config.backup.data_connection == [
+        Connection(name="default", url="postgresql://replica-1"),
+        Connection(name="replica-2", url={"host": "r2"}),
+    ]
+
+    assert RootConfig.from_dict({}).backup.data_connection == []
+
+
+def test_delta():
+    config = RootConfig.from_dict({"root_location": "s3://bucket", "restore": {"delta": True}})
+    assert config.restore.delta == "s3://bucket/backups/delta.json"
+
+    assert RootConfig.from_dict({"delta": "staging/delta.json"}).restore.delta == "staging/delta.json"
+    assert RootConfig.from_dict({}).restore.delta is None
@@ -0,0 +1,87 @@
+import json
+
+import faker
+from sqlalchemy import text
+
+from databudgie.config import RootConfig
+from databudgie.restore import restore_all
+from tests.mockmodels.models import Product, Store
+from tests.utils import mock_s3_csv, s3_config
+
+fake = faker.Faker()
+
+
+def _config():
+    return RootConfig.from_dict(
+        {
+            **s3_config,
+            "root_location": "s3://sample-bucket",
+            "location": "{table}",
+            "tables": ["public.store", "public.product"],
+            "truncate": True,
+            "sequences": False,
+            "strict": True,
+            "delta": True,
+        }
+    )
+
+
+def _mock_store(s3_resource, timestamp, names):
+    stores = [{"id": index, "name": name} for index, name in enumerate(names, start=1)]
+    mock_s3_csv(s3_resource, f"public.store/{timestamp}.csv", stores)
+
+
+def _mock_product(s3_resource, timestamp, count):
+    products = [
+        {
+            "id": index,
+            "store_id": 1,
+            "external_id": str(fake.unique.pyint()),
+            "external_name": fake.name(),
+            "external_status": "ACTIVE",
+            "active": True,
+        }
+        for index in range(1, count + 1)
+    ]
+    mock_s3_csv(s3_resource, f"public.product/{timestamp}.csv", products)
+
+
+def test_delta_records_restored_files(pg, s3_resource):
+    _mock_store(s3_resource, "2021-04-25T09:00:00", ["store"])
+    _mock_product(s3_resource, "2021-04-25T09:00:00", 2)
+
+    restore_all(pg, _config().restore)
+
+    delta = json.loads(s3_resource.Object("sample-bucket", "backups/delta.json").get()["Body"].read())
+    assert set(delta["tables"]) == {"public.store", "public.product"}
+    assert list(delta["tables"]["public.store"]) == ["s3://sample-bucket/public.store/2021-04-25T09:00:00.csv"]
+
+
+def test_delta_skips_unchanged_tables(pg, s3_resource):
+    """Validate only the tables whose backups changed are truncated and reloaded."""
+    _mock_store(s3_resource, "2021-04-25T09:00:00", ["store"])
+    _mock_product(s3_resource, "2021-04-25T09:00:00", 2)
+    restore_all(pg, _config().restore)
+
+    # A row which is only retained if the table is skipped.
+    pg.execute(text("INSERT INTO public.store (id, name) VALUES (2, 'unrestored')"))
+    pg.commit()
+
+    _mock_product(s3_resource, "2021-04-26T09:00:00", 3)
+    restore_all(pg, _config().restore)
+
+    assert pg.query(Store).count() == 2
+    assert pg.query(Product).count() == 3
+
+
+def test_delta_reloads_referencing_tables(pg, s3_resource):
+    """Validate a table referencing a reloaded table is reloaded, as truncating the referenced table cascades to it."""
+    _mock_store(s3_resource, "2021-04-25T09:00:00", ["store"])
+    _mock_product(s3_resource, "2021-04-25T09:00:00", 2)
+    restore_all(pg, _config().restore)
+
+    _mock_store(s3_resource, "2021-04-26T09:00:00", ["store", "other store"])
+    restore_all(pg, _config().restore)
+
+    assert pg.query(Store).count() == 2
+    assert pg.query(Product).count() == 2
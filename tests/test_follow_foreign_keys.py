@@ -1,11 +1,16 @@
+import csv
+from unittest.mock import patch
+
+import pytest
 from pytest_mock_resources import create_postgres_fixture
 from sqlalchemy import Column, ForeignKey, MetaData, types
 from sqlalchemy.ext.declarative import declarative_base
 
+from databudgie.adapter.postgres import PostgresAdapter
 from databudgie.backup import backup_all
 from databudgie.config import RootConfig
 from databudgie.restore import restore_all
-from tests.utils import mock_s3_csv, s3_config
+from tests.utils import get_file_buffer, mock_s3_csv, s3_config
 
 metadata = MetaData()
 Base = declarative_base(metadata=metadata)
@@ -119,3 +124,151 @@ def test_restore_follow_foreign_keys(pg, s3_resource):
     assert pg.query(Product).one().id == 2
     assert pg.query(Customer).one().id == 3
     assert pg.query(Address).one().id == 4
+
+
+def _ids(path):
+    content = get_file_buffer(str(path)).read().decode("utf-8")
+    return sorted(int(row["id"]) for row in csv.DictReader(content.splitlines()))
+
+
+def test_backup_follow_foreign_keys_subset(pg, tmp_path):
+    """Assert followed tables only include the rows referenced by the (filtered) rows being backed up.
+
+    Each level of foreign keys is restricted by the level before it, and a table
+    referenced by several tables includes the rows referenced by any of them.
+    """
+    stores = [Store(id=id) for id in (1, 2, 3)]
+    products = [Product(id=10, store_id=1), Product(id=20, store_id=2)]
+    customers = [Customer(id=100, product_id=20), Customer(id=200, product_id=10)]
+    addresses = [Address(id=1000, customer_id=100, store_id=1), Address(id=2000, customer_id=200, store_id=2)]
+    for rows in (stores, products, customers, addresses):
+        pg.add_all(rows)
+        pg.flush()
+    pg.commit()
+
+    config = RootConfig.from_dict(
+        {
+            "location": f"{tmp_path}/{{table}}",
+            "tables": [{"name": "public.t0_address", "query": "select * from {table} where store_id = 1"}],
+            "follow_foreign_keys": True,
+            "sequences": False,
+            "strict": True,
+        }
+    )
+    backup_all(pg, config.backup)
+
+    root = tmp_path / "public.t0_address"
+    assert _ids(root / "2021-04-26T09:00:00.csv") == [1000]
+    assert _ids(root / "public.t0_customer/2021-04-26T09:00:00.csv") == [100]
+    assert _ids(root / "public.t1_product/2021-04-26T09:00:00.csv") == [20]
+
+    # Referenced by the address (1), and by its customer's product (2).
+    assert _ids(root / "public.t0_store/2021-04-26T09:00:00.csv") == [1, 2]
+
+    # The subset restores without violating any foreign keys.
+    restore_config = RootConfig.from_dict(
+        {
+            "location": f"{tmp_path}/{{table}}",
+            "tables": ["public.t0_address"],
+            "follow_foreign_keys": True,
+            "sequences": False,
+            "truncate": True,
+            "strict": True,
+        }
+    )
+    restore_all(pg, restore_config.restore)
+
+    assert [store.id for store in pg.query(Store).order_by(Store.id)] == [1, 2]
+    assert [address.id for address in pg.query(Address)] == [1000]
+
+
+def test_backup_follow_foreign_keys_queries_each_table_once(pg, tmp_path):
+    """Assert each referencing table's query is included once, however many paths lead to it.
+
+    The store is referenced by the address directly, and through its customer's product.
+    """
+    config = RootConfig.from_dict(
+        {
+            "location": f"{tmp_path}/{{table}}",
+            "tables": [{"name": "public.t0_address", "query": "select * from {table} where store_id = 1"}],
+            "follow_foreign_keys": True,
+            "sequences": False,
+            "strict": True,
+        }
+    )
+
+    stream_query = PostgresAdapter.stream_query
+    with patch.object(PostgresAdapter, "stream_query", autospec=True, side_effect=stream_query) as spy:
+        backup_all(pg, config.backup)
+
+    queries = [call.args[1] for call in spy.call_args_list]
+    store_query = next(query for query in queries if "FROM public.t0_store WHERE" in query)
+    assert store_query.count("store_id = 1") == 1
+
+
+@pytest.mark.parametrize("sample", ({"percent": 50, "method": "bernoulli"}, 10))
+def test_backup_follow_foreign_keys_sampled(pg, tmp_path, sample):
+    """Assert followed tables include the rows referenced by the sample, rather than by the whole table."""
+    ids = range(1, 41)
+    for model in (
+        [Store(id=id) for id in ids],
+        [Product(id=id, store_id=id) for id in ids],
+        [Customer(id=id, product_id=id) for id in ids],
+        [Address(id=id, customer_id=id, store_id=id) for id in ids],
+    ):
+        pg.add_all(model)
+        pg.flush()
+    pg.commit()
+
+    config = RootConfig.from_dict(
+        {
+            "location": f"{tmp_path}/{{table}}",
+            "tables": [{"name": "public.t0_address", "sample": sample}],
+            "follow_foreign_keys": True,
+            "sequences": False,
+            "strict": True,
+        }
+    )
+    backup_all(pg, config.backup)
+
+    root = tmp_path / "public.t0_address"
+    sampled = _ids(root / "2021-04-26T09:00:00.csv")
+    assert 0 < len(sampled) < len(ids)
+
+    assert _ids(root / "public.t0_customer/2021-04-26T09:00:00.csv") == sampled
+    assert _ids(root / "public.t1_product/2021-04-26T09:00:00.csv") == sampled
+    assert _ids(root / "public.t0_store/2021-04-26T09:00:00.csv") == sampled
+
+
+def test_backup_follow_foreign_keys_referenced_by_other_tables(pg, tmp_path):
+    """Assert followed tables include the rows referenced by backed up tables which do not follow foreign keys."""
+    stores = [Store(id=id) for id in (1, 2, 3, 30)]
+    products = [Product(id=10, store_id=1), Product(id=20, store_id=2)]
+    customers = [Customer(id=100, product_id=10)]
+    addresses = [Address(id=1000, customer_id=100, store_id=1)]
+    sales = [Sale(id=1, store_id=3, product_id=20), Sale(id=2, store_id=30, product_id=10)]
+    for rows in (stores, products, customers, addresses, sales):
+        pg.add_all(rows)
+        pg.flush()
+    pg.commit()
+
+    config = RootConfig.from_dict(
+        {
+            "location": f"{tmp_path}/{{table}}",
+            "tables": [
+                {"name": "public.t0_address", "query": "select * from {table} where store_id = 1"},
+                {"name": "public.t0_sales", "follow_foreign_keys": False},
+            ],
+            "follow_foreign_keys": True,
+            "sequences": False,
+            "strict": True,
+        }
+    )
+    backup_all(pg, config.backup)
+
+    root = tmp_path / "public.t0_address"
+    assert _ids(tmp_path / "public.t0_sales/2021-04-26T09:00:00.csv") == [1, 2]
+    assert _ids(root / "public.t1_product/2021-04-26T09:00:00.csv") == [10, 20]
+
+    # Referenced by the address and its customer's product (1), the sales (3, 30), and the sold product (2).
+    assert _ids(root / "public.t0_store/2021-04-26T09:00:00.csv") == [1, 2, 3, 30]
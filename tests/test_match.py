@@ -1,7 +1,7 @@
 import pytest
 from pytest_mock_resources import create_postgres_fixture
 
-from databudgie.match import expand_table_globs
+from databudgie.match import compile_patterns, expand_table_globs, TableMatcher
 
 pg = create_postgres_fixture(session=True)
 
@@ -34,3 +34,24 @@ class Test_expand_table_globs:
 
         result = expand_table_globs(existing_tables, glob)
         assert result == ["bar.bar", "foo.bar", "public.bar"]
+
+
+EXISTING_TABLES = ("foo.bar", "foo.baz", "public.bar", "public.baz", "public.qux", "unqualified")
+
+
+class Test_TableMatcher:
+    @pytest.mark.parametrize(
+        "pattern",
+        ("*", "*.*", "foo.*", "public.ba?", "*.bar", "public.bar", "public.missing", "missing.*", "f[o]o.*", "unq*"),
+    )
+    def test_equivalent_to_expand_table_globs(self, pattern):
+        matcher = TableMatcher.from_tables(EXISTING_TABLES)
+        assert matcher.expand(pattern) == expand_table_globs(EXISTING_TABLES, pattern)
+
+
+def test_compile_patterns():
+    pattern = compile_patterns(["public.foo*", "*.bar", "ex[ac]ct"])
+    assert pattern
+
+    names = ["public.foo", "public.food", "other.bar", "exact", "other.baz", "public.fo"]
+    assert [name for name in names if pattern.match(name)] == ["public.foo", "public.food", "other.bar", "exact"]
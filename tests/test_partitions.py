@@ -0,0 +1,165 @@
+import threading
+from unittest.mock import patch
+
+import pytest
+from pytest_mock_resources import create_postgres_fixture
+from sqlalchemy import text
+
+from databudgie.adapter.postgres import PostgresAdapter
+from databudgie.backup import backup_all
+from databudgie.config import RootConfig
+from databudgie.prefetch import Prefetcher
+from databudgie.restore import restore_all
+
+empty_db = create_postgres_fixture(session=True)
+
+LEAF_PARTITIONS = {"public.events_1": 99, "public.events_2_a": 50, "public.events_2_b": 50}
+
+
+@pytest.fixture
+def events(pg):
+    """A partitioned table, with one of its partitions partitioned further."""
+    for statement in [
+        "CREATE TABLE public.events (id integer NOT NULL, kind text NOT NULL) PARTITION BY RANGE (id)",
+        "CREATE TABLE public.events_1 PARTITION OF public.events FOR VALUES FROM (1) TO (100)",
+        "CREATE TABLE public.events_2 PARTITION OF public.events FOR VALUES FROM (100) TO (200) PARTITION BY LIST (kind)",
+        "CREATE TABLE public.events_2_a PARTITION OF public.events_2 FOR VALUES IN ('a')",
+        "CREATE TABLE public.events_2_b PARTITION OF public.events_2 DEFAULT",
+        "CREATE INDEX ix_events_kind ON public.events (kind)",
+        "INSERT INTO public.events SELECT g, CASE WHEN g % 2 = 0 THEN 'a' ELSE 'b' END FROM generate_series(1, 199) g",
+    ]:
+        pg.execute(text(statement))
+    pg.commit()
+    return "public.events"
+
+
+def _config(tmp_path, **table_config):
+    return RootConfig.from_dict(
+        {
+            "location": f"{tmp_path}/{{table}}",
+            "ddl": {"enabled": True, "location": f"{tmp_path}/ddl"},
+            "tables": {"public.events": table_config},
+            "sequences": False,
+            "strict": True,
+        }
+    )
+
+
+def _partition_counts(session):
+    rows = session.execute(text("SELECT tableoid::regclass::text, count(*) FROM public.events GROUP BY 1"))
+    return {f"public.{name}": count for name, count in rows}
+
+
+def test_collect_existing_tables(pg, events):
+    """Validate a partitioned table is collected, rather than each of its partitions."""
+    tables = PostgresAdapter(pg).collect_existing_tables()
+    assert events in tables
+    assert not {"public.events_1", "public.events_2", "public.events_2_a"} & set(tables)
+
+
+@pytest.fixture(params=["server", "pg11"])
+def adapter(pg, request):
+    """An adapter for the test database, and one which behaves as though it were Postgres 11."""
+    if request.param == "server":
+        yield PostgresAdapter(pg)
+        return
+
+    with patch.object(PostgresAdapter, "server_version", (11, 0)):
+        yield PostgresAdapter(pg)
+
+
+def test_collect_partitions(adapter, events):
+    partitions = adapter.collect_partitions(events)
+    assert [(partition.name, partition.leaf) for partition in partitions] == [
+        ("public.events_1", True),
+        ("public.events_2", False),
+        ("public.events_2_a", True),
+        ("public.events_2_b", True),
+    ]
+
+
+def test_collect_table_sizes(pg, events):
+    adapter = PostgresAdapter(pg)
+    sizes = adapter.collect_table_sizes([events, "public.events_2", "public.customer", "public.missing"])
+    assert set(sizes) == {events, "public.events_2", "public.customer"}
+
+    # A partitioned table's size includes that of each of its partitions.
+    partition_sizes = adapter.collect_table_sizes(list(LEAF_PARTITIONS))
+    assert sizes[events] >= sum(partition_sizes.values()) > 0
+    assert sizes["public.events_2"] >= partition_sizes["public.events_2_a"] + partition_sizes["public.events_2_b"]
+
+
+def test_backup_partitions(pg, events, tmp_path):
+    """Validate each leaf partition is backed up, grouped under the partitioned table."""
+    backup_all(pg, _config(tmp_path, partition_parallelism=2).backup)
+
+    partitions_dir = tmp_path / "public.events" / "partitions"
+    assert sorted(path.name for path in partitions_dir.iterdir()) == sorted(LEAF_PARTITIONS)
+    for partition, count in LEAF_PARTITIONS.items():
+        lines = (partitions_dir / partition / "2021-04-26T09:00:00.csv").read_text().splitlines()
+        assert len(lines) == count + 1
+
+    assert not (tmp_path / "public.events" / "2021-04-26T09:00:00.csv").exists()
+
+
+def test_restore_partitions(pg, events, empty_db, tmp_path):
+    """Validate the partitioned table is recreated from its DDL, and each partition is restored."""
+    config = _config(tmp_path, rebuild_indexes=True)
+    backup_all(pg, config.backup)
+
+    restore_all(empty_db, config.restore)
+
+    assert _partition_counts(empty_db) == LEAF_PARTITIONS
+    indexes = empty_db.execute(text("SELECT indexname FROM pg_indexes WHERE tablename = 'events'")).scalars().all()
+    assert indexes == ["ix_events_kind"]
+
+
+def test_restore_partitions_concurrently(pg, events, empty_db, tmp_path):
+    """Validate the partitions are loaded `load_parallelism` at a time."""
+    config = _config(tmp_path, load_parallelism=2)
+    backup_all(pg, config.backup)
+
+    # Two partitions are loaded at once, or neither finishes.
+    barrier = threading.Barrier(2, timeout=10)
+    import_csv = PostgresAdapter.import_csv
+
+    def import_together(self, csv_file, table, *, parallelism=1):
+        assert parallelism == 1
+        if table != "public.events_2_b":
+            barrier.wait()
+        return import_csv(self, csv_file, table, parallelism=parallelism)
+
+    with patch.object(PostgresAdapter, "import_csv", import_together):
+        restore_all(empty_db, config.restore)
+
+    assert _partition_counts(empty_db) == LEAF_PARTITIONS
+
+
+def test_restore_partitions_prefetched(pg, events, empty_db, tmp_path):
+    """Validate each partition's backup is downloaded ahead of time, while the preceding table is loaded."""
+    pg.execute(text("CREATE TABLE public.audit (id integer primary key)"))
+    pg.commit()
+
+    config = RootConfig.from_dict(
+        {
+            "location": f"{tmp_path}/{{table}}",
+            "ddl": {"enabled": True, "location": f"{tmp_path}/ddl"},
+            "tables": ["public.audit", "public.events"],
+            "sequences": False,
+            "strict": True,
+        }
+    )
+    backup_all(pg, config.backup)
+
+    downloads = []
+    download = Prefetcher.download
+
+    def spy_download(self, data_file, *, on_disk):
+        downloads.append(data_file.path)
+        return download(self, data_file, on_disk=on_disk)
+
+    with patch.object(Prefetcher, "download", spy_download):
+        restore_all(empty_db, config.restore)
+
+    assert sorted(path.split("/")[-2] for path in downloads) == sorted(LEAF_PARTITIONS)
+    assert _partition_counts(empty_db) == LEAF_PARTITIONS
@@ -0,0 +1,40 @@
+import itertools
+
+import pytest
+
+from databudgie.pipeline import Pipeline
+
+
+def test_stage_failure_stops_pipeline():
+    closed = []
+
+    def numbers():
+        try:
+            yield from itertools.count()
+        finally:
+            closed.append(True)
+
+    def fail_at_ten(items):
+        for item in items:
+            if item == 10:
+                raise ValueError("Dummy error")
+            yield item
+
+    pipeline = Pipeline(source=("numbers", numbers), stages=[("fail", fail_at_ten)], sink=("sum", sum), maxsize=1)
+    with pytest.raises(ValueError):
+        pipeline.run()
+
+    # The (otherwise infinite) source is abandoned and cleaned up.
+    assert closed == [True]
+
+
+def test_sink_failure_stops_pipeline():
+    def fail(items):
+        next(iter(items))
+        raise ValueError("Dummy error")
+
+    pipeline = Pipeline(source=("numbers", itertools.count), sink=("fail", fail))
+    with pytest.raises(ValueError):
+        pipeline.run()
+
+    assert set(pipeline.timings) == {"numbers", "fail"}
@@ -0,0 +1,100 @@
+import functools
+from unittest.mock import patch
+
+import faker
+import pytest
+
+from databudgie.adapter import Adapter
+from databudgie.backup import backup_all
+from databudgie.config import RootConfig
+from databudgie.prefetch import Prefetcher
+from databudgie.restore import find_data_files, restore_all
+from databudgie.storage import StorageBackend
+from databudgie.table_op import expand_table_ops
+from tests.mockmodels.models import Customer, Product, Store
+
+fake = faker.Faker()
+
+
+def _backup(pg, mf, tmp_path, **prefetch):
+    store = mf.store.new(name=fake.name())
+    mf.product.new(store=store)
+    mf.customer.new(store=store)
+
+    config = RootConfig.from_dict(
+        {
+            "location": str(tmp_path / "backups/{table}"),
+            "tables": ["public.store", "public.product", "public.customer"],
+            "compression": "gzip",
+            "sequences": False,
+            "truncate": True,
+            "strict": True,
+            "restore": {"prefetch": prefetch},
+        }
+    )
+    backup_all(pg, config.backup)
+    return config, _counts(pg)
+
+
+def _counts(pg):
+    return [pg.query(model).count() for model in (Store, Product, Customer)]
+
+
+def _restore(pg, config, counts):
+    downloads = []
+    download = Prefetcher.download
+
+    def spy_download(self, data_file, *, on_disk):
+        downloads.append(on_disk)
+        return download(self, data_file, on_disk=on_disk)
+
+    with patch.object(Prefetcher, "download", spy_download):
+        restore_all(pg, config.restore)
+
+    assert _counts(pg) == counts
+    return downloads
+
+
+def test_prefetch_into_memory(pg, mf, tmp_path):
+    config, counts = _backup(pg, mf, tmp_path, tables=2)
+
+    # Every table but the first is downloaded ahead of time.
+    downloads = _restore(pg, config, counts)
+    assert downloads == [False, False]
+
+
+def test_prefetch_spills_to_disk(pg, mf, tmp_path):
+    config, counts = _backup(pg, mf, tmp_path, memory=0, disk="1MB", directory=str(tmp_path))
+
+    downloads = _restore(pg, config, counts)
+    assert downloads == [True, True]
+
+
+@pytest.mark.parametrize("prefetch", [{"memory": 0}, {"tables": 0}])
+def test_prefetch_beyond_budget(pg, mf, tmp_path, prefetch):
+    """Tables which do not fit within the budget are downloaded as they are loaded."""
+    config, counts = _backup(pg, mf, tmp_path, **prefetch)
+
+    downloads = _restore(pg, config, counts)
+    assert downloads == []
+
+
+def test_prefetch_released_on_failure(pg, mf, tmp_path):
+    """Validate a table's prefetched data is released, even though restoring the table failed."""
+    config, _ = _backup(pg, mf, tmp_path)
+
+    storage = StorageBackend.from_config(config.restore)
+    adapter = Adapter.get_adapter(pg)
+    table_ops = expand_table_ops(pg, config.restore.tables, adapter.collect_existing_tables(), storage=storage)
+
+    find = functools.partial(find_data_files, adapter, storage)
+    with Prefetcher(storage, find, config=config.restore.prefetch) as prefetcher:
+        prefetcher.schedule(table_ops)
+        size = sum(data_file.size for _, data_file in find(table_ops[0]))
+        used = prefetcher.memory_used
+
+        with pytest.raises(ValueError), prefetcher.take("public.store") as files:
+            raise ValueError("Failed to restore")
+
+        assert files and all(file.content and file.content.closed for file in files)
+        assert prefetcher.memory_used == used - size
@@ -0,0 +1,28 @@
+import pstats
+from unittest.mock import patch
+
+from databudgie.api import backup
+from databudgie.config import RootConfig
+from databudgie.output import default_console, Table
+
+
+def test_profile_each_phase(pg, tmp_path):
+    config = RootConfig.from_dict({"location": str(tmp_path / "backups/{table}"), "tables": ["public.store"]})
+
+    with patch.object(default_console, "print") as print_:
+        backup(pg, config.backup, profile=str(tmp_path / "profiles"))
+
+    phases = ("planning", "ddl", "sequences", "data")
+    for phase in phases:
+        assert (tmp_path / f"profiles/backup-{phase}.prof").exists()
+
+    planning = pstats.Stats(str(tmp_path / "profiles/backup-planning.prof"))
+    assert any(name == "expand_table_ops" for _, _, name in planning.stats)
+
+    # The table's data is queried on a pipeline thread, which is profiled into the phase too.
+    data = pstats.Stats(str(tmp_path / "profiles/backup-data.prof"))
+    assert any(name == "stream_query" for _, _, name in data.stats)
+
+    # One hotspot summary per phase.
+    titles = [call.args[0].title for call in print_.call_args_list if call.args and isinstance(call.args[0], Table)]
+    assert titles == [f"Profile: {phase} ({tmp_path}/profiles/backup-{phase}.prof)" for phase in phases]
@@ -2,13 +2,16 @@ import os.path
 import tempfile
 import uuid
 from datetime import datetime
+from unittest.mock import patch
 
 import faker
 import pytest
+from psycopg.errors import DataError, IntegrityError
 from sqlalchemy import create_engine, text
 from sqlalchemy.exc import ProgrammingError
 from sqlalchemy.orm.session import sessionmaker
 
+from databudgie.adapter.postgres import PostgresAdapter
 from databudgie.config import RootConfig
 from databudgie.restore import restore_all
 from tests.mockmodels.models import Product, Store
@@ -285,3 +288,187 @@ def test_compression(pg, s3_resource, config):
     restore_all(pg, config.restore)
 
     assert pg.query(Store).count() == 1
+
+
+def _product_indexes(pg):
+    return pg.execute(
+        text("SELECT indexname FROM pg_indexes WHERE schemaname = 'public' AND tablename = 'product'")
+    ).scalars()
+
+
+def test_rebuild_indexes(pg, mf, s3_resource):
+    """Validate secondary indexes are absent during the load, and rebuilt afterwards."""
+    store = mf.store.new(name=fake.name())
+    original_indexes = set(_product_indexes(pg))
+
+    mock_product = {
+        "id": 1,
+        "store_id": store.id,
+        "external_id": fake.unique.pyint(),
+        "external_name": fake.name(),
+        "external_status": "ACTIVE",
+        "active": True,
+    }
+    mock_s3_csv(s3_resource, "products/2021-04-26T09:00:00.csv", [mock_product])
+
+    config = RootConfig.from_dict(
+        {
+            **s3_config,
+            "strict": True,
+            "tables": {
+                "product": {"truncate": True, "rebuild_indexes": True, "location": "s3://sample-bucket/products"}
+            },
+        }
+    )
+
+    indexes_during_load = set()
+    import_csv = PostgresAdapter.import_csv
+
+    def spy_import_csv(self, csv_file, table, **kwargs):
+        indexes_during_load.update(_product_indexes(self.session))
+        return import_csv(self, csv_file, table, **kwargs)
+
+    with patch.object(PostgresAdapter, "import_csv", spy_import_csv):
+        restore_all(pg, config.restore)
+
+    assert pg.query(Product).count() == 1
+    assert "ix_product_store_id" in original_indexes
+
+    # Constraint-backed indexes are left in place.
+    assert indexes_during_load == original_indexes - {"ix_product_store_id"}
+    assert set(_product_indexes(pg)) == original_indexes
+
+
+def test_rebuild_indexes_after_failed_load(pg, s3_resource):
+    """Validate secondary indexes are rebuilt, even when the load fails."""
+    original_indexes = set(_product_indexes(pg))
+    mock_s3_csv(s3_resource, "products/2021-04-26T09:00:00.csv", [{"id": 1, "store_id": "not-an-int"}])
+
+    config = RootConfig.from_dict(
+        {
+            **s3_config,
+            "strict": True,
+            "tables": {"product": {"rebuild_indexes": True, "location": "s3://sample-bucket/products"}},
+        }
+    )
+
+    with pytest.raises(DataError):
+        restore_all(pg, config.restore)
+
+    assert set(_product_indexes(pg)) == original_indexes
+
+
+def _orphaned_product_config(fast_load):
+    return RootConfig.from_dict(
+        {
+            **s3_config,
+            "strict": True,
+            "fast_load": fast_load,
+            "tables": {"product": {"location": "s3://sample-bucket/products"}},
+        }
+    )
+
+
+def _mock_orphaned_product(s3_resource):
+    mock_product = {
+        "id": 1,
+        "store_id": 999,
+        "external_id": fake.unique.pyint(),
+        "external_name": fake.name(),
+        "external_status": "ACTIVE",
+        "active": True,
+    }
+    mock_s3_csv(s3_resource, "products/2021-04-26T09:00:00.csv", [mock_product])
+
+
+def test_fast_load_skips_foreign_key_checks(pg, s3_resource):
+    """Validate `fast_load` defers foreign key checks, without leaking its settings to the connection pool."""
+    _mock_orphaned_product(s3_resource)
+
+    config = _orphaned_product_config({"validate_foreign_keys": False})
+    restore_all(pg, config.restore)
+
+    assert pg.query(Product).count() == 1
+
+    engine = pg.get_bind()
+    with engine.connect() as conn:
+        assert conn.execute(text("SHOW session_replication_role")).scalar() == "origin"
+        assert conn.execute(text("SHOW synchronous_commit")).scalar() == "on"
+
+
+def test_fast_load_validates_foreign_keys(pg, s3_resource):
+    _mock_orphaned_product(s3_resource)
+
+    config = _orphaned_product_config(True)
+    with pytest.raises(ValueError) as e:
+        restore_all(pg, config.restore)
+
+    assert "public.product violates foreign keys: product_store_id_fkey (1 rows)" in str(e.value)
+
+
+def _parallel_store_config():
+    return RootConfig.from_dict(
+        {
+            **s3_config,
+            "strict": True,
+            "block_size": 256,
+            "tables": {"store": {"load_parallelism": 3, "location": "s3://sample-bucket/stores"}},
+        }
+    )
+
+
+def test_load_parallelism(pg, s3_resource):
+    """Validate a table is loaded over several connections, without splitting records which span lines."""
+    stores = [{"id": i, "name": f'store "{i}"\nline {i}'} for i in range(1, 501)]
+    mock_s3_csv(s3_resource, "stores/2021-04-26T09:00:00.csv", stores)
+
+    restore_all(pg, _parallel_store_config().restore)
+
+    names = dict(pg.query(Store.id, Store.name).all())
+    assert names == {store["id"]: store["name"] for store in stores}
+
+
+def test_load_parallelism_failure(pg, s3_resource):
+    """Validate a row conflicting with a row loaded by another connection fails, rather than waiting on it."""
+    stores = [{"id": i, "name": f"store {i}"} for i in range(1, 501)]
+    stores[400]["name"] = "store 1"
+    mock_s3_csv(s3_resource, "stores/2021-04-26T09:00:00.csv", stores)
+
+    with pytest.raises(IntegrityError):
+        restore_all(pg, _parallel_store_config().restore)
+
+
+def test_restore_parallelism(pg, s3_resource):
+    """Validate tables are restored concurrently, with referenced tables restored before those referencing them.
+
+    The product table is larger, so would be started first, were it not for its
+    foreign key to the store table.
+    """
+    mock_s3_csv(s3_resource, "public.store/2021-04-26T09:00:00.csv", [{"id": 1, "name": fake.name()}])
+    mock_products = [
+        {
+            "id": i,
+            "store_id": 1,
+            "external_id": str(fake.unique.pyint()),
+            "external_name": fake.name(),
+            "external_status": "ACTIVE",
+            "active": True,
+        }
+        for i in range(1, 101)
+    ]
+    mock_s3_csv(s3_resource, "public.product/2021-04-26T09:00:00.csv", mock_products)
+
+    config = RootConfig.from_dict(
+        {
+            **s3_config,
+            "strict": True,
+            "parallelism": 2,
+            "location": "s3://sample-bucket/{table}",
+            "tables": ["public.product", "public.store"],
+            "sequences": False,
+        }
+    )
+    restore_all(pg, config.restore)
+
+    assert pg.query(Store).count() == 1
+    assert pg.query(Product).count() == 100
@@ -0,0 +1,108 @@
+import csv
+from unittest.mock import patch
+
+import pytest
+from sqlalchemy import text
+
+from databudgie.adapter import Adapter
+from databudgie.adapter.postgres import PostgresAdapter
+from databudgie.backup import backup_all
+from databudgie.config import RootConfig
+from tests.utils import get_file_buffer
+
+ROWS = 2000
+
+
+@pytest.fixture
+def numbers(pg):
+    pg.execute(text("CREATE TABLE public.numbers (id integer primary key, parity text)"))
+    pg.execute(
+        text(
+            "INSERT INTO public.numbers SELECT g, CASE WHEN g % 2 = 0 THEN 'even' ELSE 'odd' END FROM generate_series(1, :rows) g"
+        ),
+        {"rows": ROWS},
+    )
+
+    # Populates the estimated row count, used to sample a number of rows.
+    pg.execute(text("ANALYZE public.numbers"))
+    pg.commit()
+    return "public.numbers"
+
+
+def _backup(pg, tmp_path, table_config, adapter=None):
+    config = RootConfig.from_dict(
+        {
+            "location": f"{tmp_path}/{{table}}",
+            "tables": {"public.numbers": table_config},
+            "sequences": False,
+            "ddl": False,
+            "strict": True,
+        }
+    )
+    if adapter:
+        with patch("databudgie.backup.Adapter.get_adapter", return_value=adapter):
+            backup_all(pg, config.backup)
+    else:
+        backup_all(pg, config.backup)
+
+    buffer = get_file_buffer(f"{tmp_path}/public.numbers/2021-04-26T09:00:00.csv")
+    return list(csv.DictReader(buffer.read().decode("utf-8").splitlines()))
+
+
+@pytest.mark.parametrize("python_adapter", (False, True))
+def test_sample_rows(pg, numbers, tmp_path, python_adapter):
+    rows = _backup(pg, tmp_path, {"sample": 25}, adapter=Adapter(pg) if python_adapter else None)
+    assert len(rows) == 25
+    assert len({row["id"] for row in rows}) == 25
+
+
+@pytest.mark.parametrize("python_adapter", (False, True))
+def test_sample_percent(pg, numbers, tmp_path, python_adapter):
+    sample = {"percent": "10%", "method": "bernoulli", "seed": 4}
+    rows = _backup(pg, tmp_path, {"sample": sample}, adapter=Adapter(pg) if python_adapter else None)
+    assert ROWS * 0.05 < len(rows) < ROWS * 0.15
+
+
+def test_sample_custom_query(pg, numbers, tmp_path):
+    """Validate the table is sampled within a custom query, which can still refer to it by name."""
+    table_config = {
+        "query": "select * from {table} where numbers.parity = 'even'",
+        "sample": {"percent": 50, "rows": 100, "method": "bernoulli", "seed": 1},
+    }
+    rows = _backup(pg, tmp_path, table_config)
+
+    assert len(rows) == 100
+    assert {row["parity"] for row in rows} == {"even"}
+
+
+def test_sample_repeatable(pg, numbers, tmp_path):
+    sample = {"percent": 20, "seed": 7, "method": "bernoulli"}
+    first = _backup(pg, tmp_path / "first", {"sample": sample})
+    second = _backup(pg, tmp_path / "second", {"sample": sample})
+    assert first == second
+
+
+def test_sample_uses_tablesample(pg, numbers, tmp_path):
+    """Validate only the sampled portion of the table is read, rather than filtering the whole table."""
+    stream_query = PostgresAdapter.stream_query
+    with patch.object(PostgresAdapter, "stream_query", autospec=True, side_effect=stream_query) as spy:
+        _backup(pg, tmp_path, {"sample": {"percent": 10, "seed": 2}})
+
+    query = spy.call_args.args[1]
+    assert 'WITH "numbers" AS (SELECT * FROM public.numbers TABLESAMPLE SYSTEM (10.0) REPEATABLE (2))' in query
+
+
+@pytest.mark.parametrize(
+    "query",
+    (
+        "select n.* from {table} n where n.parity = 'even'",
+        "select * from {table} where {table}.parity = 'even'",
+        "with evens as (select * from {table} where parity = 'even') select * from evens",
+    ),
+)
+def test_sample_query_refers_to_table(pg, numbers, tmp_path, query):
+    """Validate a custom query can alias the table, or qualify its columns, while it is sampled."""
+    rows = _backup(pg, tmp_path, {"query": query, "sample": {"percent": 50, "method": "bernoulli", "seed": 3}})
+
+    assert 0 < len(rows) < ROWS / 2
+    assert {row["parity"] for row in rows} == {"even"}
@@ -0,0 +1,48 @@
+import threading
+
+import pytest
+
+from databudgie.schedule import run_largest_first
+
+
+def test_largest_first():
+    started = run_largest_first(lambda item: None, {"a": 1, "b": 5, "c": 3, "d": 5}, parallelism=2)
+
+    # Ties are started in their original order.
+    assert started == ["b", "d", "c", "a"]
+
+
+def test_dependencies_finish_first():
+    finished = []
+    lock = threading.Lock()
+
+    def work(item):
+        with lock:
+            finished.append(item)
+
+    costs = {"small": 1, "parent": 2, "child": 10, "grandchild": 20}
+    dependencies = {"child": {"parent"}, "grandchild": {"child", "missing"}}
+    run_largest_first(work, costs, parallelism=3, dependencies=dependencies)
+
+    assert finished.index("parent") < finished.index("child") < finished.index("grandchild")
+
+
+def test_dependency_cycle():
+    started = run_largest_first(
+        lambda item: None, {"a": 1, "b": 2}, parallelism=2, dependencies={"a": {"b"}, "b": {"a"}}
+    )
+    assert started == ["b", "a"]
+
+
+def test_failure_stops_scheduling():
+    started = []
+
+    def work(item):
+        started.append(item)
+        if item == "b":
+            raise ValueError("Dummy error")
+
+    with pytest.raises(ValueError):
+        run_largest_first(work, {"a": 1, "b": 3, "c": 2}, parallelism=1)
+
+    assert started == ["b"]
@@ -0,0 +1,91 @@
+import gzip
+
+import faker
+import pytest
+from freezegun import freeze_time
+
+from databudgie.backup import backup_all
+from databudgie.config import RootConfig
+from databudgie.restore import restore_all
+from databudgie.storage import POINTER_PREFIX
+from tests.mockmodels.models import Store
+from tests.utils import s3_config
+
+fake = faker.Faker()
+
+
+def _config(compression=None):
+    return RootConfig.from_dict(
+        {
+            "location": "s3://sample-bucket/{table}",
+            "tables": ["public.store"],
+            "sequences": False,
+            "strict": True,
+            "truncate": True,
+            "skip_if_unchanged": True,
+            "compression": compression,
+            **s3_config,
+        }
+    )
+
+
+def _read(s3_resource, key):
+    return s3_resource.Object("sample-bucket", key).get()["Body"].read()
+
+
+@pytest.mark.parametrize("compression, ext", ((None, "csv"), ("gzip", "csv.gz")))
+def test_unchanged_data_writes_pointer(pg, mf, s3_resource, compression, ext):
+    """Validate an unchanged table only writes a pointer, which restore follows transparently."""
+    mf.store.new(name=fake.name())
+    config = _config(compression)
+
+    backup_all(pg, config.backup)
+    with freeze_time("2021-04-27 09:00:00"):
+        backup_all(pg, config.backup)
+
+    first = f"s3://sample-bucket/public.store/2021-04-26T09:00:00.{ext}"
+    second = _read(s3_resource, f"public.store/2021-04-27T09:00:00.{ext}")
+    assert second == POINTER_PREFIX + first.encode()
+
+    first_digest = _read(s3_resource, f"public.store/2021-04-26T09:00:00.{ext}.sha256")
+    second_digest = _read(s3_resource, f"public.store/2021-04-27T09:00:00.{ext}.sha256")
+    assert first_digest == second_digest
+    assert first_digest.endswith(f"  {first}\n".encode())
+
+    pg.query(Store).delete()
+    pg.commit()
+
+    restore_all(pg, config.restore)
+    assert pg.query(Store).count() == 1
+
+
+def test_changed_data_writes_data(pg, mf, s3_resource):
+    mf.store.new(name=fake.name())
+    config = _config()
+
+    backup_all(pg, config.backup)
+
+    mf.store.new(name=fake.name())
+    with freeze_time("2021-04-27 09:00:00"):
+        backup_all(pg, config.backup)
+
+    second = _read(s3_resource, "public.store/2021-04-27T09:00:00.csv")
+    assert not second.startswith(POINTER_PREFIX)
+    assert len(second.splitlines()) == 3
+
+
+def test_pointers_refer_to_original_data(pg, mf, s3_resource):
+    """Validate repeated unchanged backups point at the data, rather than at each other."""
+    mf.store.new(name=fake.name())
+    config = _config("gzip")
+
+    backup_all(pg, config.backup)
+    for day in ("27", "28"):
+        with freeze_time(f"2021-04-{day} 09:00:00"):
+            backup_all(pg, config.backup)
+
+    pointer = _read(s3_resource, "public.store/2021-04-28T09:00:00.csv.gz")
+    assert pointer == POINTER_PREFIX + b"s3://sample-bucket/public.store/2021-04-26T09:00:00.csv.gz"
+
+    data = gzip.decompress(_read(s3_resource, "public.store/2021-04-26T09:00:00.csv.gz"))
+    assert data.startswith(b"id,name\n")
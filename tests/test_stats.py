@@ -0,0 +1,136 @@
+import json
+from unittest.mock import patch
+
+import faker
+from freezegun import freeze_time
+from sqlalchemy import text
+
+from databudgie.adapter.postgres import PostgresAdapter
+from databudgie.api import backup, restore
+from databudgie.config import RootConfig
+from databudgie.output import default_console
+
+fake = faker.Faker()
+
+
+def _config(tmp_path):
+    return RootConfig.from_dict(
+        {
+            "location": str(tmp_path / "{table}"),
+            "tables": ["public.store"],
+            "compression": "gzip",
+            "truncate": True,
+            "strict": True,
+        }
+    )
+
+
+def test_stats_report(pg, mf, tmp_path):
+    for _ in range(3):
+        mf.store.new(name=fake.name())
+
+    config = _config(tmp_path)
+    report_path = tmp_path / "backup.json"
+
+    # Timings are measured with `perf_counter`, which would otherwise be frozen.
+    with freeze_time("2021-04-26 09:00:00", tick=True):
+        backup(pg, config.backup, stats_json=str(report_path))
+
+    report = json.loads(report_path.read_text())
+    assert report["operation"] == "backup"
+    assert set(report["phases"]) == {"planning", "ddl", "sequences", "data"}
+
+    [table] = [table for table in report["tables"] if table["name"] == "public.store"]
+    assert table["rows"] == 3
+    assert set(table["stages"]) == {"query", "compress", "upload"}
+    assert table["raw_bytes"] > 0
+    assert table["compressed_bytes"] > 0
+    assert table["rows_per_second"] > 0
+
+    report_path = tmp_path / "restore.json"
+    restore(pg, config.restore, console=default_console, stats_json=str(report_path))
+
+    report = json.loads(report_path.read_text())
+    [table] = [table for table in report["tables"] if table["name"] == "public.store"]
+    assert table["rows"] == 3
+    assert set(table["stages"]) == {"download", "decompress", "load"}
+    assert table["raw_bytes"] > 0
+    assert table["compressed_bytes"] > 0
+
+
+def test_stats_prometheus(pg, mf, tmp_path):
+    mf.store.new(name=fake.name())
+
+    config = _config(tmp_path)
+    report_path = tmp_path / "databudgie.prom"
+    backup(pg, config.backup, stats_prometheus=str(report_path))
+
+    report = report_path.read_text()
+    assert 'databudgie_table_rows{operation="backup",table="public.store"} 1\n' in report
+    assert 'databudgie_table_stage_seconds{operation="backup",table="public.store",stage="query"}' in report
+    assert 'databudgie_phase_seconds{operation="backup",phase="data"}' in report
+
+
+def test_dry_run_estimates(pg, mf, tmp_path):
+    """Validate a dry run estimates each table's data from the database's statistics, without reading it."""
+    for _ in range(3):
+        mf.store.new(name=fake.name())
+    pg.execute(text("ANALYZE public.store"))
+    pg.commit()
+
+    config = RootConfig.from_dict(
+        {
+            "location": str(tmp_path / "{table}"),
+            "tables": ["public.store", {"name": "public.product", "query": "select id from {table} where id > 0"}],
+            "estimated_throughput": "1KB",
+            "strict": True,
+        }
+    )
+    report_path = tmp_path / "backup.json"
+
+    with patch.object(PostgresAdapter, "stream_query", side_effect=AssertionError("Read table data")):
+        backup(pg, config.backup, dry_run=True, stats_json=str(report_path))
+
+    report = json.loads(report_path.read_text())
+    tables = {table["name"]: table for table in report["tables"]}
+
+    # The default query is estimated from the table's statistics and size on disk.
+    store = tables["public.store"]
+    assert store["estimated"] is True
+    assert store["rows"] == 3
+    assert store["raw_bytes"] > 0
+    assert store["estimated_seconds"] == store["raw_bytes"] / 1024
+
+    # Any other query is estimated by the planner, as its rows multiplied by their width.
+    product = tables["public.product"]
+    assert product["estimated"] is True
+    assert product["rows"] > 0
+    assert product["raw_bytes"] == product["rows"] * 4
+
+    assert not list(tmp_path.glob("public.*"))
+
+
+def test_throttle_stats(pg, mf, tmp_path):
+    """Validate the time spent waiting on throttles is reported, for each throttle."""
+    mf.store.new(name=fake.name())
+
+    config = RootConfig.from_dict(
+        {
+            "location": str(tmp_path / "{table}"),
+            "tables": ["public.store"],
+            "throttle": {"read": 1, "write": 1, "exports": 1},
+            "strict": True,
+        }
+    )
+    report_path = tmp_path / "backup.json"
+
+    # A rate of 1 byte/s would otherwise wait for as many seconds as there are bytes.
+    with patch("time.sleep") as sleep:
+        backup(pg, config.backup, stats_json=str(report_path))
+
+    sleep.assert_called()
+
+    report = json.loads(report_path.read_text())
+    [table] = [table for table in report["tables"] if table["name"] == "public.store"]
+    assert set(table["throttled"]) == {"read", "write"}
+    assert table["throttled"]["read"] > 0
@@ -1,4 +1,6 @@
-from databudgie.storage import FileSelectionStrategy, LocalStorage
+import pytest
+
+from databudgie.storage import FileSelectionStrategy, LocalStorage, S3_PART_SIZE, S3Storage
 
 
 def test_get_file_content_with_dotslash_prefix(tmp_path, monkeypatch):
@@ -17,3 +19,47 @@ def test_get_file_content_with_dotslash_prefix(tmp_path, monkeypatch):
     result = storage.get_file_content("./public.store/2021-04-26T09:00:00.csv", strategy)
 
     assert result is not None
+
+
+def test_get_file_content_ignores_partial_files(tmp_path):
+    """Leftovers of an interrupted write should never be selected for restore."""
+    subdir = tmp_path / "public.store"
+    subdir.mkdir()
+    (subdir / "2021-04-26T09:00:00.csv").write_bytes(b"id,name\n1,foo\n")
+    (subdir / "2021-04-27T09:00:00.csv.partial").write_bytes(b"id,na")
+
+    storage = LocalStorage()
+    strategy = FileSelectionStrategy.use_filename_strategy
+
+    result = storage.get_file_content(f"{subdir}/{{timestamp}}.csv", strategy)
+
+    assert result is not None
+    assert result.path == f"{subdir}/2021-04-26T09:00:00.csv"
+
+
+def test_s3_write_stream_multipart(s3_resource):
+    """Content larger than a single part is uploaded in multiple parts."""
+    storage = S3Storage(resource=s3_resource)
+
+    chunks = [bytes([i]) * 1024 * 1024 for i in range(S3_PART_SIZE // (1024 * 1024) + 1)]
+    storage.write_stream("s3://sample-bucket/public.store/2021-04-26T09:00:00.csv", iter(chunks))
+
+    s3_object = s3_resource.Object("sample-bucket", "public.store/2021-04-26T09:00:00.csv")
+    assert s3_object.get()["Body"].read() == b"".join(chunks)
+    assert s3_object.e_tag.strip('"').endswith("-2")
+
+
+def test_s3_write_stream_failure_aborts_upload(s3_resource):
+    storage = S3Storage(resource=s3_resource)
+
+    def chunks():
+        yield b"a" * S3_PART_SIZE
+        yield b"b" * S3_PART_SIZE
+        raise RuntimeError("Dummy error")
+
+    with pytest.raises(RuntimeError):
+        storage.write_stream("s3://sample-bucket/public.store/2021-04-26T09:00:00.csv", chunks())
+
+    bucket = s3_resource.Bucket("sample-bucket")
+    assert list(bucket.objects.all()) == []
+    assert list(bucket.multipart_uploads.all()) == []
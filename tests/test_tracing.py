@@ -0,0 +1,80 @@
+import json
+
+import faker
+
+from databudgie.api import backup, restore
+from databudgie.config import RootConfig
+from databudgie.output import default_console
+
+fake = faker.Faker()
+
+
+def _read_spans(path):
+    spans = [json.loads(line) for line in path.read_text().splitlines()]
+    return spans, {span["span_id"]: span for span in spans}
+
+
+def _parent(span, by_id):
+    return by_id[span["parent_id"]]["name"]
+
+
+def test_trace_backup(pg, mf, tmp_path):
+    mf.store.new(name=fake.name())
+    config = RootConfig.from_dict({"location": str(tmp_path / "backups/{table}"), "tables": ["public.store"]})
+
+    trace_path = tmp_path / "trace.jsonl"
+    backup(pg, config.backup, trace=str(trace_path))
+
+    spans, by_id = _read_spans(trace_path)
+    assert len({span["trace_id"] for span in spans}) == 1
+
+    [root] = [span for span in spans if span["parent_id"] is None]
+    assert root["name"] == "backup"
+
+    phases = [span for span in spans if span["parent_id"] == root["span_id"]]
+    assert [span["name"] for span in phases] == ["planning", "ddl", "sequences", "data"]
+
+    [table] = [span for span in spans if span["name"] == "table"]
+    assert table["attributes"] == {"table": "public.store"}
+    assert _parent(table, by_id) == "data"
+
+    # The stages of the export overlap, each on their own thread.
+    stages = [
+        span for span in spans if span["parent_id"] == table["span_id"] and span["name"] != "adapter.collect_partitions"
+    ]
+    assert sorted(span["name"] for span in stages) == ["compress", "query", "upload"]
+    assert all(span["attributes"] == {"table": "public.store"} for span in stages)
+
+    [upload] = [span for span in spans if span["name"] == "upload" and span["parent_id"] == table["span_id"]]
+    [write] = [span for span in spans if span["parent_id"] == upload["span_id"]]
+    assert write["name"] == "storage.write"
+    assert write["attributes"]["path"].endswith("public.store/2021-04-26T09:00:00.csv")
+
+    [catalog] = [span for span in spans if span["name"] == "adapter.collect_existing_tables"]
+    assert _parent(catalog, by_id) == "planning"
+
+
+def test_trace_parallel_index_rebuild(pg, mf, tmp_path):
+    """Validate spans created on other threads are nested under the span which submitted them."""
+    store = mf.store.new(name=fake.name())
+    mf.product.new(store=store)
+
+    config = RootConfig.from_dict(
+        {
+            "location": str(tmp_path / "backups/{table}"),
+            "tables": {"public.product": {"truncate": True, "rebuild_indexes": True}},
+        }
+    )
+    backup(pg, config.backup)
+
+    trace_path = tmp_path / "trace.jsonl"
+    restore(pg, config.restore, console=default_console, trace=str(trace_path))
+
+    spans, _ = _read_spans(trace_path)
+    [table] = [span for span in spans if span["name"] == "table"]
+    index_spans = [span for span in spans if span["name"] == "adapter.create_index"]
+
+    assert index_spans
+    for span in index_spans:
+        assert span["parent_id"] == table["span_id"]
+        assert span["thread"] != table["thread"]